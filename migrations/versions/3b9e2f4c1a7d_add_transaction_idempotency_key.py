@@ -0,0 +1,28 @@
+"""add_transaction_idempotency_key
+
+Revision ID: 3b9e2f4c1a7d
+Revises: 807b0bce12ef
+Create Date: 2024-12-28 10:12:41.532907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b9e2f4c1a7d'
+down_revision: Union[str, None] = '807b0bce12ef'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('transactions', sa.Column('idempotency_key', sa.String(length=100), nullable=True))
+    op.create_unique_constraint('uq_transactions_idempotency_key', 'transactions', ['idempotency_key'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_transactions_idempotency_key', 'transactions', type_='unique')
+    op.drop_column('transactions', 'idempotency_key')
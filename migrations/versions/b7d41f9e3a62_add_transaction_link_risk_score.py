@@ -0,0 +1,27 @@
+"""add_transaction_link_risk_score
+
+Revision ID: b7d41f9e3a62
+Revises: e8a3f6c2d915
+Create Date: 2025-01-08 14:27:53.118406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d41f9e3a62'
+down_revision: Union[str, None] = 'e8a3f6c2d915'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing rows were decided without it; 0 keeps them valid responses
+    op.add_column('transactions', sa.Column('link_risk_score', sa.Float(), nullable=True, server_default='0'))
+
+
+def downgrade() -> None:
+    op.drop_column('transactions', 'link_risk_score')
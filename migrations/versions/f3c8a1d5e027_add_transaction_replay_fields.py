@@ -0,0 +1,29 @@
+"""add_transaction_replay_fields
+
+Revision ID: f3c8a1d5e027
+Revises: b7d41f9e3a62
+Create Date: 2025-01-15 10:42:18.603215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3c8a1d5e027'
+down_revision: Union[str, None] = 'b7d41f9e3a62'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing rows have neither; replays of them skip the fingerprint check and report no degradation
+    op.add_column('transactions', sa.Column('request_fingerprint', sa.String(length=64), nullable=True))
+    op.add_column('transactions', sa.Column('degraded', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('transactions', 'degraded')
+    op.drop_column('transactions', 'request_fingerprint')
@@ -0,0 +1,56 @@
+# scripts/backfill_scores.py
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import argparse
+import json
+import logging
+import os
+from datetime import datetime
+from src.config.settings import DATABASE_URL, BACKFILL_RANGE_SIZE, BACKFILL_BATCH_SIZE
+from src.ml.prediction.predictor import latest_model_file
+from src.services.backfill import run_backfill
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Re-score stored transactions with a model version and write the scores back"
+    )
+    parser.add_argument('--model-dir', default='models')
+    parser.add_argument('--model-file', help="Model to score with (default: the latest in --model-dir)")
+    parser.add_argument('--since', type=datetime.fromisoformat, help="Earliest transaction timestamp (UTC)")
+    parser.add_argument('--until', type=datetime.fromisoformat, help="Exclusive upper timestamp bound (UTC)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--range-size', type=int, default=BACKFILL_RANGE_SIZE,
+                        help="Transaction ids per work unit and checkpoint entry")
+    parser.add_argument('--batch-size', type=int, default=BACKFILL_BATCH_SIZE,
+                        help="Rows scored and updated at a time")
+    parser.add_argument('--checkpoint', help="Progress file; rerun with the same file to resume "
+                                             "(default: backfill-<model>.json)")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    model_file = args.model_file or latest_model_file(args.model_dir)
+    checkpoint = args.checkpoint or f"backfill-{Path(model_file).stem}.json"
+
+    summary = run_backfill(
+        DATABASE_URL,
+        model_dir=args.model_dir,
+        model_file=model_file,
+        checkpoint_path=checkpoint,
+        workers=args.workers,
+        range_size=args.range_size,
+        batch_size=args.batch_size,
+        since=args.since,
+        until=args.until
+    )
+    logger.info(f"Backfill finished with {model_file}; checkpoint at {checkpoint}")
+    print(json.dumps(summary, indent=2))
+
+if __name__ == "__main__":
+    main()
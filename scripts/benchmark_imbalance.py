@@ -0,0 +1,95 @@
+# scripts/benchmark_imbalance.py
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import argparse
+import logging
+import multiprocessing
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.metrics import average_precision_score
+from sklearn.model_selection import train_test_split
+from src.ml.preprocessing.imbalance import IMBALANCE_STRATEGIES, resample
+from src.ml.preprocessing.preprocessor import FraudDataPreprocessor, V_COLUMNS
+
+logging.basicConfig(level=logging.WARNING)
+
+def _memory_mb(field: str) -> float:
+    """VmRSS (current) or VmHWM (peak) of this process from /proc, in MB"""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) / 1024
+    return float('nan')
+
+def make_benchmark_csv(path: str, n_rows: int, fraud_rate: float = 0.002, seed: int = 42):
+    """Synthetic CSV with the creditcard.csv schema"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame(rng.normal(size=(n_rows, 28)).astype(np.float32), columns=V_COLUMNS)
+    df['Time'] = np.arange(n_rows, dtype=np.float64)
+    df['Amount'] = rng.exponential(80.0, size=n_rows).astype(np.float32)
+    df['Class'] = (rng.random(n_rows) < fraud_rate).astype(np.int8)
+    df.loc[df['Class'] == 1, ['V1', 'V2', 'V3']] += 1.5
+    df.to_csv(path, index=False)
+
+def run_strategy(strategy: str, data_path: str, cache_dir: str, results):
+    """Measure one strategy in a fresh process so peak RSS is not shared"""
+    preprocessor = FraudDataPreprocessor(model_dir=cache_dir, cache_dir=cache_dir)
+    X, y = preprocessor._load_feature_cache(data_path)
+    train_idx, test_idx = train_test_split(
+        np.arange(len(y)), test_size=0.2, stratify=y, random_state=42
+    )
+    X_train, y_train = X[np.sort(train_idx)], y[np.sort(train_idx)]
+
+    baseline = _memory_mb('VmRSS')
+    start = time.perf_counter()
+    X_res, y_res, scale_pos_weight = resample(X_train, y_train, strategy=strategy)
+    elapsed = time.perf_counter() - start
+    peak = _memory_mb('VmHWM')
+
+    params = {
+        'objective': 'binary:logistic', 'tree_method': 'hist', 'max_depth': 4,
+        'learning_rate': 0.1, 'scale_pos_weight': scale_pos_weight or 1.0
+    }
+    model = xgb.train(params, xgb.QuantileDMatrix(X_res, label=y_res), num_boost_round=100)
+    y_pred = model.predict(xgb.DMatrix(X[np.sort(test_idx)]))
+    auprc = average_precision_score(y[np.sort(test_idx)], y_pred)
+
+    results[strategy] = (len(y_res), elapsed, peak - baseline, auprc)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark class-imbalance strategies")
+    parser.add_argument('--data', help="Training CSV or Parquet/Arrow export (default: synthetic)")
+    parser.add_argument('--rows', type=int, default=1000000, help="Rows of synthetic data")
+    parser.add_argument('--strategies', nargs='+', default=list(IMBALANCE_STRATEGIES))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        data_path = args.data
+        if data_path is None:
+            data_path = os.path.join(work_dir, 'benchmark.csv')
+            make_benchmark_csv(data_path, args.rows)
+
+        # Build the feature cache once so every strategy starts from the same matrix
+        FraudDataPreprocessor(model_dir=work_dir, cache_dir=work_dir)._load_feature_cache(data_path)
+
+        ctx = multiprocessing.get_context('spawn')
+        results = ctx.Manager().dict()
+        for strategy in args.strategies:
+            process = ctx.Process(target=run_strategy, args=(strategy, data_path, work_dir, results))
+            process.start()
+            process.join()
+
+    print(f"{'strategy':<14} {'rows out':>10} {'time (s)':>9} {'peak RSS +MB':>13} {'AUPRC':>7}")
+    for strategy in args.strategies:
+        rows, elapsed, rss, auprc = results[strategy]
+        print(f"{strategy:<14} {rows:>10} {elapsed:>9.2f} {rss:>13.1f} {auprc:>7.4f}")
+
+if __name__ == "__main__":
+    main()
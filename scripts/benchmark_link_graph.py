@@ -0,0 +1,99 @@
+# scripts/benchmark_link_graph.py
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import argparse
+import os
+import resource
+import tempfile
+import time
+import numpy as np
+from src.services.link_graph import LinkGraph
+
+def make_transactions(n: int, cards: int, devices: int, ips: int, now: int, rng: np.random.Generator):
+    """
+    Card, device and IP ids of `n` transactions over the last 30 days. Most
+    cards stick to a home device and IP; the rest of the traffic reuses
+    devices and IPs at random, so popular ones gather many cards.
+    """
+    card = rng.integers(0, cards, size=n)
+    roaming = rng.random(n) < 0.1
+    device = np.where(roaming, rng.zipf(1.3, size=n) % devices, card % devices)
+    ip = np.where(roaming, rng.zipf(1.3, size=n) % ips, (card * 7919) % ips)
+    no_device = rng.random(n) < 0.05
+    return (
+        [f"card_{i}" for i in card],
+        [None if missing else f"device_{i}" for i, missing in zip(device, no_device)],
+        [f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}" for i in ip],
+        now - rng.integers(0, 30 * 86400, size=n)
+    )
+
+def max_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark loading, querying and snapshotting the link graph")
+    parser.add_argument('--edges', type=int, default=50_000_000, help="Edges to load; two per transaction")
+    parser.add_argument('--cards', type=int, default=5_000_000)
+    parser.add_argument('--devices', type=int, default=3_000_000)
+    parser.add_argument('--ips', type=int, default=3_000_000)
+    parser.add_argument('--chunk', type=int, default=1_000_000, help="Transactions per add_many call")
+    parser.add_argument('--queries', type=int, default=100_000)
+    parser.add_argument('--max-degree', type=int, default=64)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    now = int(time.time())
+    graph = LinkGraph(max_degree=args.max_degree, compact_every=args.chunk)
+
+    transactions = args.edges // 2
+    generate_seconds = 0.0
+    start = time.perf_counter()
+    for offset in range(0, transactions, args.chunk):
+        generated = time.perf_counter()
+        batch = make_transactions(min(args.chunk, transactions - offset), args.cards, args.devices, args.ips, now, rng)
+        generate_seconds += time.perf_counter() - generated
+        graph.add_many(*batch)
+    graph.compact(now)
+    load_seconds = time.perf_counter() - start - generate_seconds
+    stats = graph.stats()
+    print(f"loaded {transactions} transactions in {load_seconds:.1f}s "
+          f"({transactions / load_seconds:,.0f}/s, {graph.compactions} compactions, data generation excluded)")
+    print(f"nodes {stats['nodes']:,}, adjacency entries {stats['adjacency_entries']:,}, "
+          f"arrays {stats['nbytes'] / 1e6:.0f} MB, peak RSS {max_rss_mb():.0f} MB")
+
+    start = time.perf_counter()
+    graph.compact(now)
+    print(f"full compaction: {time.perf_counter() - start:.1f}s")
+
+    cards, devices, ips, _ = make_transactions(args.queries, args.cards, args.devices, args.ips, now, rng)
+    start = time.perf_counter()
+    for card, device, ip in zip(cards, devices, ips):
+        graph.features(card, device, ip, now=now)
+    features_us = (time.perf_counter() - start) / args.queries * 1e6
+    start = time.perf_counter()
+    for card, device, ip in zip(cards, devices, ips):
+        graph.add(card, device, ip, now)
+    add_us = (time.perf_counter() - start) / args.queries * 1e6
+    print(f"features {features_us:.1f} us/transaction, add {add_us:.1f} us/transaction")
+    busiest = int(np.argmax(np.diff(graph.offsets)))
+    print(f"max degree {int(np.diff(graph.offsets)[busiest])}, "
+          f"largest component {int(graph.component_size.max()):,} nodes")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'link_graph')
+        start = time.perf_counter()
+        size_mb = graph.snapshot(path, now)['nbytes'] / 1e6
+        snapshot_seconds = time.perf_counter() - start
+        del graph
+        start = time.perf_counter()
+        restored = LinkGraph(max_degree=args.max_degree)
+        restored.restore(path)
+        restore_seconds = time.perf_counter() - start
+    print(f"snapshot {snapshot_seconds:.1f}s ({size_mb:.0f} MB), restore {restore_seconds:.1f}s")
+    print(f"peak RSS {max_rss_mb():.0f} MB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# scripts/benchmark_microbatch.py
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import argparse
+import asyncio
+import logging
+import time
+import numpy as np
+from src.ml.prediction.batcher import MicroBatcher
+from src.ml.prediction.predictor import FraudPredictor
+
+logging.basicConfig(level=logging.WARNING)
+
+def make_transactions(n: int, seed: int = 42):
+    """Enriched transactions as produced by TransactionService.enrich_transaction"""
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            'card_id': f"card_{rng.integers(10000)}",
+            'merchant_id': f"merch_{rng.integers(500)}",
+            'amount': float(rng.exponential(80.0)) + 1.0,
+            'location_id': int(rng.integers(1, 100)),
+            'device_id': f"device_{rng.integers(10000)}",
+            'ip_address': f"10.0.{rng.integers(256)}.{rng.integers(256)}",
+            'merchant_risk_score': 0.2,
+            'location_risk_score': 0.3,
+            'amount_risk_score': 0.2
+        }
+        for _ in range(n)
+    ]
+
+async def run_clients(score, transactions, concurrency: int):
+    """Closed-loop clients each sending one request at a time; returns (throughput, latencies)"""
+    latencies = []
+    next_index = 0
+
+    async def client():
+        nonlocal next_index
+        while next_index < len(transactions):
+            transaction = transactions[next_index]
+            next_index += 1
+            start = time.perf_counter()
+            await score(transaction)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return len(transactions) / elapsed, np.array(latencies) * 1000
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark micro-batched scoring against one model call per request")
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16, 64, 256])
+    parser.add_argument('--max-batch-size', type=int, default=32)
+    parser.add_argument('--max-wait-ms', type=float, default=2.0)
+    args = parser.parse_args()
+
+    predictor = FraudPredictor()
+    transactions = make_transactions(args.requests)
+    predictor.predict_batch(transactions[:10], shadow=False)  # load scalers before timing
+    loop = asyncio.get_running_loop()
+
+    async def unbatched(transaction):
+        return await loop.run_in_executor(None, predictor.predict, transaction)
+
+    print(f"{'concurrency':>11} {'mode':>9} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'mean batch':>11}")
+    for concurrency in args.concurrency:
+        batcher = MicroBatcher(predictor.predict_batch, args.max_batch_size, args.max_wait_ms)
+        for mode, score in (('single', unbatched), ('batched', batcher.submit)):
+            throughput, latencies = await run_clients(score, transactions, concurrency)
+            mean_batch = batcher.stats()['mean_batch_size'] if mode == 'batched' else 1.0
+            print(f"{concurrency:>11} {mode:>9} {throughput:>9.0f} {np.percentile(latencies, 50):>8.2f} "
+                  f"{np.percentile(latencies, 99):>8.2f} {mean_batch:>11.1f}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
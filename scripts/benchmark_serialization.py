@@ -0,0 +1,117 @@
+# scripts/benchmark_serialization.py
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import argparse
+import json
+import time
+from datetime import datetime
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from src.schemas.transaction import (
+    TransactionCreate, TransactionResponse, transaction_adapter, transaction_batch_adapter
+)
+
+# Stand-ins for what scoring and storage produce; only (de)serialization is timed
+RISK_COMPONENTS = {
+    'pattern_risk': 0.0778, 'user_behavior_risk': 0.0021, 'location_merchant_risk': 0.7,
+    'amount_risk': 0.2, 'time_risk': 0.5
+}
+
+def make_bodies(n: int):
+    return [json.dumps({
+        "card_id": f"card_{i}",
+        "merchant_id": f"merch_{i % 5000}",
+        "amount": 10 + (i % 997) + 0.25,
+        "location_id": i % 50,
+        "device_id": f"device_{i % 777}",
+        "ip_address": f"10.0.{i % 256}.{i % 199}"
+    }).encode() for i in range(n)]
+
+def response_values(transaction: TransactionCreate, transaction_id: int):
+    return dict(
+        transaction_id=transaction_id,
+        card_id=transaction.card_id,
+        merchant_id=transaction.merchant_id,
+        amount=transaction.amount,
+        timestamp=datetime(2024, 1, 1, 12, 0, 0, 123456),
+        status='legit',
+        fraud_probability=0.5024018305476713,
+        merchant_risk_score=0.2,
+        location_risk_score=0.7,
+        amount_risk_score=0.2,
+        pattern_risk_score=0.0778,
+        user_behavior_risk_score=0.0021,
+        risk_level='MEDIUM'
+    )
+
+def framework_path(body: bytes, transaction_id: int, response_field) -> bytes:
+    """What FastAPI did with a TransactionCreate parameter and a response_model"""
+    transaction = TransactionCreate.model_validate(json.loads(body))
+    result = TransactionResponse(**response_values(transaction, transaction_id))
+    content = {**result.model_dump(), 'risk_breakdown': RISK_COMPONENTS, 'risk_level': 'MEDIUM'}
+    return JSONResponse(_serialize(response_field, content)).body
+
+def _serialize(response_field, content):
+    # serialize_response is a coroutine that never awaits; drive it without an event loop
+    coroutine = serialize_response(field=response_field, response_content=content)
+    try:
+        coroutine.send(None)
+    except StopIteration as stop:
+        return stop.value
+    raise RuntimeError("serialize_response suspended")
+
+def fast_path(body: bytes, transaction_id: int) -> bytes:
+    transaction = transaction_adapter.validate_json(body)
+    result = TransactionResponse.model_construct(**response_values(transaction, transaction_id))
+    return ORJSONResponse({**result.model_dump(), 'risk_level': 'MEDIUM'}).body
+
+def fast_batch_path(body: bytes) -> bytes:
+    transactions = transaction_batch_adapter.validate_json(body)
+    return ORJSONResponse([
+        {**TransactionResponse.model_construct(**response_values(transaction, i)).model_dump(), 'risk_level': 'MEDIUM'}
+        for i, transaction in enumerate(transactions)
+    ]).body
+
+def per_request_us(fn, items, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for i, item in enumerate(items):
+            fn(item, i)
+        best = min(best, time.perf_counter() - start)
+    return best / len(items) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark verify request bytes in to response bytes out")
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    bodies = make_bodies(args.requests)
+    response_field = create_response_field(name="response", type_=TransactionResponse)
+
+    # Both paths must produce the same document
+    assert json.loads(framework_path(bodies[0], 1, response_field)) == json.loads(fast_path(bodies[0], 1))
+
+    framework = per_request_us(lambda body, i: framework_path(body, i, response_field), bodies, args.repeat)
+    fast = per_request_us(fast_path, bodies, args.repeat)
+
+    batches = [
+        b'[' + b','.join(bodies[start:start + args.batch_size]) + b']'
+        for start in range(0, len(bodies), args.batch_size)
+    ]
+    batched = per_request_us(lambda body, i: fast_batch_path(body), batches, args.repeat) / args.batch_size
+
+    print(f"request {len(bodies[0])} bytes, response {len(fast_path(bodies[0], 1))} bytes")
+    print(f"{'path':<28} {'us/request':>10} {'speedup':>8}")
+    print(f"{'framework (json + model)':<28} {framework:>10.1f} {1:>7.2f}x")
+    print(f"{'adapter + orjson':<28} {fast:>10.1f} {framework / fast:>7.2f}x")
+    print(f"{f'batch of {args.batch_size}':<28} {batched:>10.1f} {framework / batched:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# scripts/benchmark_startup.py
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import argparse
+import json
+import os
+import signal
+import socket
+import subprocess
+import time
+import urllib.error
+import urllib.request
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+
+TRANSACTION = {
+    "card_id": "card_123", "merchant_id": "merch_456", "amount": 100.0,
+    "location_id": 1, "device_id": "device_1", "ip_address": "10.0.0.1"
+}
+
+def wait_for_port(port: int, timeout: float = 120.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise TimeoutError(f"Server did not listen on port {port} within {timeout}s")
+
+def timed_request(port: int) -> float:
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{port}/api/v1/transactions/verify",
+        data=json.dumps(TRANSACTION).encode(),
+        headers={"Content-Type": "application/json"}
+    )
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=60) as response:
+            response.read()
+    except urllib.error.HTTPError as e:
+        print(f"Request failed with {e.code}: {e.read()[:200]}", file=sys.stderr)
+    return (time.perf_counter() - start) * 1000
+
+def descendants(pid: int):
+    children = []
+    for task in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{task}/children") as f:
+            children += [int(child) for child in f.read().split()]
+    return children + [grandchild for child in children for grandchild in descendants(child)]
+
+def memory_mb(pid: int):
+    """(RSS, PSS) of one process in MB; PSS splits shared pages between the sharers"""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            field, _, rest = line.partition(':')
+            if field in ('Rss', 'Pss'):
+                values[field] = int(rest.split()[0]) / 1024
+    return values['Rss'], values['Pss']
+
+def measure(name: str, command, port: int, workers: int, requests: int):
+    process = subprocess.Popen(command, cwd=os.getcwd(), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        start = time.perf_counter()
+        wait_for_port(port)
+        listening = time.perf_counter() - start
+
+        # The first request after the port opens reaches a cold worker
+        first = timed_request(port)
+        warm = [timed_request(port) for _ in range(requests)]
+
+        # uvicorn --workers also runs a supervisor child; only count serving processes
+        pids = [pid for pid in descendants(process.pid) if 'multiprocessing.resource_tracker' not in
+                open(f"/proc/{pid}/cmdline").read().replace('\0', ' ')]
+        memory = [memory_mb(pid) for pid in pids]
+        worker_memory = sorted(memory)[-workers:]
+        print(f"{name:<10} {listening:>8.2f} {listening + first / 1000:>7.2f} {first:>9.1f} "
+              f"{np.percentile(warm, 50):>8.1f} {np.mean([m[0] for m in worker_memory]):>8.1f} "
+              f"{np.mean([m[1] for m in worker_memory]):>8.1f}")
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=30)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare uvicorn --workers with the pre-fork launcher")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--requests', type=int, default=20, help="Warm requests after the first one")
+    args = parser.parse_args()
+
+    commands = {
+        'uvicorn': [sys.executable, '-m', 'uvicorn', 'src.main:app', '--port', str(args.port),
+                    '--workers', str(args.workers), '--log-level', 'warning'],
+        'prefork': [sys.executable, str(ROOT / 'scripts' / 'serve.py'), '--port', str(args.port),
+                    '--workers', str(args.workers), '--log-level', 'warning']
+    }
+
+    print(f"{'launcher':<10} {'listen s':>8} {'ready s':>7} {'first ms':>9} {'warm p50':>8} "
+          f"{'RSS MB':>8} {'PSS MB':>8}")
+    for name, command in commands.items():
+        measure(name, command, args.port, args.workers, args.requests)
+
+if __name__ == "__main__":
+    main()
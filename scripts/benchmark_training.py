@@ -0,0 +1,54 @@
+# scripts/benchmark_training.py
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import argparse
+import logging
+import tempfile
+import time
+import numpy as np
+import optuna
+from src.ml.training.trainer import FraudModelTrainer
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+def make_benchmark_dataset(n_rows: int, n_features: int = 31, fraud_rate: float = 0.02, seed: int = 42):
+    """Synthetic, imbalanced dataset shaped like the preprocessed training matrix"""
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, n_features)).astype(np.float32)
+    y = (rng.random(n_rows) < fraud_rate).astype(np.int8)
+    # Shift a few features for the positive class so there is something to learn
+    X[y == 1, :5] += 1.5
+    return X, y
+
+def time_train_model(X, y, n_trials: int, **trainer_kwargs) -> float:
+    """Return wall-clock seconds for one train_model run"""
+    with tempfile.TemporaryDirectory() as model_dir:
+        trainer = FraudModelTrainer(model_dir=model_dir, n_trials=n_trials, **trainer_kwargs)
+        start = time.perf_counter()
+        trainer.train_model(X, y)
+        return time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark FraudModelTrainer.train_model")
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--trials', type=int, default=20)
+    args = parser.parse_args()
+
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    X, y = make_benchmark_dataset(args.rows)
+    print(f"Dataset: {X.shape[0]} rows x {X.shape[1]} features, {int(y.sum())} positives, {args.trials} trials")
+
+    configs = {
+        'serial folds, no pruning': dict(parallel_folds=1, enable_pruning=False),
+        'parallel folds + pruning': dict(),
+    }
+    for name, kwargs in configs.items():
+        elapsed = time_train_model(X, y, args.trials, **kwargs)
+        print(f"{name:<28} {elapsed:8.1f}s")
+
+if __name__ == "__main__":
+    main()
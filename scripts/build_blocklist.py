@@ -0,0 +1,76 @@
+# scripts/build_blocklist.py
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import argparse
+import csv
+import json
+import logging
+import os
+import time
+from src.config.settings import BLOCKLIST_DIR, BLOCKLIST_FALSE_POSITIVE_RATE
+from src.database.connection import SessionLocal
+from src.services.blocklist import BlocklistFilters, entries_version, import_entries, publish_filters
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Import blocklist files into blocklist_entries, then build the filters the API workers "
+                    "pre-check transactions with and publish them"
+    )
+    parser.add_argument('files', nargs='*', help="CSVs with entity_type (card, device or ip), entity_id and "
+                                                 "reason columns; the file name is recorded as the source")
+    parser.add_argument('--output-dir', default=BLOCKLIST_DIR,
+                        help="Versions are written here and `current` is repointed at the new one")
+    parser.add_argument('--false-positive-rate', type=float, default=BLOCKLIST_FALSE_POSITIVE_RATE)
+    parser.add_argument('--keep', type=int, default=2, help="Number of versions to keep, including the new one")
+    parser.add_argument('--watch', type=float, metavar='SECONDS',
+                        help="Keep running, and rebuild whenever the table changed within this interval")
+    return parser.parse_args()
+
+def read_entries(path: str):
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            yield row['entity_type'].strip().lower(), row['entity_id'].strip(), row['reason'].strip()
+
+def publish(args) -> str:
+    db = SessionLocal()
+    try:
+        version = publish_filters(db, args.output_dir, args.false_positive_rate, args.keep)
+    finally:
+        db.close()
+    filters = BlocklistFilters(os.path.join(args.output_dir, version))
+    logger.info(f"Published {version}; workers pick it up within BLOCKLIST_RELOAD_SECONDS")
+    print(json.dumps({'version': version, **filters.meta}, indent=2))
+    return version
+
+def main():
+    args = parse_args()
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    db = SessionLocal()
+    try:
+        for path in args.files:
+            import_entries(db, read_entries(path), source=os.path.basename(path))
+        version = entries_version(db)
+    finally:
+        db.close()
+    publish(args)
+
+    while args.watch:
+        time.sleep(args.watch)
+        db = SessionLocal()
+        try:
+            current = entries_version(db)
+        finally:
+            db.close()
+        if current != version:
+            version = current
+            publish(args)
+
+if __name__ == "__main__":
+    main()
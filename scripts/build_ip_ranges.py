@@ -0,0 +1,38 @@
+# scripts/build_ip_ranges.py
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import argparse
+import json
+import logging
+import os
+from src.config.settings import IP_RANGES_DIR
+from src.services.ip_ranges import IpRangeTable, publish_table
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Compile an IP range CSV into memory-mapped lookup arrays and publish it to the API workers"
+    )
+    parser.add_argument('input', help="CSV with start_ip, end_ip (inclusive, IPv4 or IPv6) and "
+                                      "reputation_risk / geo_risk columns in [0, 1]")
+    parser.add_argument('--output-dir', default=IP_RANGES_DIR,
+                        help="Versions are written here and `current` is repointed at the new one")
+    parser.add_argument('--keep', type=int, default=2, help="Number of versions to keep, including the new one")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    version = publish_table(args.input, args.output_dir, keep=args.keep)
+    table = IpRangeTable(os.path.join(args.output_dir, version))
+    logger.info(f"Published {version}; workers pick it up within IP_RANGES_RELOAD_SECONDS")
+    print(json.dumps({'version': version, **table.meta}, indent=2))
+
+if __name__ == "__main__":
+    main()
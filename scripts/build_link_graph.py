@@ -0,0 +1,74 @@
+# scripts/build_link_graph.py
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import argparse
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from src.config.settings import (
+    LINK_GRAPH_COMPACT_EVERY,
+    LINK_GRAPH_DIR,
+    LINK_GRAPH_MAX_DEGREE,
+    LINK_GRAPH_RETENTION_SECONDS,
+    LINK_GRAPH_WINDOW_SECONDS
+)
+from src.database.connection import SessionLocal
+from src.services.link_graph import LinkGraph, load_transactions, publish_graph
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Build the card-device-IP link graph from the transactions table and publish it "
+                    "to the API workers"
+    )
+    parser.add_argument('--output-dir', default=LINK_GRAPH_DIR,
+                        help="Versions are written here and `current` is repointed at the new one")
+    parser.add_argument('--keep', type=int, default=2, help="Number of versions to keep, including the new one")
+    parser.add_argument('--rebuild', action='store_true',
+                        help="Start from the retention period's transactions instead of the current version")
+    parser.add_argument('--settle-seconds', type=float, default=60.0,
+                        help="Transactions created more recently are read again on the next update, "
+                             "in case rows with lower ids are still being committed")
+    parser.add_argument('--batch-size', type=int, default=100000)
+    parser.add_argument('--watch', type=float, metavar='SECONDS',
+                        help="Keep running, and publish the new transactions at this interval")
+    return parser.parse_args()
+
+def update(args, graph: LinkGraph, after_id: int) -> int:
+    loaded_at = time.time()
+    since = datetime.utcnow() - timedelta(seconds=LINK_GRAPH_RETENTION_SECONDS)
+    db = SessionLocal()
+    try:
+        after_id = load_transactions(db, graph, after_id, since, args.settle_seconds, args.batch_size)
+    finally:
+        db.close()
+    version = publish_graph(graph, args.output_dir, after_id, loaded_at, args.keep)
+    logger.info(f"Published {version}; workers pick it up within LINK_GRAPH_RELOAD_SECONDS")
+    print(json.dumps({'version': version, **graph.stats()}, indent=2))
+    return after_id
+
+def main():
+    args = parse_args()
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    graph = LinkGraph(LINK_GRAPH_MAX_DEGREE, LINK_GRAPH_WINDOW_SECONDS, LINK_GRAPH_RETENTION_SECONDS,
+                      LINK_GRAPH_COMPACT_EVERY)
+    after_id = 0
+    current = os.path.join(args.output_dir, 'current')
+    if not args.rebuild and os.path.isfile(os.path.join(current, 'meta.json')):
+        after_id = graph.restore(current).get('last_transaction_id') or 0
+    after_id = update(args, graph, after_id)
+
+    while args.watch:
+        time.sleep(args.watch)
+        after_id = update(args, graph, after_id)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# scripts/calibrate_cascade.py
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from src.ml.prediction.cascade import calibrate_cascade, save_cascade_config
+from src.ml.preprocessing.preprocessor import FraudDataPreprocessor
+from src.ml.training.trainer import FraudModelTrainer
+import argparse
+import os
+import xgboost as xgb
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def calibrate(data_path: str, model_dir: str = 'models', prefix_trees: int = None,
+              max_recall_loss: float = 0.005, max_false_positive_rate: float = 0.001):
+    """Calibrate the cascade band for the current model on labeled holdout data"""
+    model_path, _ = FraudModelTrainer(model_dir=model_dir).latest_model()
+    model = xgb.Booster()
+    model.load_model(model_path)
+
+    # Holdout rows go through the saved scalers without resampling
+    X, y = FraudDataPreprocessor(model_dir=model_dir).prepare_update_data(data_path)
+
+    prefix_trees = prefix_trees or max(1, model.num_boosted_rounds() // 5)
+    config = calibrate_cascade(
+        model, X, y, prefix_trees,
+        max_recall_loss=max_recall_loss,
+        max_false_positive_rate=max_false_positive_rate
+    )
+    path = save_cascade_config(config, model_dir, os.path.basename(model_path))
+
+    holdout = config['holdout']
+    logger.info(f"Cascade config saved: {path}")
+    logger.info(
+        f"Prefix of {prefix_trees}/{model.num_boosted_rounds()} trees short-circuits "
+        f"{holdout['short_circuit_rate']:.1%} of holdout rows with recall loss {holdout['recall_loss']:.3%}"
+    )
+    return config
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Calibrate cascade scoring thresholds")
+    parser.add_argument('--data', required=True, help="Labeled holdout CSV or Parquet/Arrow export")
+    parser.add_argument('--model-dir', default='models')
+    parser.add_argument('--prefix-trees', type=int, help="Trees in the first stage (default: 20%%)")
+    parser.add_argument('--max-recall-loss', type=float, default=0.005)
+    parser.add_argument('--max-false-positive-rate', type=float, default=0.001)
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    calibrate(
+        args.data,
+        model_dir=args.model_dir,
+        prefix_trees=args.prefix_trees,
+        max_recall_loss=args.max_recall_loss,
+        max_false_positive_rate=args.max_false_positive_rate
+    )
@@ -0,0 +1,46 @@
+# scripts/export_training_data.py
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from src.database.connection import SessionLocal
+from src.services.training_data_exporter import TrainingDataExporter
+from datetime import datetime
+import argparse
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def export_training_data(output_dir: str, since: datetime = None, until: datetime = None,
+                         file_format: str = 'parquet', chunk_size: int = None):
+    db = SessionLocal()
+    try:
+        exporter = TrainingDataExporter(db, chunk_size=chunk_size, file_format=file_format)
+        paths = exporter.export(output_dir, since=since, until=until)
+        logger.info(f"Exported {len(paths)} files to {output_dir}")
+    except Exception as e:
+        logger.error(f"Export failed: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Export labeled transactions for training")
+    parser.add_argument('output_dir', help="New directory for the part files")
+    parser.add_argument('--since', type=datetime.fromisoformat, help="Earliest transaction timestamp (UTC)")
+    parser.add_argument('--until', type=datetime.fromisoformat, help="Exclusive upper timestamp bound (UTC)")
+    parser.add_argument('--format', choices=['parquet', 'arrow'], default='parquet')
+    parser.add_argument('--chunk-size', type=int, help="Rows per cursor fetch and part file")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    export_training_data(
+        args.output_dir,
+        since=args.since,
+        until=args.until,
+        file_format=args.format,
+        chunk_size=args.chunk_size
+    )
@@ -0,0 +1,39 @@
+# scripts/materialize_features.py
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from src.database.connection import SessionLocal
+from src.database.models import Card, TransactionPattern
+from src.services.feature_store import feature_store
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def materialize_card_features():
+    """Bulk-load card features from the cards and transaction_patterns tables"""
+    db = SessionLocal()
+    try:
+        card_types = dict(db.query(Card.card_id, Card.card_type).all())
+        feature_store.materialize(db, 'card', 'card_type', card_types)
+
+        averages = {
+            card_id: float(amount)
+            for card_id, amount in db.query(
+                TransactionPattern.card_id, TransactionPattern.avg_transaction_amount
+            ).all()
+            if amount is not None
+        }
+        feature_store.materialize(db, 'card', 'avg_transaction_amount', averages)
+
+        logger.info(f"Materialized features for {len(card_types)} cards")
+    except Exception as e:
+        logger.error(f"Feature materialization failed: {str(e)}")
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    materialize_card_features()
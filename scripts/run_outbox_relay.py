@@ -0,0 +1,46 @@
+# scripts/run_outbox_relay.py
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import argparse
+import logging
+from prometheus_client import start_http_server
+from src.config.settings import (
+    OUTBOX_BATCH_SIZE, OUTBOX_POLL_INTERVAL_SECONDS, OUTBOX_METRICS_PORT,
+    KAFKA_BOOTSTRAP_SERVERS, KAFKA_DECISIONS_TOPIC
+)
+from src.database.connection import SessionLocal
+from src.services.outbox_relay import FileSink, KafkaSink, OutboxRelay
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def main():
+    parser = argparse.ArgumentParser(description="Relay fraud decisions from the outbox table downstream")
+    parser.add_argument('--sink', choices=['kafka', 'file'], default='kafka')
+    parser.add_argument('--topic', default=KAFKA_DECISIONS_TOPIC)
+    parser.add_argument('--bootstrap-servers', default=KAFKA_BOOTSTRAP_SERVERS,
+                        help="Comma-separated Kafka brokers")
+    parser.add_argument('--output', default='fraud_decisions.jsonl', help="File for --sink file")
+    parser.add_argument('--batch-size', type=int, default=OUTBOX_BATCH_SIZE)
+    parser.add_argument('--poll-interval', type=float, default=OUTBOX_POLL_INTERVAL_SECONDS)
+    parser.add_argument('--metrics-port', type=int, default=OUTBOX_METRICS_PORT,
+                        help="Prometheus metrics port (0 disables)")
+    args = parser.parse_args()
+
+    if args.sink == 'kafka':
+        sink = KafkaSink(args.bootstrap_servers.split(','), args.topic)
+    else:
+        sink = FileSink(args.output)
+
+    if args.metrics_port:
+        start_http_server(args.metrics_port)
+        logger.info(f"Serving relay metrics on port {args.metrics_port}")
+
+    logger.info(f"Relaying outbox events to {args.sink} in batches of {args.batch_size}")
+    OutboxRelay(SessionLocal, sink, batch_size=args.batch_size).run_forever(args.poll_interval)
+
+if __name__ == "__main__":
+    main()
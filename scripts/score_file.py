@@ -0,0 +1,53 @@
+# scripts/score_file.py
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import argparse
+import json
+import logging
+import os
+from src.config.settings import BULK_SCORING_CHUNK_SIZE
+from src.ml.prediction.bulk_scoring import score_file
+from src.ml.prediction.predictor import FraudPredictor
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Score a CSV/Parquet file of transactions offline, without the HTTP API"
+    )
+    parser.add_argument('input', help="CSV or Parquet file with card_id, merchant_id, amount and optionally "
+                                      "location_id, device_id, ip_address and timestamp columns")
+    parser.add_argument('output', help="Scored CSV or Parquet file (format follows the extension)")
+    parser.add_argument('--model-dir', default='models')
+    parser.add_argument('--model-file', help="Model to score with (default: the latest in --model-dir)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--chunk-size', type=int, default=BULK_SCORING_CHUNK_SIZE)
+    parser.add_argument('--unordered', action='store_true',
+                        help="Write chunks as they finish instead of in input order")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+
+    # Loaded once here and shared with the forked workers
+    predictor = FraudPredictor(model_dir=args.model_dir, cascade=False, shadow=False, model_file=args.model_file)
+    # Parallelism comes from the worker processes; one thread each avoids
+    # oversubscription and keeps OpenMP threads out of the parent before fork
+    predictor.set_nthread(1)
+    predictor.warmup()
+
+    summary = score_file(
+        predictor, args.input, args.output,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        preserve_order=not args.unordered
+    )
+    logger.info(f"Scored {args.input} with {predictor.model_file} into {args.output}")
+    print(json.dumps(summary, indent=2))
+
+if __name__ == "__main__":
+    main()
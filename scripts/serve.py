@@ -0,0 +1,147 @@
+# scripts/serve.py
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import time
+import uvicorn
+
+# Workers must not run create_all on startup; the parent does it once below
+os.environ["CREATE_TABLES_ON_STARTUP"] = "false"
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    """Listening socket shared by every forked worker"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+def run_worker(config: uvicorn.Config, sock: socket.socket, predictor, nthread: int):
+    """Serve requests in a forked child until it receives SIGTERM/SIGINT"""
+    from src.database.connection import engine_router
+
+    # The parent predicted single-threaded; each worker gets its own OpenMP pool
+    predictor.set_nthread(nthread)
+    # Connections inherited from the parent belong to the parent
+    for engine in engine_router.engines:
+        engine.dispose(close=False)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+    uvicorn.Server(config).run(sockets=[sock])
+
+def warmup_enrichment():
+    """Run the read-only enrichment queries once so mappers and compiled SQL are inherited by workers"""
+    from src.database.connection import SessionLocal
+    from src.schemas.transaction import TransactionCreate
+    from src.services.transaction_service import TransactionService
+
+    db = SessionLocal()
+    try:
+        TransactionService(db).enrich_transaction(TransactionCreate(
+            card_id="warmup_card", merchant_id="warmup_merchant", amount=1.0,
+            location_id=1, device_id="warmup_device", ip_address="10.0.0.1"
+        ))
+    except Exception as e:
+        logger.warning(f"Enrichment warmup failed: {str(e)}")
+    finally:
+        db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-fork API server: load and warm the model once, then fork workers")
+    parser.add_argument('--host', default="0.0.0.0")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--warmup-transactions', type=int, default=64)
+    parser.add_argument('--worker-threads', type=int,
+                        help="XGBoost threads per worker (default: cores / workers)")
+    parser.add_argument('--create-tables', action='store_true',
+                        help="Create missing tables before forking (use Alembic in production)")
+    parser.add_argument('--log-level', default="info")
+    args = parser.parse_args()
+
+    # Importing the app loads the model in the parent, to be shared copy-on-write
+    start = time.perf_counter()
+    from src.main import app
+    from src.api.routes import predictor
+    from src.database.connection import engine
+    from src.database.models import Base
+
+    if args.create_tables:
+        Base.metadata.create_all(bind=engine)
+    # No OpenMP pool may exist in the parent when it forks
+    predictor.set_nthread(1)
+    predictor.warmup(args.warmup_transactions)
+    warmup_enrichment()
+    engine.dispose()
+    logger.info(f"Model loaded and warmed up in {time.perf_counter() - start:.2f}s")
+
+    # Resolve uvicorn's protocol and lifespan classes once instead of in every worker
+    config = uvicorn.Config(app, log_level=args.log_level, lifespan="on")
+    config.load()
+
+    # Move everything loaded so far out of the collector's reach, so gc passes
+    # in the workers do not touch (and copy) the shared pages
+    gc.collect()
+    gc.freeze()
+
+    sock = bind_socket(args.host, args.port)
+    worker_threads = args.worker_threads or max(1, (os.cpu_count() or 1) // args.workers)
+    workers = {}
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(config, sock, predictor, worker_threads)
+            finally:
+                os._exit(0)
+        workers[pid] = time.monotonic()
+        logger.info(f"Started worker {pid}")
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            os.kill(pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for _ in range(args.workers):
+        spawn()
+    logger.info(f"Serving on {args.host}:{args.port} with {args.workers} workers")
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        started = workers.pop(pid, None)
+        if started is None or stopping:
+            continue
+        logger.warning(f"Worker {pid} exited with status {status}; restarting")
+        # Avoid a tight restart loop when workers die on startup
+        if time.monotonic() - started < 1:
+            time.sleep(1)
+        spawn()
+
+    sock.close()
+
+if __name__ == "__main__":
+    main()
@@ -5,32 +5,166 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
 from src.ml.preprocessing.preprocessor import FraudDataPreprocessor
+from src.ml.preprocessing.imbalance import IMBALANCE_STRATEGIES
 from src.ml.training.trainer import FraudModelTrainer
+from src.config.settings import OPTUNA_STORAGE, OPTUNA_STUDY_NAME
+import argparse
+import multiprocessing
+import numpy as np
+import os
+import shutil
+import tempfile
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def train_fraud_model(data_path: str):
+def train_fraud_model(data_path: str, n_trials: int = 20, storage: str = None,
+                      study_name: str = None, workers: int = 1, imbalance_strategy: str = None):
     try:
         # Initialize components
         preprocessor = FraudDataPreprocessor()
-        trainer = FraudModelTrainer()
-        
+        trainer = FraudModelTrainer(n_trials=n_trials, storage=storage, study_name=study_name)
+
         # Prepare data
         logger.info("Preparing training data...")
-        X, y = preprocessor.prepare_training_data(data_path)
-        
+        X, y = preprocessor.prepare_training_data(data_path, imbalance_strategy=imbalance_strategy)
+        trainer.scale_pos_weight = preprocessor.scale_pos_weight
+
         # Train model
         logger.info("Training model...")
-        model = trainer.train_model(X, y)
-        
+        if workers > 1:
+            model = _train_with_workers(trainer, X, y, workers, preprocessor.data_watermark)
+        else:
+            model = trainer.train_model(X, y, data_watermark=preprocessor.data_watermark)
+
         logger.info("Training completed successfully!")
-        
+
     except Exception as e:
         logger.error(f"Training failed: {str(e)}")
         raise
 
+def update_fraud_model(data_path: str, max_new_trees: int = 50,
+                       max_total_trees: int = 400, refresh_leaves: bool = False, since: float = None):
+    """Warm-start the champion on rows labeled since its data watermark (or `since`)"""
+    try:
+        preprocessor = FraudDataPreprocessor()
+        trainer = FraudModelTrainer()
+
+        since = trainer.incremental_watermark(since)
+
+        logger.info("Preparing incremental training data...")
+        X, y = preprocessor.prepare_update_data(data_path, since=since)
+        if len(y) == 0:
+            logger.info("Champion is up to date; nothing to train")
+            return
+
+        logger.info("Updating model...")
+        trainer.update_model(
+            X, y,
+            max_new_trees=max_new_trees,
+            max_total_trees=max_total_trees,
+            refresh_leaves=refresh_leaves,
+            data_watermark=preprocessor.data_watermark
+        )
+
+        logger.info("Incremental update completed successfully!")
+
+    except Exception as e:
+        logger.error(f"Incremental update failed: {str(e)}")
+        raise
+
+def _search_worker(worker_id: int, data_dir: str, n_trials: int, storage: str,
+                   study_name: str, nthread: int, scale_pos_weight: float = None):
+    """Pull trials from the shared study until it holds n_trials finished trials"""
+    X = np.load(os.path.join(data_dir, 'X.npy'), mmap_mode='r')
+    y = np.load(os.path.join(data_dir, 'y.npy'), mmap_mode='r')
+
+    trainer = FraudModelTrainer(
+        n_trials=n_trials, nthread=nthread, storage=storage, study_name=study_name,
+        scale_pos_weight=scale_pos_weight
+    )
+    logger.info(f"Search worker {worker_id} started with {nthread} threads")
+    trainer.run_search(X, y, trainer.create_study())
+
+def _train_with_workers(trainer: FraudModelTrainer, X, y, workers: int, data_watermark=None):
+    """Run the search in worker processes sharing an RDB study, then fit the final model"""
+    if not trainer.storage:
+        raise ValueError("Multi-process search needs --storage (or OPTUNA_STORAGE)")
+
+    # Create the study up front so workers do not race to create it
+    study = trainer.create_study()
+    nthread = max(1, trainer.nthread // workers)
+
+    # Workers memory-map the prepared matrix instead of preparing it again
+    data_dir = tempfile.mkdtemp(prefix='optuna-search-')
+    try:
+        np.save(os.path.join(data_dir, 'X.npy'), X)
+        np.save(os.path.join(data_dir, 'y.npy'), y)
+
+        processes = [
+            multiprocessing.Process(
+                target=_search_worker,
+                args=(i, data_dir, trainer.n_trials, trainer.storage, trainer.study_name,
+                      nthread, trainer.scale_pos_weight)
+            )
+            for i in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        failed = [p.pid for p in processes if p.exitcode != 0]
+        if failed:
+            logger.warning(f"Search workers exited with errors: {failed}")
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    return trainer.fit_best_model(X, y, study, data_watermark=data_watermark)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train the fraud detection model")
+    parser.add_argument('--data', default="data/creditcard.csv", help="Training CSV path")
+    parser.add_argument('--trials', type=int, default=20,
+                        help="Total finished trials for the study, including resumed ones")
+    parser.add_argument('--storage', default=OPTUNA_STORAGE,
+                        help="Optuna RDB URL, e.g. sqlite:///models/optuna.db")
+    parser.add_argument('--study-name', default=OPTUNA_STUDY_NAME,
+                        help="Name of the study; an existing study is resumed")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Worker processes pulling trials from the shared study")
+    parser.add_argument('--imbalance-strategy', choices=IMBALANCE_STRATEGIES,
+                        help="Class imbalance handling (default: IMBALANCE_STRATEGY setting)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Continue boosting the current model on rows newer than its watermark")
+    parser.add_argument('--max-new-trees', type=int, default=50,
+                        help="Trees appended by an incremental update")
+    parser.add_argument('--max-total-trees', type=int, default=400,
+                        help="Upper bound on the updated model's tree count")
+    parser.add_argument('--refresh-leaves', action='store_true',
+                        help="Re-fit existing leaf values on the new rows before boosting")
+    parser.add_argument('--since', type=float,
+                        help="Time after which rows are new to the current model; needed when it "
+                             "records no data watermark")
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    data_path = "data/creditcard.csv"
-    train_fraud_model(data_path)
+    args = parse_args()
+    if args.incremental:
+        update_fraud_model(
+            args.data,
+            max_new_trees=args.max_new_trees,
+            max_total_trees=args.max_total_trees,
+            refresh_leaves=args.refresh_leaves,
+            since=args.since
+        )
+    else:
+        train_fraud_model(
+            args.data,
+            n_trials=args.trials,
+            storage=args.storage,
+            study_name=args.study_name,
+            workers=args.workers,
+            imbalance_strategy=args.imbalance_strategy
+        )
@@ -1,77 +1,621 @@
 # src/api/routes.py
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse
+from sqlalchemy.exc import InterfaceError, OperationalError
 from sqlalchemy.orm import Session
-from src.database.connection import get_db
+from typing import Dict, List, Optional, Union
+from src.config.settings import (
+    IDEMPOTENCY_CACHE_SIZE, IDEMPOTENCY_TTL_SECONDS,
+    MICROBATCH_ENABLED, MICROBATCH_MAX_SIZE, MICROBATCH_MAX_WAIT_MS,
+    HEALTH_CHECK_INTERVAL_SECONDS, HEALTH_CHECK_MAX_AGE_SECONDS,
+    VERIFY_DEADLINE_MS, CARD_LOOKUP_BUDGET_MS, PREDICT_BUDGET_MS, STORE_BUDGET_MS,
+    VERIFY_MAX_IN_FLIGHT, DEFERRED_WRITE_QUEUE_SIZE, DEFERRED_WRITE_SHED_DEPTH, VERIFY_BATCH_DEADLINE_MS,
+    EXPLANATION_CACHE_SIZE, EXPLANATION_MAX_BATCH_SIZE, EXPLANATION_MAX_WAIT_MS, EXPLANATION_WORKERS,
+    PROFILE_HEADER_ENABLED, PROFILE_SAMPLE_RATE, PROFILE_TOP_FUNCTIONS, PROFILER_ENDPOINT_ENABLED, PROFILER_MAX_SECONDS
+)
+from src.api.serialization import parse_body, request_body_schema
+from src.database.connection import SessionLocal, engine, engine_router, get_db
+from src.ml.prediction.batcher import MicroBatcher
+from src.ml.prediction.explainer import Explainer
 from src.ml.prediction.predictor import FraudPredictor
-from src.schemas.transaction import TransactionCreate, TransactionResponse
-from src.services.transaction_service import TransactionService
+from src.schemas.transaction import (
+    TransactionCreate, TransactionError, TransactionResponse, transaction_adapter, transaction_batch_adapter
+)
+from src.services.blocklist import blocklist
+from src.services.degradation import Deadline, DeferredWriteQueue, LoadShedder, Overloaded, StageLatency
+from src.services.health import HealthChecker, database_check
+from src.services.idempotency import IdempotencyCache, IdempotencyKeyReused
+from src.services.outbox_relay import outbox_backlog
+from src.services.profiling import SamplingProfiler, collapsed_stacks, profile_stage, profiled_call, request_profile
+from src.services.transaction_service import TransactionService, request_fingerprint
+from datetime import datetime
+import asyncio
 import logging
+import math
 
 # Setup logging
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 predictor = FraudPredictor()
+idempotency_cache = IdempotencyCache(
+    max_entries=IDEMPOTENCY_CACHE_SIZE,
+    ttl_seconds=IDEMPOTENCY_TTL_SECONDS
+)
 
-@router.post("/transactions/verify", response_model=TransactionResponse)
+# Coalesces concurrent requests into one transform and model call
+prediction_batcher = MicroBatcher(
+    predictor.predict_batch,
+    max_batch_size=MICROBATCH_MAX_SIZE,
+    max_wait_ms=MICROBATCH_MAX_WAIT_MS
+) if MICROBATCH_ENABLED else None
+
+# SHAP explanations are computed on request, on their own pool, and cached
+explainer = Explainer(
+    predictor,
+    cache_size=EXPLANATION_CACHE_SIZE,
+    max_batch_size=EXPLANATION_MAX_BATCH_SIZE,
+    max_wait_ms=EXPLANATION_MAX_WAIT_MS,
+    workers=EXPLANATION_WORKERS
+)
+
+# Verify stays within its latency budget by degrading stages that would overrun,
+# deferring writes when the database is slow, and shedding load past the limits
+STAGE_BUDGETS_MS = {
+    'card_lookup': CARD_LOOKUP_BUDGET_MS,
+    'predict': PREDICT_BUDGET_MS,
+    'store': STORE_BUDGET_MS
+}
+stage_latency = StageLatency()
+# Batches take longer than single requests; their stage latencies are kept apart
+batch_stage_latency = StageLatency()
+
+def _persist_deferred(write: Dict) -> None:
+    db = SessionLocal()
+    try:
+        TransactionService(db).store_transaction(**write)
+    finally:
+        db.close()
+
+deferred_writes = DeferredWriteQueue(_persist_deferred, max_size=DEFERRED_WRITE_QUEUE_SIZE)
+load_shedder = LoadShedder(
+    max_in_flight=VERIFY_MAX_IN_FLIGHT,
+    max_deferred_depth=DEFERRED_WRITE_SHED_DEPTH,
+    deferred=deferred_writes
+)
+
+# Stacks of the whole worker on demand (GET /admin/profile)
+sampling_profiler = SamplingProfiler()
+
+def overloaded_response(e: Overloaded) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={'detail': f"Service overloaded: {str(e)}"},
+        headers={'Retry-After': str(math.ceil(e.retry_after_seconds))}
+    )
+
+# Deep checks run in the background; /readyz only reads the cached result
+health_checker = HealthChecker(
+    interval_seconds=HEALTH_CHECK_INTERVAL_SECONDS,
+    max_age_seconds=HEALTH_CHECK_MAX_AGE_SECONDS
+)
+health_checker.register('model', predictor.check_model)
+health_checker.register('database', database_check(engine))
+health_checker.register('outbox', lambda: outbox_backlog(SessionLocal))
+if engine_router.replicas:
+    # Reported only: reads fall back to the primary, so a lagging replica does not make us unready
+    health_checker.register('replicas', engine_router.status)
+if predictor.shadow:
+    health_checker.register('shadow_queue', lambda: {
+        key: value for key, value in predictor.shadow.stats().items() if key in ('queued', 'dropped')
+    })
+
+# The verify routes parse request bytes with precompiled adapters and return
+# ORJSONResponse directly, which skips FastAPI's response_model re-validation;
+# response_model still documents the payload.
+@router.post(
+    "/transactions/verify",
+    response_model=TransactionResponse,
+    response_class=ORJSONResponse,
+    openapi_extra=request_body_schema(transaction_adapter)
+)
 async def verify_transaction(
-    transaction: TransactionCreate,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, max_length=100),
+    x_deadline_ms: Optional[float] = Header(None, gt=0, description="Caller's latency budget in ms"),
+    x_profile: Optional[str] = Header(None, description="timing or cprofile; honoured when PROFILE_HEADER_ENABLED")
 ):
     """
     Verify a transaction for potential fraud.
     Returns enriched transaction data with fraud probability and risk scores.
+    Retries carrying the same Idempotency-Key header (or idempotency_key field)
+    return the original result instead of scoring and storing again; 422 when
+    the key was used for a different request.
+    Within the latency budget (X-Deadline-Ms, or VERIFY_DEADLINE_MS) stages that
+    would overrun are degraded and listed in `degraded`; 503 with Retry-After
+    when overloaded. Profiled requests (X-Profile, or sampled) log their stage
+    breakdown, and X-Profile ones return it in a Server-Timing header.
     """
+    profile = request_profile('verify_transaction', x_profile, PROFILE_HEADER_ENABLED, PROFILE_SAMPLE_RATE)
+    if profile is None:
+        return await _verify_transaction(request, db, idempotency_key, x_deadline_ms)
+    
+    try:
+        with profile.active():
+            response = await _verify_transaction(request, db, idempotency_key, x_deadline_ms)
+        if not profile.sampled:
+            response.headers['Server-Timing'] = profile.server_timing()
+        return response
+    finally:
+        profile.log(PROFILE_TOP_FUNCTIONS)
+
+async def _verify_transaction(request: Request, db: Session, idempotency_key: Optional[str],
+                              x_deadline_ms: Optional[float]):
+    # Started before anything else, so time spent waiting for the body or a thread counts
+    deadline = Deadline(x_deadline_ms or VERIFY_DEADLINE_MS, STAGE_BUDGETS_MS, stage_latency)
+    with profile_stage('parse'):
+        transaction = parse_body(transaction_adapter, await request.body())
     logger.info(f"Processing transaction for card: {transaction.card_id}")
     transaction_service = TransactionService(db)
+    key = idempotency_key or transaction.idempotency_key
     
     try:
+        with load_shedder.admit():
+            if key is None:
+                return ORJSONResponse(await _verify(transaction, transaction_service, deadline=deadline))
+            
+            async def compute():
+                # The key may have been stored by another worker or before a restart
+                existing = await _in_threadpool(transaction_service.find_by_idempotency_key, key)
+                if existing is not None:
+                    transaction_service.check_replay(existing, transaction)
+                    return transaction_service.build_response(existing).model_dump()
+                return await _verify(transaction, transaction_service, key, deadline)
+            
+            return ORJSONResponse(await idempotency_cache.run(key, compute, request_fingerprint(transaction)))
+    
+    except IdempotencyKeyReused as e:
+        logger.warning(f"Rejecting transaction: {str(e)}")
+        raise HTTPException(status_code=422, detail=str(e))
+    except Overloaded as e:
+        logger.warning(f"Rejecting transaction: {str(e)}")
+        return overloaded_response(e)
+    except Exception as e:
+        logger.error(f"Error processing transaction: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error processing transaction: {str(e)}"
+        )
+
+async def _in_threadpool(func, *args):
+    """run_in_threadpool, cProfiled with the request in 'cprofile' mode (cProfile only sees its own thread)"""
+    return await run_in_threadpool(profiled_call, func, *args)
+
+async def _verify(transaction: TransactionCreate, transaction_service: TransactionService,
+                  idempotency_key: Optional[str] = None, deadline: Optional[Deadline] = None) -> dict:
+    """
+    Enrich, score and store one transaction, degrading stages the deadline cannot afford.
+    Blocking stages run on the threadpool, so the event loop keeps admitting
+    (or shedding) other requests meanwhile.
+    """
+    # Blocklisted cards, devices and IPs are HIGH risk without enrichment or scoring
+    with profile_stage('blocklist'):
+        block_reason = await _in_threadpool(_check_blocklist, transaction, transaction_service, deadline)
+    if block_reason is not None:
+        enriched_data, prediction_result = None, transaction_service.blocked_prediction()
+    else:
         # Enrich transaction data
-        enriched_data = transaction_service.enrich_transaction(transaction)
+        with profile_stage('enrich'):
+            enriched_data = await _in_threadpool(transaction_service.enrich_transaction, transaction, deadline)
         logger.info("Transaction data enriched successfully")
         
         # Get fraud prediction with risk components
-        prediction_result = predictor.predict(enriched_data)
+        with profile_stage('predict'):
+            prediction_result = await _predict(transaction_service, enriched_data, deadline)
         logger.info(f"Fraud probability: {prediction_result['fraud_probability']:.4f}")
-        
-        # Store result with all risk components
-        result = transaction_service.store_transaction(
-            transaction_data=transaction,
-            fraud_probability=prediction_result['fraud_probability'],
-            risk_components=prediction_result['risk_components']
+    
+    if deadline is None:
+        with profile_stage('store'):
+            return await _in_threadpool(_store, transaction, transaction_service, enriched_data, prediction_result,
+                                        idempotency_key, block_reason)
+    
+    if deadline.allows('store'):
+        try:
+            with profile_stage('store'), deadline.measure('store'):
+                return await _in_threadpool(_store, transaction, transaction_service, enriched_data,
+                                            prediction_result, idempotency_key, block_reason, list(deadline.degraded))
+        except (OperationalError, InterfaceError) as e:
+            logger.warning(f"Store failed, deferring the write: {str(e)}")
+    
+    with profile_stage('defer_store'):
+        return _defer_store(transaction, transaction_service, enriched_data, prediction_result, idempotency_key,
+                            deadline, block_reason)
+
+def _check_blocklist(transaction: TransactionCreate, transaction_service: TransactionService,
+                     deadline: Optional[Deadline] = None) -> Optional[str]:
+    """Block reason, or None; scoring goes ahead when a filter hit cannot be confirmed within a deadline"""
+    try:
+        return transaction_service.check_blocklist(transaction)
+    except (OperationalError, InterfaceError) as e:
+        if deadline is None:
+            raise
+        logger.warning(f"Blocklist confirmation failed, scoring instead: {str(e)}")
+        transaction_service.db.rollback()
+        deadline.degrade('blocklist_unconfirmed')
+        return None
+
+async def _predict(transaction_service: TransactionService, enriched_data: Dict,
+                   deadline: Optional[Deadline] = None) -> Dict:
+    """Model prediction, or the rule-only score when it would overrun the deadline or fails"""
+    if deadline is None:
+        if prediction_batcher:
+            return await prediction_batcher.submit(enriched_data)
+        return await _in_threadpool(predictor.predict, enriched_data)
+    
+    if deadline.allows('predict'):
+        try:
+            with deadline.measure('predict'):
+                if prediction_batcher:
+                    # The batch keeps running; only this caller stops waiting for it
+                    return await asyncio.wait_for(
+                        prediction_batcher.submit(enriched_data),
+                        timeout=deadline.stage_budget_ms('predict') / 1000
+                    )
+                return await _in_threadpool(predictor.predict, enriched_data)
+        except asyncio.TimeoutError:
+            logger.warning("Prediction overran its budget; using the rule-only score")
+        except Exception as e:
+            logger.error(f"Prediction failed; using the rule-only score: {str(e)}")
+    
+    deadline.degrade('rule_only_score')
+    return transaction_service.rule_only_prediction(enriched_data)
+
+def _defer_store(transaction: TransactionCreate, transaction_service: TransactionService, enriched_data: Optional[Dict],
+                 prediction_result: Dict, idempotency_key: Optional[str], deadline: Deadline,
+                 block_reason: Optional[str] = None) -> dict:
+    """Answer with the decision now and queue its write"""
+    load_shedder.check_deferred()
+    write = {
+        'transaction_data': transaction,
+        'fraud_probability': prediction_result['fraud_probability'],
+        'risk_components': prediction_result['risk_components'],
+        'idempotency_key': idempotency_key,
+        'enriched_data': enriched_data,
+        'timestamp': enriched_data['timestamp'] if enriched_data else datetime.utcnow(),
+        'block_reason': block_reason,
+        # Stored as the response reports them, so a replay of the stored row matches
+        'degraded': [*deadline.degraded, 'persistence_deferred']
+    }
+    if not deferred_writes.submit(write):
+        raise Overloaded("Deferred write queue is full", load_shedder.retry_after(deferred_writes.max_size))
+    deadline.degrade('persistence_deferred')
+    
+    result = transaction_service.decision_response(
+        transaction, write['fraud_probability'], write['risk_components'], enriched_data, write['timestamp']
+    )
+    return {**result.model_dump(), 'block_reason': block_reason, 'degraded': write['degraded']}
+
+async def _verify_batch(transactions: List[TransactionCreate], transaction_service: TransactionService,
+                        deadline: Deadline) -> List[Union[dict, Exception]]:
+    """
+    Result (or exception) of each transaction, in request order. Each idempotency
+    key is computed at most once, across the batch and concurrent requests; its
+    repeats within the batch share the result.
+    """
+    first: Dict[str, int] = {}
+    for i, transaction in enumerate(transactions):
+        if transaction.idempotency_key is not None:
+            first.setdefault(transaction.idempotency_key, i)
+    fingerprints = {key: request_fingerprint(transactions[i]) for key, i in first.items()}
+    results: List[Union[dict, Exception, None]] = [None] * len(transactions)
+    
+    async def compute(keys: List[str]) -> Dict[str, Union[dict, Exception]]:
+        indices = [i for i, transaction in enumerate(transactions) if transaction.idempotency_key is None]
+        indices += [first[key] for key in keys]
+        if not indices:
+            return {}
+        # Enrichment and storage block; keep them off the event loop
+        computed = await run_in_threadpool(
+            _verify_batch_items, [transactions[i] for i in indices], transaction_service, deadline
         )
-        
-        # Add prediction details to response
-        response_data = {
-            **result.dict(),
-            'risk_breakdown': prediction_result['risk_components'],
-            'risk_level': prediction_result['risk_level']
-        }
-        
-        return response_data
-        
+        for i, result in zip(indices, computed):
+            results[i] = result
+        return {key: results[first[key]] for key in keys}
+    
+    keyed = await idempotency_cache.run_many(fingerprints, compute)
+    for i, transaction in enumerate(transactions):
+        key = transaction.idempotency_key
+        if key is None:
+            continue
+        if i != first[key] and request_fingerprint(transaction) != fingerprints[key]:
+            results[i] = IdempotencyKeyReused(key)
+        else:
+            results[i] = keyed[key]
+    return results
+
+def _verify_batch_items(transactions: List[TransactionCreate], transaction_service: TransactionService,
+                        deadline: Deadline) -> List[Union[dict, Exception]]:
+    """
+    Enrich and store each transaction, scoring all of them with one model call.
+    Each is committed on its own, so one that fails gets its exception in place
+    of its result instead of failing the ones already stored. Every transaction
+    has its own Deadline (and `degraded`), expiring with the batch's.
+    """
+    results: List[Union[dict, Exception, None]] = [None] * len(transactions)
+    deadlines = [Deadline(deadline.remaining_ms(), deadline.stage_budgets_ms, deadline.latency) for _ in transactions]
+    enriched: Dict[int, Dict] = {}
+    for i, transaction in enumerate(transactions):
+        try:
+            if transaction.idempotency_key is not None:
+                existing = transaction_service.find_by_idempotency_key(transaction.idempotency_key)
+                if existing is not None:
+                    transaction_service.check_replay(existing, transaction)
+                    results[i] = transaction_service.build_response(existing).model_dump()
+                    continue
+            
+            block_reason = _check_blocklist(transaction, transaction_service, deadlines[i])
+            if block_reason is not None:
+                results[i] = _store_or_defer(transaction, transaction_service, None,
+                                             transaction_service.blocked_prediction(), deadlines[i], block_reason)
+                continue
+            enriched[i] = transaction_service.enrich_transaction(transaction, deadlines[i])
+        except Exception as e:
+            results[i] = _batch_item_failed(transaction_service, e)
+    
+    scored = list(enriched)
+    predictions = _predict_batch(transaction_service, [enriched[i] for i in scored], [deadlines[i] for i in scored],
+                                 deadline)
+    for i, prediction_result in zip(scored, predictions):
+        try:
+            results[i] = _store_or_defer(transactions[i], transaction_service, enriched[i], prediction_result,
+                                         deadlines[i])
+        except Exception as e:
+            results[i] = _batch_item_failed(transaction_service, e)
+    return results
+
+def _predict_batch(transaction_service: TransactionService, enriched: List[Dict], deadlines: List[Deadline],
+                   deadline: Deadline) -> List[Dict]:
+    """One model call for the batch, or the rule-only scores when it would overrun the deadline or fails"""
+    if not enriched:
+        return []
+    if deadline.allows('predict'):
+        try:
+            with deadline.measure('predict'):
+                return predictor.predict_batch(enriched)
+        except Exception as e:
+            logger.error(f"Batch prediction failed; using the rule-only scores: {str(e)}")
+    
+    for item_deadline in deadlines:
+        item_deadline.degrade('rule_only_score')
+    return [transaction_service.rule_only_prediction(enriched_data) for enriched_data in enriched]
+
+def _store_or_defer(transaction: TransactionCreate, transaction_service: TransactionService,
+                    enriched_data: Optional[Dict], prediction_result: Dict, deadline: Deadline,
+                    block_reason: Optional[str] = None) -> dict:
+    """Store within the deadline, or defer the write as single verify does"""
+    if deadline.allows('store'):
+        try:
+            with deadline.measure('store'):
+                return _store(transaction, transaction_service, enriched_data, prediction_result,
+                              transaction.idempotency_key, block_reason, list(deadline.degraded))
+        except (OperationalError, InterfaceError) as e:
+            logger.warning(f"Store failed, deferring the write: {str(e)}")
+    return _defer_store(transaction, transaction_service, enriched_data, prediction_result,
+                        transaction.idempotency_key, deadline, block_reason)
+
+def _batch_item_failed(transaction_service: TransactionService, e: Exception) -> Exception:
+    logger.error(f"Error processing transaction in batch: {str(e)}")
+    # Leave the session usable for the rest of the batch
+    transaction_service.db.rollback()
+    return e
+
+def _batch_item_error(transaction: TransactionCreate, e: Exception) -> dict:
+    """The error entry returned in place of a failed batch item"""
+    if isinstance(e, IdempotencyKeyReused):
+        status_code = 422
+    elif isinstance(e, Overloaded):
+        status_code = 503
+    else:
+        status_code = 500
+    return TransactionError(
+        idempotency_key=transaction.idempotency_key, status_code=status_code, detail=str(e)
+    ).model_dump()
+
+def _store(transaction: TransactionCreate, transaction_service: TransactionService, enriched_data: Optional[Dict],
+           prediction_result: Dict, idempotency_key: Optional[str] = None, block_reason: Optional[str] = None,
+           degraded: Optional[List[str]] = None) -> dict:
+    """Store one scored (or blocked) transaction and return the response payload"""
+    # Store result with all risk components
+    result = transaction_service.store_transaction(
+        transaction_data=transaction,
+        fraud_probability=prediction_result['fraud_probability'],
+        risk_components=prediction_result['risk_components'],
+        idempotency_key=idempotency_key,
+        enriched_data=enriched_data,
+        block_reason=block_reason,
+        degraded=degraded
+    )
+    
+    # The stored risk level (model probability and rule scores) is reported, as replays of the row do
+    return result.model_dump()
+
+@router.post(
+    "/transactions/verify/batch",
+    response_model=List[Union[TransactionResponse, TransactionError]],
+    response_class=ORJSONResponse,
+    openapi_extra=request_body_schema(transaction_batch_adapter)
+)
+async def verify_transactions(
+    request: Request,
+    db: Session = Depends(get_db),
+    x_deadline_ms: Optional[float] = Header(None, gt=0, description="Caller's latency budget in ms")
+):
+    """
+    Verify a batch of transactions (at most VERIFY_BATCH_MAX_SIZE) with a single
+    model call. Results are returned in request order. Transactions whose
+    idempotency_key was already used return the original result, and repeats
+    of a key within the batch share one. Each transaction is stored on its own;
+    one that fails gets an error entry (status_code and detail, 422 for a key
+    used for a different request) in place of its result. The batch is admitted
+    like one verify request and degraded within its latency budget
+    (X-Deadline-Ms, or VERIFY_BATCH_DEADLINE_MS); 503 with Retry-After when
+    overloaded.
+    """
+    deadline = Deadline(x_deadline_ms or VERIFY_BATCH_DEADLINE_MS, {}, batch_stage_latency)
+    transactions = parse_body(transaction_batch_adapter, await request.body())
+    logger.info(f"Processing batch of {len(transactions)} transactions")
+    transaction_service = TransactionService(db)
+    
+    try:
+        with load_shedder.admit():
+            results = await _verify_batch(transactions, transaction_service, deadline)
+    except Overloaded as e:
+        logger.warning(f"Rejecting transaction batch: {str(e)}")
+        return overloaded_response(e)
     except Exception as e:
-        logger.error(f"Error processing transaction: {str(e)}")
+        logger.error(f"Error processing transaction batch: {str(e)}")
         raise HTTPException(
             status_code=500,
-            detail=f"Error processing transaction: {str(e)}"
+            detail=f"Error processing transaction batch: {str(e)}"
+        )
+    
+    return ORJSONResponse([
+        _batch_item_error(transaction, result) if isinstance(result, Exception) else result
+        for transaction, result in zip(transactions, results)
+    ])
+
+@router.get("/transactions/{transaction_id}/explanation")
+async def explain_transaction(
+    transaction_id: int,
+    top: Optional[int] = Query(None, ge=1, description="Return only the largest contributions"),
+    db: Session = Depends(get_db)
+):
+    """
+    Per-feature SHAP contributions of the current model for a stored transaction,
+    largest first. Contributions are in log-odds and sum with base_value to margin.
+    """
+    transaction_service = TransactionService(db)
+    transaction = transaction_service.get_transaction(transaction_id)
+    if transaction is None:
+        raise HTTPException(status_code=404, detail=f"Transaction {transaction_id} not found")
+    
+    features, timestamp = transaction_service.scoring_features(transaction)
+    served = {
+        'transaction_id': transaction_id,
+        'fraud_probability': transaction.fraud_probability,
+        'risk_level': transaction.risk_level
+    }
+    # Hand the connection back before waiting on the batch; otherwise a burst of
+    # explanation requests holds the whole pool while their batch is computed
+    db.close()
+    
+    try:
+        explanation = await explainer.explain(transaction_id, features, timestamp)
+    except Exception as e:
+        logger.error(f"Error explaining transaction {transaction_id}: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error explaining transaction: {str(e)}"
         )
+    
+    return {
+        **served,
+        **explanation,
+        'contributions': explanation['contributions'][:top]
+    }
+
+@router.get("/transactions/verify/degradation")
+async def degradation_stats():
+    """
+    Recent stage latencies, degradations applied, deferred write backlog and load shed
+    """
+    return {
+        'deadline_ms': VERIFY_DEADLINE_MS,
+        'stage_budgets_ms': STAGE_BUDGETS_MS,
+        **stage_latency.stats(),
+        'batch_deadline_ms': VERIFY_BATCH_DEADLINE_MS,
+        'batch': batch_stage_latency.stats(),
+        'deferred_writes': deferred_writes.stats(),
+        'load_shedding': load_shedder.stats()
+    }
+
+@router.get("/admin/profile", response_class=PlainTextResponse)
+async def sample_profile(
+    seconds: float = Query(10.0, gt=0, description="How long to sample, at most PROFILER_MAX_SECONDS"),
+    interval_ms: float = Query(5.0, ge=1, le=1000, description="Time between samples")
+):
+    """
+    Sample the stacks of every thread in this worker for `seconds` and return
+    them as collapsed stacks (`frame;frame;frame count` lines) for flamegraph.pl
+    or speedscope. Requests keep being served while sampling. Only available
+    with PROFILER_ENDPOINT_ENABLED; 409 while another run is in progress.
+    """
+    if not PROFILER_ENDPOINT_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if seconds > PROFILER_MAX_SECONDS:
+        raise HTTPException(status_code=422, detail=f"seconds must be at most {PROFILER_MAX_SECONDS}")
+    try:
+        stacks = await run_in_threadpool(sampling_profiler.run, seconds, interval_ms / 1000)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(collapsed_stacks(stacks))
+
+@router.get("/blocklist")
+async def blocklist_stats():
+    """
+    Loaded blocklist filter version and entry counts, with how many checks
+    hit a filter, were false positives, and were blocked.
+    """
+    return blocklist.stats()
+
+@router.get("/model/explanations")
+async def explanation_stats():
+    """
+    Explanation cache and batching statistics
+    """
+    return explainer.stats()
 
+@router.get("/model/cascade")
+async def cascade_stats():
+    """
+    Cascade scoring statistics, including the fraction of traffic short-circuited
+    """
+    return predictor.cascade_stats()
 
+@router.get("/model/shadow")
+async def shadow_stats():
+    """
+    Shadow scoring statistics for challenger models
+    """
+    return predictor.shadow_stats()
+
+@router.get("/livez")
+async def liveness():
+    """
+    Liveness probe: the process is up and serving requests. Does no other work.
+    """
+    return {"status": "alive"}
+
+@router.get("/readyz")
+async def readiness():
+    """
+    Readiness probe: cached result of the background model, database and queue checks
+    """
+    ready, result = health_checker.readiness()
+    return JSONResponse(status_code=200 if ready else 503, content=result)
 
 @router.get("/health")
 async def health_check():
     """
     Health check endpoint to verify the service is running
     """
-    try:
-        # Basic model health check
-        predictor.health_check()
-        return {"status": "healthy", "model_loaded": True}
-    except Exception as e:
-        logger.error(f"Health check failed: {str(e)}")
+    # Basic model health check; it logs and returns False on failure instead of raising
+    if not predictor.health_check():
         raise HTTPException(
             status_code=500,
-            detail=f"Service unhealthy: {str(e)}"
-        )
\ No newline at end of file
+            detail="Service unhealthy: model health check failed"
+        )
+    return {"status": "healthy", "model_loaded": True}
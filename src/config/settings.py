@@ -4,3 +4,145 @@ from dotenv import load_dotenv
 load_dotenv()  # Load environment variables from a .env file if it exists
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+
+# Read replicas for read-only queries (comma-separated URLs; none by default).
+# A replica is used only while its lag plus the age of the last lag probe is
+# within the staleness budget; otherwise reads go to DATABASE_URL.
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+REPLICA_MAX_STALENESS_SECONDS = float(os.getenv("REPLICA_MAX_STALENESS_SECONDS", "5"))
+REPLICA_CHECK_INTERVAL_SECONDS = float(os.getenv("REPLICA_CHECK_INTERVAL_SECONDS", "1"))
+
+# Training data preparation
+TRAINING_CHUNK_SIZE = int(os.getenv("TRAINING_CHUNK_SIZE", "100000"))
+ROBUST_SCALER_SAMPLE_SIZE = int(os.getenv("ROBUST_SCALER_SAMPLE_SIZE", "200000"))
+FEATURE_CACHE_DIR = os.getenv("FEATURE_CACHE_DIR", os.path.join("models", "cache"))
+
+# Model training (0 uses every available core)
+TRAINING_NTHREAD = int(os.getenv("TRAINING_NTHREAD", "0"))
+
+# Optuna study storage, e.g. sqlite:///models/optuna.db or a postgresql:// URL.
+# Leave unset for an in-memory study.
+OPTUNA_STORAGE = os.getenv("OPTUNA_STORAGE")
+OPTUNA_STUDY_NAME = os.getenv("OPTUNA_STUDY_NAME", "fraud-xgboost")
+
+# Class imbalance handling: smote, chunked_smote, undersample or weight
+IMBALANCE_STRATEGY = os.getenv("IMBALANCE_STRATEGY", "smote")
+
+# Cascade scoring (band calibrated by scripts/calibrate_cascade.py)
+CASCADE_ENABLED = os.getenv("CASCADE_ENABLED", "false").lower() == "true"
+
+# Idempotent /transactions/verify retries
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "300"))
+
+# Online feature store memory tier
+FEATURE_STORE_CACHE_SIZE = int(os.getenv("FEATURE_STORE_CACHE_SIZE", "100000"))
+FEATURE_STORE_TTL_SECONDS = float(os.getenv("FEATURE_STORE_TTL_SECONDS", "60"))
+
+# IP range reputation and geolocation risks (scripts/build_ip_ranges.py publishes
+# tables under IP_RANGES_DIR; workers follow its `current` link)
+IP_RANGES_DIR = os.getenv("IP_RANGES_DIR", os.path.join("models", "ip_ranges"))
+IP_RANGES_RELOAD_SECONDS = float(os.getenv("IP_RANGES_RELOAD_SECONDS", "30"))
+
+# Card-device/card-IP link graph for fraud-ring features. Counts are of distinct
+# neighbours seen within the window; edges not seen within the retention period
+# are dropped at compaction, which the builder runs every LINK_GRAPH_COMPACT_EVERY new edges.
+# scripts/build_link_graph.py publishes graphs built from the transactions table
+# under LINK_GRAPH_DIR; workers follow its `current` link, and add the transactions
+# they store, up to LINK_GRAPH_MAX_LOCAL_EDGES until a new version covers them
+LINK_GRAPH_ENABLED = os.getenv("LINK_GRAPH_ENABLED", "true").lower() == "true"
+LINK_GRAPH_MAX_DEGREE = int(os.getenv("LINK_GRAPH_MAX_DEGREE", "64"))
+LINK_GRAPH_WINDOW_SECONDS = float(os.getenv("LINK_GRAPH_WINDOW_SECONDS", str(24 * 3600)))
+LINK_GRAPH_RETENTION_SECONDS = float(os.getenv("LINK_GRAPH_RETENTION_SECONDS", str(30 * 24 * 3600)))
+LINK_GRAPH_COMPACT_EVERY = int(os.getenv("LINK_GRAPH_COMPACT_EVERY", "100000"))
+LINK_GRAPH_DIR = os.getenv("LINK_GRAPH_DIR", os.path.join("models", "link_graph"))
+LINK_GRAPH_RELOAD_SECONDS = float(os.getenv("LINK_GRAPH_RELOAD_SECONDS", "60"))
+LINK_GRAPH_MAX_LOCAL_EDGES = int(os.getenv("LINK_GRAPH_MAX_LOCAL_EDGES", "100000"))
+
+# Card counts at which a shared device, a shared IP or a card's cluster make
+# link_risk_score 1
+LINK_RISK_DEVICE_CARDS = int(os.getenv("LINK_RISK_DEVICE_CARDS", "5"))
+LINK_RISK_IP_CARDS = int(os.getenv("LINK_RISK_IP_CARDS", "20"))
+LINK_RISK_COMPONENT_CARDS = int(os.getenv("LINK_RISK_COMPONENT_CARDS", "50"))
+
+# Blocklist pre-check of /transactions/verify. scripts/build_blocklist.py publishes
+# filters built from blocklist_entries under BLOCKLIST_DIR; workers follow its
+# `current` link, and confirm filter hits against the table
+BLOCKLIST_ENABLED = os.getenv("BLOCKLIST_ENABLED", "true").lower() == "true"
+BLOCKLIST_DIR = os.getenv("BLOCKLIST_DIR", os.path.join("models", "blocklist"))
+BLOCKLIST_RELOAD_SECONDS = float(os.getenv("BLOCKLIST_RELOAD_SECONDS", "30"))
+BLOCKLIST_FALSE_POSITIVE_RATE = float(os.getenv("BLOCKLIST_FALSE_POSITIVE_RATE", "0.001"))
+
+# Shadow scoring of challenger models (fraud_model_*.json in SHADOW_MODEL_DIR)
+SHADOW_ENABLED = os.getenv("SHADOW_ENABLED", "false").lower() == "true"
+SHADOW_MODEL_DIR = os.getenv("SHADOW_MODEL_DIR", os.path.join("models", "challengers"))
+SHADOW_STATS_FILE = os.getenv("SHADOW_STATS_FILE", os.path.join("models", "shadow_stats.json"))
+SHADOW_WORKERS = int(os.getenv("SHADOW_WORKERS", "1"))
+SHADOW_QUEUE_SIZE = int(os.getenv("SHADOW_QUEUE_SIZE", "10000"))
+SHADOW_BATCH_SIZE = int(os.getenv("SHADOW_BATCH_SIZE", "256"))
+
+# Micro-batching of concurrent /transactions/verify model calls
+MICROBATCH_ENABLED = os.getenv("MICROBATCH_ENABLED", "false").lower() == "true"
+MICROBATCH_MAX_SIZE = int(os.getenv("MICROBATCH_MAX_SIZE", "32"))
+MICROBATCH_MAX_WAIT_MS = float(os.getenv("MICROBATCH_MAX_WAIT_MS", "2"))
+
+# Latency budget of POST /transactions/verify and of its stages, in ms. A stage
+# whose recent latency does not fit in its budget (capped by what is left of the
+# request's) is degraded: the card lookup is skipped, the model is replaced by
+# the rule scores, or the write is deferred. Callers may send X-Deadline-Ms.
+VERIFY_DEADLINE_MS = float(os.getenv("VERIFY_DEADLINE_MS", "50"))
+CARD_LOOKUP_BUDGET_MS = float(os.getenv("CARD_LOOKUP_BUDGET_MS", "10"))
+PREDICT_BUDGET_MS = float(os.getenv("PREDICT_BUDGET_MS", "25"))
+STORE_BUDGET_MS = float(os.getenv("STORE_BUDGET_MS", "20"))
+
+# Load shedding: 503 with Retry-After above these limits
+VERIFY_MAX_IN_FLIGHT = int(os.getenv("VERIFY_MAX_IN_FLIGHT", "512"))
+DEFERRED_WRITE_QUEUE_SIZE = int(os.getenv("DEFERRED_WRITE_QUEUE_SIZE", "20000"))
+DEFERRED_WRITE_SHED_DEPTH = int(os.getenv("DEFERRED_WRITE_SHED_DEPTH", "10000"))
+
+# Debug profiling. With PROFILE_HEADER_ENABLED an `X-Profile: timing` (or `cprofile`)
+# header on /transactions/verify returns its stage breakdown in Server-Timing;
+# PROFILE_SAMPLE_RATE profiles that share of requests into the log. Off, either
+# costs one context variable lookup per stage. GET /admin/profile samples every
+# thread of the worker when PROFILER_ENDPOINT_ENABLED
+PROFILE_HEADER_ENABLED = os.getenv("PROFILE_HEADER_ENABLED", "false").lower() == "true"
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_TOP_FUNCTIONS = int(os.getenv("PROFILE_TOP_FUNCTIONS", "25"))
+PROFILER_ENDPOINT_ENABLED = os.getenv("PROFILER_ENDPOINT_ENABLED", "false").lower() == "true"
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "60"))
+
+# Largest accepted POST /transactions/verify/batch payload, and the batch's
+# latency budget (degraded like a single verify's; callers may send X-Deadline-Ms)
+VERIFY_BATCH_MAX_SIZE = int(os.getenv("VERIFY_BATCH_MAX_SIZE", "500"))
+VERIFY_BATCH_DEADLINE_MS = float(os.getenv("VERIFY_BATCH_DEADLINE_MS", "2000"))
+
+# On-demand SHAP explanations (GET /transactions/{id}/explanation)
+EXPLANATION_CACHE_SIZE = int(os.getenv("EXPLANATION_CACHE_SIZE", "10000"))
+EXPLANATION_MAX_BATCH_SIZE = int(os.getenv("EXPLANATION_MAX_BATCH_SIZE", "64"))
+EXPLANATION_MAX_WAIT_MS = float(os.getenv("EXPLANATION_MAX_WAIT_MS", "5"))
+EXPLANATION_WORKERS = int(os.getenv("EXPLANATION_WORKERS", "1"))
+
+# Create missing tables when the app starts (schemas are otherwise managed by Alembic)
+CREATE_TABLES_ON_STARTUP = os.getenv("CREATE_TABLES_ON_STARTUP", "true").lower() == "true"
+
+# Background readiness checks behind /readyz; results older than the max age count as not ready
+HEALTH_CHECK_INTERVAL_SECONDS = float(os.getenv("HEALTH_CHECK_INTERVAL_SECONDS", "5"))
+HEALTH_CHECK_MAX_AGE_SECONDS = float(os.getenv("HEALTH_CHECK_MAX_AGE_SECONDS", "30"))
+
+# Outbox relay (scripts/run_outbox_relay.py)
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "500"))
+OUTBOX_POLL_INTERVAL_SECONDS = float(os.getenv("OUTBOX_POLL_INTERVAL_SECONDS", "1"))
+OUTBOX_METRICS_PORT = int(os.getenv("OUTBOX_METRICS_PORT", "9108"))
+KAFKA_BOOTSTRAP_SERVERS = os.getenv("KAFKA_BOOTSTRAP_SERVERS", "localhost:9092")
+KAFKA_DECISIONS_TOPIC = os.getenv("KAFKA_DECISIONS_TOPIC", "fraud_decisions")
+
+# Historical rescoring (scripts/backfill_scores.py): ids per work unit, rows per UPDATE
+BACKFILL_RANGE_SIZE = int(os.getenv("BACKFILL_RANGE_SIZE", "50000"))
+BACKFILL_BATCH_SIZE = int(os.getenv("BACKFILL_BATCH_SIZE", "5000"))
+
+# Offline file scoring (scripts/score_file.py): rows per chunk handed to a worker
+BULK_SCORING_CHUNK_SIZE = int(os.getenv("BULK_SCORING_CHUNK_SIZE", "50000"))
+
+# Buckets for hashed card, device, IP and merchant features. Training data exported
+# with one value must be scored with the same value.
+FEATURE_HASH_BUCKETS = int(os.getenv("FEATURE_HASH_BUCKETS", "100"))
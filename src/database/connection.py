@@ -1,10 +1,20 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
-from src.config.settings import DATABASE_URL
+from src.config.settings import (
+    DATABASE_URL, DATABASE_REPLICA_URLS, REPLICA_MAX_STALENESS_SECONDS, REPLICA_CHECK_INTERVAL_SECONDS
+)
+from src.database.routing import EngineRouter, RoutingSession
 
+# The primary takes every write; replica_read() queries may go to a replica
 engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+engine_router = EngineRouter(
+    engine,
+    [create_engine(url) for url in DATABASE_REPLICA_URLS],
+    max_staleness_seconds=REPLICA_MAX_STALENESS_SECONDS,
+    check_interval_seconds=REPLICA_CHECK_INTERVAL_SECONDS
+)
+SessionLocal = sessionmaker(class_=RoutingSession, router=engine_router, autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 def get_db():
@@ -13,5 +23,3 @@ def get_db():
         yield db
     finally:
         db.close()
-
-
@@ -1,6 +1,6 @@
 #src/database/models.py
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, ARRAY, Numeric
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, ARRAY, Numeric, JSON
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -53,11 +53,23 @@ class Transaction(Base):
     amount_risk_score = Column(Float, nullable=True, default=0.0)
     pattern_risk_score = Column(Float, nullable=True, default=0.0)
     user_behavior_risk_score = Column(Float, nullable=True, default=0.0)
+    link_risk_score = Column(Float, nullable=True, default=0.0)
 
     # Metadata
     analysis_version = Column(String(50), nullable=True)  # To track which model version made the prediction
     analyzed_at = Column(DateTime, nullable=True)  # When the risk analysis was performed
 
+    # Client-supplied key that makes retried verifications idempotent
+    idempotency_key = Column(String(100), unique=True, nullable=True)
+    # Hash of the request stored under the key; a retry with another body is rejected
+    request_fingerprint = Column(String(64), nullable=True)
+
+    # Set when a blocklist hit decided the transaction without scoring
+    block_reason = Column(String(150), nullable=True)
+
+    # Steps skipped to meet the latency budget when the transaction was decided
+    degraded = Column(JSON, nullable=True)
+
     # Relationships
     location = relationship("Location", back_populates="transactions")
     fraud_case = relationship("FraudCase", back_populates="transaction", uselist=False)
@@ -94,4 +106,36 @@ class TransactionPattern(Base):
     avg_daily_transactions = Column(Integer)
     common_merchants = Column(ARRAY(String))
     common_locations = Column(ARRAY(Integer))
-    last_updated = Column(DateTime, default=datetime.utcnow)
\ No newline at end of file
+    last_updated = Column(DateTime, default=datetime.utcnow)
+
+class EntityFeature(Base):
+    __tablename__ = 'entity_features'
+
+    entity_type = Column(String(20), primary_key=True)  # card, merchant, location, device, ip
+    entity_id = Column(String(100), primary_key=True)
+    feature_name = Column(String(50), primary_key=True)
+    version = Column(Integer, primary_key=True)
+    value = Column(JSON)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class BlocklistEntry(Base):
+    __tablename__ = 'blocklist_entries'
+
+    # Compromised cards, devices and IPs; scripts/build_blocklist.py compiles them into filters
+    entity_type = Column(String(20), primary_key=True)  # card, device, ip
+    entity_id = Column(String(100), primary_key=True)
+    reason = Column(String(100), nullable=False)
+    source = Column(String(100))
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class OutboxEvent(Base):
+    __tablename__ = 'outbox_events'
+
+    # Written in the same commit as its transaction and drained by scripts/run_outbox_relay.py
+    id = Column(Integer, primary_key=True)
+    event_type = Column(String(50), nullable=False)
+    transaction_id = Column(Integer, ForeignKey('transactions.transaction_id'), nullable=False)
+    payload = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    processed_at = Column(DateTime, nullable=True, index=True)
+    transaction = relationship("Transaction")
@@ -0,0 +1,203 @@
+# src/database/routing.py
+
+import itertools
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional, TypeVar
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.dml import UpdateBase
+from src.utils.logging_config import setup_logging
+
+# Setup logger
+logger = setup_logging(__name__)
+
+T = TypeVar('T')
+
+# Seconds the replica is behind the primary; 0 when it has replayed everything it
+# received (an idle replica's last replay timestamp keeps ageing), and 0 on a
+# server that is not a standby at all
+POSTGRES_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+def default_lag_probe(connection: Connection) -> float:
+    """Replication lag in seconds; databases without replication metadata report 0"""
+    if connection.dialect.name == 'postgresql':
+        return float(connection.execute(POSTGRES_LAG_SQL).scalar() or 0.0)
+    connection.execute(text("SELECT 1"))
+    return 0.0
+
+class _Replica:
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.name = engine.url.render_as_string(hide_password=True)
+        self.healthy = False
+        self.lag_seconds: Optional[float] = None
+        self.checked_at: Optional[float] = None
+        self.error: Optional[str] = None
+
+class EngineRouter:
+    """
+    Picks the engine for read-only queries: a replica whose data is within the
+    caller's staleness budget, or the primary.
+
+    Replica lag is probed on a background thread, so picking an engine never
+    waits on the network. A replica's staleness is bounded by its measured lag
+    plus the age of that measurement; replicas that are unchecked, failing or
+    over budget are skipped. A replica that errors during a read is taken out
+    until its next successful probe.
+    """
+
+    def __init__(self, primary: Engine, replicas: List[Engine] = None,
+                 max_staleness_seconds: float = 5.0, check_interval_seconds: float = 1.0,
+                 lag_probe: Callable[[Connection], float] = default_lag_probe):
+        self.primary = primary
+        self.replicas = [_Replica(engine) for engine in replicas or []]
+        self.max_staleness_seconds = max_staleness_seconds
+        self.check_interval_seconds = check_interval_seconds
+        self.lag_probe = lag_probe
+        self._next = itertools.count()
+        self._counts = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def engines(self) -> List[Engine]:
+        return [self.primary] + [replica.engine for replica in self.replicas]
+
+    def check(self) -> None:
+        """Probe every replica once"""
+        for replica in self.replicas:
+            try:
+                with replica.engine.connect() as connection:
+                    lag = self.lag_probe(connection)
+            except Exception as e:
+                if replica.healthy:
+                    logger.warning(f"Replica {replica.name} is unavailable: {str(e)}")
+                replica.healthy, replica.error = False, str(e)
+                replica.checked_at = time.monotonic()
+            else:
+                if not replica.healthy:
+                    logger.info(f"Replica {replica.name} is available, {lag:.2f}s behind")
+                # Lag and check time first: readers only look at them once healthy is set
+                replica.lag_seconds, replica.checked_at, replica.error = lag, time.monotonic(), None
+                replica.healthy = True
+
+    def read_engine(self, max_staleness_seconds: float = None) -> Engine:
+        """A replica within the staleness budget, round-robin, or else the primary"""
+        if not self.replicas:
+            return self.primary
+        budget = self.max_staleness_seconds if max_staleness_seconds is None else max_staleness_seconds
+        now = time.monotonic()
+        start = next(self._next)
+        for offset in range(len(self.replicas)):
+            replica = self.replicas[(start + offset) % len(self.replicas)]
+            if replica.healthy and replica.lag_seconds + (now - replica.checked_at) <= budget:
+                self._count('replica_reads')
+                return replica.engine
+        self._count('primary_fallbacks')
+        return self.primary
+
+    def mark_failed(self, engine: Engine, error: Exception) -> None:
+        for replica in self.replicas:
+            if replica.engine is engine:
+                logger.warning(f"Read on replica {replica.name} failed, using the primary: {str(error)}")
+                replica.healthy, replica.error = False, str(error)
+                self._count('replica_errors')
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._counts[key] += 1
+
+    def status(self) -> Dict:
+        now = time.monotonic()
+        with self._lock:
+            counts = dict(self._counts)
+        return {
+            'max_staleness_seconds': self.max_staleness_seconds,
+            'replicas': [
+                {
+                    'url': replica.name,
+                    'healthy': replica.healthy,
+                    'lag_seconds': replica.lag_seconds,
+                    'checked_seconds_ago': round(now - replica.checked_at, 3) if replica.checked_at else None,
+                    'error': replica.error
+                }
+                for replica in self.replicas
+            ],
+            **counts
+        }
+
+    def start(self) -> None:
+        """Probe once, then keep probing in the background; a no-op without replicas"""
+        if not self.replicas:
+            return
+        self.check()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="replica-lag-probe", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.check_interval_seconds):
+            self.check()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+class RoutingSession(Session):
+    """
+    Session that binds to the primary, except for queries run through
+    replica_read(). Once the session has written anything, every later query
+    stays on the primary, so a request always reads its own writes.
+    """
+
+    def __init__(self, router: EngineRouter = None, **kwargs):
+        super().__init__(**kwargs)
+        self.router = router
+        self._read_bind: Optional[Engine] = None
+        self._wrote = False
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._flushing or isinstance(clause, UpdateBase):
+            self._wrote = True
+        elif self._read_bind is not None:
+            return self._read_bind
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+def replica_read(db: Session, read: Callable[[], T], max_staleness_seconds: float = None) -> T:
+    """
+    Run `read` with its queries on a replica within the staleness budget.
+
+    Falls back to the primary when no replica qualifies, when the session has
+    written or has pending changes, and when the replica fails mid-read (the
+    read is then repeated on the primary). Plain sessions just run `read`.
+    """
+    router = getattr(db, 'router', None)
+    # Nested reads stay on the replica already chosen
+    if router is None or db._read_bind is not None or db._wrote or db.new or db.dirty or db.deleted:
+        return read()
+    engine = router.read_engine(max_staleness_seconds)
+    if engine is router.primary:
+        return read()
+
+    db._read_bind = engine
+    try:
+        return read()
+    except (OperationalError, InterfaceError) as e:
+        router.mark_failed(engine, e)
+        db._read_bind = None
+        # Nothing is pending (checked above), so this only drops the broken replica connection
+        db.rollback()
+        return read()
+    finally:
+        db._read_bind = None
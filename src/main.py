@@ -1,13 +1,32 @@
 from fastapi import FastAPI
-from src.api.routes import router as api_router
-from src.database.connection import engine
+from src.api.routes import router as api_router, predictor, health_checker, deferred_writes
+from src.config.settings import CREATE_TABLES_ON_STARTUP, LINK_GRAPH_ENABLED
+from src.database.connection import engine, engine_router
 from src.database.models import Base
+from src.services.link_graph import link_graph
 from fastapi.middleware.cors import CORSMiddleware
 
 app = FastAPI(title="Fraud Detection System")
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+@app.on_event("startup")
+def create_tables():
+    # Schemas are managed by Alembic; this only fills in missing tables for local runs.
+    # scripts/serve.py disables it in workers and creates tables once before forking.
+    if CREATE_TABLES_ON_STARTUP:
+        Base.metadata.create_all(bind=engine)
+
+@app.on_event("startup")
+def start_health_checks():
+    # Started per worker, after any fork
+    engine_router.start()
+    health_checker.start()
+    deferred_writes.start()
+
+@app.on_event("startup")
+def load_link_graph():
+    # Map the published graph before the first request, then follow new versions off the request path
+    if LINK_GRAPH_ENABLED:
+        link_graph.start()
 
 if __name__ == "__main__":
     import uvicorn
@@ -25,4 +44,16 @@ app.add_middleware(
 # Include API routes
 app.include_router(api_router, prefix="/api/v1")
 
+@app.on_event("shutdown")
+def stop_background_work():
+    health_checker.stop()
+    # Apply writes deferred during a slowdown before the worker exits
+    deferred_writes.stop()
+    engine_router.stop()
+    if LINK_GRAPH_ENABLED:
+        link_graph.stop()
+    # Write the final challenger stats before the workers exit
+    if predictor.shadow:
+        predictor.shadow.stop()
+
 
@@ -0,0 +1,104 @@
+# src/ml/prediction/batcher.py
+
+import asyncio
+import logging
+from typing import Any, Callable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-item calls into batched calls.
+
+    Items submitted from the event loop are collected until `max_batch_size`
+    are pending or `max_wait_ms` has passed since the first one arrived. The
+    batch is then passed to `process_batch` in a worker thread, and each
+    caller's future gets its own result. `process_batch` must return one
+    result per item, in order; if it fails or returns another count, the
+    items are retried one at a time.
+    """
+
+    def __init__(self, process_batch: Callable[[List[Any]], List[Any]],
+                 max_batch_size: int = 32, max_wait_ms: float = 2.0, executor=None):
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.executor = executor
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        # The loop only keeps weak references to tasks
+        self._tasks: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.items = 0
+        self.retried_items = 0
+
+    async def submit(self, item: Any) -> Any:
+        """Queue one item and wait for its result"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        self.batches += 1
+        self.items += len(batch)
+        try:
+            try:
+                await self._process(batch)
+            except Exception as e:
+                if len(batch) == 1:
+                    _fail(batch, e)
+                    return
+                # Retry one at a time so a single bad item only fails its own caller
+                logger.warning(f"Batch of {len(batch)} failed ({str(e)}); retrying items individually")
+                for single in batch:
+                    self.retried_items += 1
+                    try:
+                        await self._process([single])
+                    except Exception as e:
+                        _fail([single], e)
+        finally:
+            # Nobody is left waiting, even if the task was cancelled
+            _fail(batch, RuntimeError("Batch finished without a result for this item"))
+
+    async def _process(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        results = await asyncio.get_running_loop().run_in_executor(
+            self.executor, self.process_batch, [item for item, _ in batch]
+        )
+        if len(results) != len(batch):
+            raise ValueError(f"process_batch returned {len(results)} results for {len(batch)} items")
+        for (_, future), result in zip(batch, results):
+            # A caller may have been cancelled while the batch was running
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'mean_batch_size': self.items / self.batches if self.batches else 0.0,
+            'retried_items': self.retried_items,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000
+        }
+
+def _fail(batch: List[Tuple[Any, asyncio.Future]], error: BaseException) -> None:
+    """Set `error` on the futures of the batch that have no result yet"""
+    for _, future in batch:
+        if not future.done():
+            future.set_exception(error)
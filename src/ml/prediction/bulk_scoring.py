@@ -0,0 +1,202 @@
+# src/ml/prediction/bulk_scoring.py
+
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_COLUMNS = ('card_id', 'merchant_id', 'amount')
+STRING_COLUMNS = ('card_id', 'merchant_id', 'device_id', 'ip_address')
+
+def _is_parquet(path: str) -> bool:
+    return path.endswith(('.parquet', '.pq'))
+
+def read_chunks(path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Stream a CSV or Parquet file as DataFrames of at most chunk_size rows"""
+    if _is_parquet(path):
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        # Identifiers stay strings even when they look numeric; location_id may be empty
+        yield from pd.read_csv(
+            path, chunksize=chunk_size,
+            dtype={**{column: str for column in STRING_COLUMNS}, 'location_id': 'Int64'}
+        )
+
+def frame_to_transactions(frame: pd.DataFrame) -> Tuple[List[Dict], Optional[np.ndarray]]:
+    """Transactions as FraudPredictor expects them, plus event times in epoch seconds if present"""
+    n_rows = len(frame)
+
+    def column(name):
+        if name not in frame:
+            return [None] * n_rows
+        values = frame[name]
+        return values.astype(object).where(values.notna(), None).tolist()
+
+    amounts = frame['amount'].astype(float).tolist()
+    locations = (frame['location_id'].fillna(0).astype(np.int64).tolist()
+                 if 'location_id' in frame else [0] * n_rows)
+    transactions = [
+        {
+            'card_id': card_id, 'merchant_id': merchant_id, 'amount': amount,
+            'location_id': location_id, 'device_id': device_id, 'ip_address': ip_address
+        }
+        for card_id, merchant_id, amount, location_id, device_id, ip_address in zip(
+            column('card_id'), column('merchant_id'), amounts, locations,
+            column('device_id'), column('ip_address')
+        )
+    ]
+
+    if 'timestamp' not in frame:
+        return transactions, None
+    timestamps = frame['timestamp']
+    if pd.api.types.is_numeric_dtype(timestamps):
+        return transactions, timestamps.astype(float).to_numpy()
+    # Naive times are taken as UTC; unparseable ones become NaN (missing for the model)
+    parsed = pd.to_datetime(timestamps, utc=True, errors='coerce')
+    return transactions, (parsed - pd.Timestamp(0, tz='UTC')).dt.total_seconds().to_numpy()
+
+def score_frame(predictor, frame: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """fraud_probability and risk_level for every row of one chunk"""
+    transactions, timestamps = frame_to_transactions(frame)
+    predictions = predictor.predict_batch(transactions, timestamps)
+    return (
+        np.array([prediction['fraud_probability'] for prediction in predictions], dtype=np.float64),
+        np.array([prediction['risk_level'] for prediction in predictions], dtype=object)
+    )
+
+class ScoredWriter:
+    """Appends scored chunks to a CSV or Parquet file, renamed into place on close"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        self.parquet = _is_parquet(path)
+        self._writer = None
+        self._file = None
+
+    def write(self, frame: pd.DataFrame) -> None:
+        if self.parquet:
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self.tmp_path, table.schema)
+            else:
+                # A column that is all null in one chunk must keep the first chunk's type
+                table = table.cast(self._writer.schema)
+            self._writer.write_table(table)
+        else:
+            header = self._file is None
+            if header:
+                self._file = open(self.tmp_path, 'w', newline='')
+            frame.to_csv(self._file, header=header, index=False)
+
+    def close(self, complete: bool = True) -> None:
+        """Publish the output, or discard it when scoring failed part way"""
+        if self._writer is not None:
+            self._writer.close()
+        if self._file is not None:
+            self._file.close()
+        if not os.path.exists(self.tmp_path):
+            return
+        if complete:
+            os.replace(self.tmp_path, self.path)
+        else:
+            os.remove(self.tmp_path)
+
+# Set before the pool forks, so workers share the loaded model pages copy-on-write
+_predictor = None
+
+def _score_in_worker(frame: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    return score_frame(_predictor, frame)
+
+def score_file(predictor, input_path: str, output_path: str, workers: int = 1,
+               chunk_size: int = 50000, preserve_order: bool = True,
+               max_in_flight: int = None, report_seconds: float = 10.0) -> Dict:
+    """
+    Score a CSV/Parquet file into another one, streaming chunk by chunk.
+
+    Input columns are copied through, with fraud_probability and risk_level
+    appended. At most `max_in_flight` chunks (default two per worker) are read
+    ahead, so memory stays flat whatever the file size. With preserve_order
+    off, chunks are written as soon as they are scored.
+    """
+    global _predictor
+    max_in_flight = max_in_flight or 2 * workers
+    writer = ScoredWriter(output_path)
+    started = last_report = time.perf_counter()
+    rows = 0
+    chunks = 0
+
+    def finish(chunk: pd.DataFrame, scores: Tuple[np.ndarray, np.ndarray]) -> None:
+        nonlocal rows, chunks, last_report
+        writer.write(chunk.assign(fraud_probability=scores[0], risk_level=scores[1]))
+        rows += len(chunk)
+        chunks += 1
+        now = time.perf_counter()
+        if now - last_report >= report_seconds:
+            logger.info(f"Scored {rows} rows ({rows / (now - started):.0f} rows/s)")
+            last_report = now
+
+    reader = read_chunks(input_path, chunk_size)
+    first = next(reader, None)
+    if first is not None:
+        missing = [column for column in REQUIRED_COLUMNS if column not in first]
+        if missing:
+            raise ValueError(f"Input file is missing required columns: {missing}")
+        if 'timestamp' not in first:
+            logger.warning("No timestamp column; time features use the current time")
+
+    def all_chunks():
+        if first is not None:
+            yield first
+            yield from reader
+
+    try:
+        if workers <= 1:
+            for chunk in all_chunks():
+                finish(chunk, score_frame(predictor, chunk))
+        else:
+            _predictor = predictor
+            # Fork shares the already loaded model instead of loading it per worker
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork')) as pool:
+                in_flight: "deque[Tuple[pd.DataFrame, Future]]" = deque()
+
+                def finish_next():
+                    if preserve_order:
+                        chunk, future = in_flight.popleft()
+                    else:
+                        done, _ = wait([future for _, future in in_flight], return_when=FIRST_COMPLETED)
+                        index = next(i for i, (_, future) in enumerate(in_flight) if future in done)
+                        chunk, future = in_flight[index]
+                        del in_flight[index]
+                    finish(chunk, future.result())
+
+                for chunk in all_chunks():
+                    in_flight.append((chunk, pool.submit(_score_in_worker, chunk)))
+                    if len(in_flight) >= max_in_flight:
+                        finish_next()
+                while in_flight:
+                    finish_next()
+    except BaseException:
+        writer.close(complete=False)
+        raise
+    finally:
+        _predictor = None
+    writer.close()
+
+    elapsed = time.perf_counter() - started
+    return {
+        'rows': rows,
+        'chunks': chunks,
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round(rows / elapsed, 1) if elapsed > 0 else None
+    }
@@ -0,0 +1,123 @@
+# src/ml/prediction/cascade.py
+
+import json
+import os
+import logging
+import numpy as np
+import xgboost as xgb
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CASCADE_CONFIG_FILE = 'cascade.json'
+
+def calibrate_cascade(model: xgb.Booster, X_holdout: np.ndarray, y_holdout: np.ndarray,
+                      prefix_trees: int, max_recall_loss: float = 0.005,
+                      max_false_positive_rate: float = 0.001, threshold: float = 0.5,
+                      rule_threshold: float = 0.8) -> Dict:
+    """
+    Choose the uncertainty band on the prefix margin from holdout data.
+
+    Rows whose prefix margin falls below `lower_margin` are accepted as benign
+    without running the full model. The bound is set so that at most
+    `max_recall_loss` of the frauds the full model catches (probability >=
+    `threshold`) fall below it. Rows above `upper_margin` are accepted as
+    fraud, with at most `max_false_positive_rate` of the full model's
+    negatives ending up above it. Short-circuited rows are served the
+    prefix probability, so the band always contains the threshold's margin,
+    and the holdout stats are computed from the scores cascade_predict serves.
+    """
+    n_trees = model.num_boosted_rounds()
+    if not 0 < prefix_trees < n_trees:
+        raise ValueError(f"prefix_trees must be between 1 and {n_trees - 1}")
+
+    dmatrix = xgb.DMatrix(X_holdout)
+    full_prob = model.predict(dmatrix)
+    prefix_margin = model.predict(dmatrix, output_margin=True, iteration_range=(0, prefix_trees))
+
+    full_positive = full_prob >= threshold
+    caught = prefix_margin[full_positive & (y_holdout == 1)]
+    negatives = prefix_margin[~full_positive]
+
+    # Largest lower bound that loses at most max_recall_loss of caught frauds
+    if len(caught):
+        n_lost = int(np.floor(max_recall_loss * len(caught)))
+        lower_margin = float(np.sort(caught)[n_lost])
+    else:
+        lower_margin = float(np.min(prefix_margin))
+
+    # Smallest upper bound that flips at most max_false_positive_rate of negatives
+    if len(negatives):
+        n_flipped = int(np.floor(max_false_positive_rate * len(negatives)))
+        upper_margin = float(np.sort(negatives)[::-1][n_flipped])
+    else:
+        upper_margin = float(np.max(prefix_margin))
+
+    # Rows below the band must be served below the threshold, rows above it at or above
+    threshold_margin = float(np.log(threshold / (1 - threshold)))
+    lower_margin = min(lower_margin, threshold_margin)
+    upper_margin = max(upper_margin, lower_margin, threshold_margin)
+
+    config = {
+        'prefix_trees': int(prefix_trees),
+        'lower_margin': lower_margin,
+        'upper_margin': upper_margin,
+        'rule_threshold': rule_threshold,
+        'threshold': threshold
+    }
+
+    # Decisions the cascade makes on the holdout set, as served
+    served, short_circuit = cascade_predict(model, dmatrix, config)
+    cascade_positive = served >= threshold
+    caught_full = np.sum(full_positive & (y_holdout == 1))
+    caught_cascade = np.sum(cascade_positive & (y_holdout == 1))
+    config['holdout'] = {
+        'rows': int(len(y_holdout)),
+        'short_circuit_rate': float(np.mean(short_circuit)),
+        'recall_loss': float(1 - caught_cascade / caught_full) if caught_full else 0.0,
+        'decision_flips': int(np.sum(cascade_positive != full_positive))
+    }
+    logger.info(f"Calibrated cascade: {config}")
+    return config
+
+def cascade_predict(model: xgb.Booster, dmatrix: xgb.DMatrix, config: Dict,
+                    rule_scores: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Probabilities on model.predict's scale, and which rows the prefix alone answered.
+    Rows inside the band go through the full model, as do rows below it whose
+    rule score is at least `rule_threshold`.
+    """
+    margins = model.predict(dmatrix, output_margin=True, iteration_range=(0, config['prefix_trees']))
+
+    # Clearly benign needs both a low partial margin and no strong rule signal
+    clearly_benign = margins < config['lower_margin']
+    if rule_scores is not None:
+        clearly_benign &= rule_scores < config['rule_threshold']
+    short_circuit = clearly_benign | (margins > config['upper_margin'])
+
+    preds = 1 / (1 + np.exp(-margins))
+    uncertain = np.flatnonzero(~short_circuit)
+    if len(uncertain):
+        preds[uncertain] = model.predict(dmatrix.slice(uncertain))
+    return preds, short_circuit
+
+def save_cascade_config(config: Dict, model_dir: str, model_file: str) -> str:
+    """Store the band next to the model it was calibrated for"""
+    path = os.path.join(model_dir, CASCADE_CONFIG_FILE)
+    with open(path, 'w') as f:
+        json.dump({**config, 'model_file': model_file}, f, indent=4)
+    return path
+
+def load_cascade_config(model_dir: str, model_file: str) -> Optional[Dict]:
+    """Return the cascade band for `model_file`, or None if missing or stale"""
+    path = os.path.join(model_dir, CASCADE_CONFIG_FILE)
+    if not os.path.exists(path):
+        logger.warning(f"Cascade enabled but {path} not found; run scripts/calibrate_cascade.py")
+        return None
+
+    with open(path) as f:
+        config = json.load(f)
+    if config.get('model_file') != model_file:
+        logger.warning(f"Cascade config was calibrated for {config.get('model_file')}, not {model_file}; ignoring it")
+        return None
+    return config
@@ -0,0 +1,102 @@
+# src/ml/prediction/explainer.py
+
+import asyncio
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+import numpy as np
+import xgboost as xgb
+from src.ml.prediction.batcher import MicroBatcher
+
+logger = logging.getLogger(__name__)
+
+class Explainer:
+    """
+    Per-transaction tree-SHAP contributions (`pred_contribs=True`), computed on demand.
+
+    Feature rows are rebuilt from stored transaction fields with the stored
+    event time, so the model sees the same inputs it scored. Concurrent
+    requests are batched into one contributions call on a small dedicated
+    pool, off the scoring path. Results go into an LRU keyed by model file
+    and transaction id, holding at most `cache_size` explanations.
+    """
+
+    def __init__(self, predictor, cache_size: int = 10000, max_batch_size: int = 64,
+                 max_wait_ms: float = 5.0, workers: int = 1):
+        self.predictor = predictor
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[str, int], Dict]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, int], asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="explainer")
+        self._batcher = MicroBatcher(
+            self._explain_batch, max_batch_size=max_batch_size,
+            max_wait_ms=max_wait_ms, executor=self._executor
+        )
+
+    async def explain(self, transaction_id: int, features: Dict, timestamp: float) -> Dict:
+        """
+        Contributions for one stored transaction. `features` holds the raw
+        fields used for scoring and `timestamp` the event time in epoch seconds.
+        Only called from the event loop, so the cache needs no lock.
+        """
+        key = (self.predictor.model_file, transaction_id)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return cached
+        self.misses += 1
+
+        # Requests for a transaction already being explained share its task; the
+        # task is shielded so a disconnecting client does not cancel it for the others
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._compute(key, features, timestamp))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _compute(self, key: Tuple[str, int], features: Dict, timestamp: float) -> Dict:
+        explanation = await self._batcher.submit((features, timestamp))
+        self._cache[key] = explanation
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return explanation
+
+    def _explain_batch(self, items: List[Tuple[Dict, float]]) -> List[Dict]:
+        preprocessor = self.predictor.preprocessor
+        features = preprocessor.transform_batch(
+            [features for features, _ in items], timestamps=[timestamp for _, timestamp in items]
+        )
+        # Last column is the bias term (expected margin); each row sums to the raw margin
+        contributions = self.predictor.model.predict(xgb.DMatrix(features), pred_contribs=True)
+        names = preprocessor.feature_names()
+
+        explanations = []
+        for row, contribution in zip(features, contributions):
+            margin = float(contribution.sum())
+            order = np.argsort(-np.abs(contribution[:-1]), kind='stable')
+            explanations.append({
+                'model': self.predictor.model_file,
+                'base_value': float(contribution[-1]),
+                'margin': margin,
+                'model_probability': float(1 / (1 + np.exp(-margin))),
+                'contributions': [
+                    {'feature': names[i], 'value': float(row[i]), 'contribution': float(contribution[i])}
+                    for i in order
+                ]
+            })
+        return explanations
+
+    def stats(self) -> Dict:
+        return {
+            'cached': len(self._cache),
+            'cache_size': self.cache_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            **{f'batch_{key}': value for key, value in self._batcher.stats().items()
+               if key in ('batches', 'items', 'mean_batch_size')}
+        }
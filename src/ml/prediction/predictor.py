@@ -4,18 +4,65 @@ import numpy as np
 import xgboost as xgb
 import os
 import logging
-from typing import Dict, List
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
 from datetime import datetime
+from src.config.settings import (
+    CASCADE_ENABLED, SHADOW_ENABLED, SHADOW_MODEL_DIR, SHADOW_STATS_FILE,
+    SHADOW_WORKERS, SHADOW_QUEUE_SIZE, SHADOW_BATCH_SIZE
+)
+from src.ml.prediction.cascade import cascade_predict, load_cascade_config
+from src.ml.prediction.shadow import ShadowScorer
 from src.ml.preprocessing.preprocessor import FraudDataPreprocessor
 
 logger = logging.getLogger(__name__)
 
+# Rule scores from TransactionService.enrich_transaction used by the cascade
+RULE_SCORE_FIELDS = ('merchant_risk_score', 'location_risk_score', 'amount_risk_score', 'link_risk_score')
+
+def latest_model_file(model_dir: str) -> str:
+    """Newest fraud_model_*.json in model_dir; names sort by training time"""
+    logger.info(f"Checking for model files in directory: {model_dir}")
+    model_files = sorted(
+        [f for f in os.listdir(model_dir) 
+         if f.startswith('fraud_model_') and f.endswith('.json')]
+    )
+    logger.info(f"Found model files: {model_files}")
+    
+    if not model_files:
+        raise FileNotFoundError("No model files found in models directory")
+    return model_files[-1]
+
 class FraudPredictor:
-    def __init__(self, model_dir='models'):
+    def __init__(self, model_dir='models', cascade=None, shadow=None, model_file=None):
         self.model_dir = model_dir
         os.makedirs(model_dir, exist_ok=True)
         self.preprocessor = FraudDataPreprocessor()
-        self._load_model()
+        self._load_model(model_file)
+        self._health_dmatrix = None
+        # XGBoost's default (all cores) until set_nthread()
+        self.nthread = None
+        
+        # Cascade mode: score clear-cut traffic with a prefix of the ensemble
+        self.cascade = None
+        if CASCADE_ENABLED if cascade is None else cascade:
+            self.cascade = load_cascade_config(self.model_dir, self.model_file)
+        self._cascade_lock = threading.Lock()
+        self._cascade_scored = 0
+        self._cascade_short_circuited = 0
+        
+        # Shadow mode: challengers re-score served rows in the background
+        self.shadow = None
+        if SHADOW_ENABLED if shadow is None else shadow:
+            self.shadow = ShadowScorer.from_dir(
+                SHADOW_MODEL_DIR,
+                n_features=self.model.num_features(),
+                stats_file=SHADOW_STATS_FILE,
+                workers=SHADOW_WORKERS,
+                queue_size=SHADOW_QUEUE_SIZE,
+                batch_size=SHADOW_BATCH_SIZE
+            )
 
     def _validate_features(self, features: Dict) -> None:
         """Validate that all required features are present"""
@@ -32,94 +79,143 @@ class FraudPredictor:
         except (ValueError, TypeError):
             raise ValueError("Amount must be numeric and location_id must be an integer")
 
-    def predict(self, features: Dict) -> Dict:
+    def predict(self, features: Dict, shadow: bool = True) -> Dict:
         """Make fraud prediction for a transaction"""
+        return self.predict_batch([features], shadow=shadow)[0]
+
+    def predict_batch(self, features_list: List[Dict], timestamps: Optional[Sequence[float]] = None,
+                      shadow: bool = True) -> List[Dict]:
+        """
+        Make fraud predictions for several transactions with one transform and model call.
+        `timestamps` are event times in epoch seconds; they default to now. Synthetic
+        rows (warmup, health checks) pass shadow=False to stay out of challenger stats.
+        """
         try:
             # Validate input features
-            self._validate_features(features)
+            for features in features_list:
+                self._validate_features(features)
             
             # Transform data
-            features_array = self.preprocessor.transform_transaction_data(features)
+            features_array = self.preprocessor.transform_batch(features_list, timestamps)
             
             # Convert to DMatrix for XGBoost
-            dmatrix = xgb.DMatrix(features_array)
-            
-            # Get raw prediction score and convert to probability using sigmoid
-            raw_pred = self.model.predict(dmatrix)[0]
-            fraud_prob = float(1 / (1 + np.exp(-raw_pred)))
+            dmatrix = xgb.DMatrix(features_array, nthread=self.nthread)
             
-            # Adjust probability based on risk scores
-            risk_components = self._calculate_risk_components(features_array[0], list(self.get_feature_importances().values()))
+            # Get raw prediction scores and convert to probabilities using sigmoid
+            if self.cascade:
+                raw_preds, short_circuit = self._cascade_predict(dmatrix, features_list)
+            else:
+                raw_preds, short_circuit = self.model.predict(dmatrix), np.zeros(len(features_list), dtype=bool)
+            fraud_probs = 1 / (1 + np.exp(-raw_preds.astype(np.float64)))
+            importance_values = list(self.get_feature_importances().values())
+            all_risk_components = self._calculate_risk_components(features_array, importance_values)
             
-            # Count high risk indicators
-            high_risks = sum(1 for score in risk_components.values() if score > 0.8)
-            
-            # Boost fraud probability if multiple high risks are detected
-            if high_risks >= 2:
-                fraud_prob = max(fraud_prob, 0.7)  # At least HIGH risk if multiple high risk indicators
-            elif high_risks == 1:
-                fraud_prob = max(fraud_prob, 0.4)  # At least MEDIUM risk if one high risk indicator
+            results = []
+            for row, model_prob, prefix_only, fraud_prob, risk_components in zip(
+                    features_array, raw_preds, short_circuit, fraud_probs, all_risk_components):
+                fraud_prob = float(fraud_prob)
                 
-            # Determine risk level
-            risk_level = self._get_risk_level(fraud_prob)
-            
-            return {
-                'fraud_probability': fraud_prob,
-                'risk_components': risk_components,
-                'risk_level': risk_level,
-                'merchant_risk_score': risk_components['location_merchant_risk'],
-                'location_risk_score': risk_components['location_merchant_risk'],
-                'amount_risk_score': risk_components['amount_risk'],
-                'pattern_risk_score': risk_components['pattern_risk'],
-                'user_behavior_risk_score': risk_components['user_behavior_risk']
-            }
+                # Never blocks; rows are dropped when the shadow queue is full.
+                # Challengers are compared on the booster's own probability scale, and
+                # only with the full model: a short-circuited row has a prefix score.
+                if self.shadow and shadow and not prefix_only:
+                    self.shadow.submit(row[None, :], float(model_prob))
+                
+                # Count high risk indicators
+                high_risks = sum(1 for score in risk_components.values() if score > 0.8)
+                
+                # Boost fraud probability if multiple high risks are detected
+                if high_risks >= 2:
+                    fraud_prob = max(fraud_prob, 0.7)  # At least HIGH risk if multiple high risk indicators
+                elif high_risks == 1:
+                    fraud_prob = max(fraud_prob, 0.4)  # At least MEDIUM risk if one high risk indicator
+                    
+                # Determine risk level
+                risk_level = self._get_risk_level(fraud_prob)
+                
+                results.append({
+                    'fraud_probability': fraud_prob,
+                    'risk_components': risk_components,
+                    'risk_level': risk_level,
+                    'merchant_risk_score': risk_components['location_merchant_risk'],
+                    'location_risk_score': risk_components['location_merchant_risk'],
+                    'amount_risk_score': risk_components['amount_risk'],
+                    'pattern_risk_score': risk_components['pattern_risk'],
+                    'user_behavior_risk_score': risk_components['user_behavior_risk']
+                })
+            return results
             
         except Exception as e:
             logger.error(f"Prediction error: {str(e)}")
             raise
 
-    def _calculate_risk_components(self, features: np.ndarray, importance_values: List[float]) -> Dict:
-        """Calculate risk components based on feature groups"""
+    def _cascade_predict(self, dmatrix: xgb.DMatrix, features_list: List[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score with a prefix of the trees, running the full model only inside the
+        uncertainty band. Also returns which rows were answered by the prefix.
+        """
+        rule_scores = np.array([
+            max((float(features.get(field) or 0.0) for field in RULE_SCORE_FIELDS), default=0.0)
+            for features in features_list
+        ])
+        preds, short_circuit = cascade_predict(self.model, dmatrix, self.cascade, rule_scores)
+        
+        with self._cascade_lock:
+            self._cascade_scored += len(preds)
+            self._cascade_short_circuited += int(np.sum(short_circuit))
+        return preds, short_circuit
+
+    def cascade_stats(self) -> Dict:
+        """Fraction of traffic the cascade answered from the prefix alone"""
+        with self._cascade_lock:
+            scored, short_circuited = self._cascade_scored, self._cascade_short_circuited
+        return {
+            'enabled': self.cascade is not None,
+            'prefix_trees': self.cascade['prefix_trees'] if self.cascade else None,
+            'scored': scored,
+            'short_circuited': short_circuited,
+            'short_circuit_rate': short_circuited / scored if scored else 0.0
+        }
+
+    def shadow_stats(self) -> Dict:
+        """Challenger agreement and score deltas against the champion"""
+        if self.shadow is None:
+            return {'enabled': False}
+        return {'enabled': True, 'champion': self.model_file, **self.shadow.stats()}
+
+    def _calculate_risk_components(self, features: np.ndarray, importance_values: List[float]) -> List[Dict]:
+        """Calculate risk components based on feature groups, for every row of a feature matrix"""
         try:
             # Convert importance_values list to numpy array for element-wise multiplication
             importance_array = np.array(importance_values)
+            weighted = features * importance_array
             
             # Calculate weighted means for each component
-            pattern_risk = np.mean(features[0:10] * importance_array[0:10])
-            user_behavior_risk = np.mean(features[10:20] * importance_array[10:20])
-            location_merchant_risk = np.mean(features[20:28] * importance_array[20:28])
-            amount_risk = features[28] * importance_array[28]
-            time_risk = np.mean(features[29:] * importance_array[29:])
-
-            def normalize_score(score: float) -> float:
-                return float(1 / (1 + np.exp(-score/100)))  # Dividing by 100 to adjust the scale
-
-            components = {
-                'pattern_risk': normalize_score(pattern_risk),
-                'user_behavior_risk': normalize_score(user_behavior_risk),
-                'location_merchant_risk': normalize_score(location_merchant_risk),
-                'amount_risk': normalize_score(amount_risk),
-                'time_risk': normalize_score(time_risk)
+            scores = {
+                'pattern_risk': weighted[:, 0:10].mean(axis=1),
+                'user_behavior_risk': weighted[:, 10:20].mean(axis=1),
+                'location_merchant_risk': weighted[:, 20:28].mean(axis=1),
+                'amount_risk': weighted[:, 28],
+                'time_risk': weighted[:, 29:].mean(axis=1)
             }
             
-            # Ensure all values are finite
-            for key, value in components.items():
-                if not np.isfinite(value):
-                    components[key] = 0.0
+            # Dividing by 100 to adjust the scale; non-finite scores become 0
+            for key, score in scores.items():
+                normalized = 1 / (1 + np.exp(-score.astype(np.float64) / 100))
+                scores[key] = np.where(np.isfinite(normalized), normalized, 0.0).tolist()
             
-                    
-            return components
+            return [dict(zip(scores, values)) for values in zip(*scores.values())]
             
         except Exception as e:
             logger.error(f"Error calculating risk components: {str(e)}")
             # Return default risk components if there's an error
-            return {
+            return [{
                 'pattern_risk': 0.0,
                 'user_behavior_risk': 0.0,
                 'location_merchant_risk': 0.0,
                 'amount_risk': 0.0,
                 'time_risk': 0.0
-            }
+            } for _ in range(len(features))]
 
     def _get_risk_level(self, probability: float) -> str:
         """Convert probability to risk level"""
@@ -129,27 +225,17 @@ class FraudPredictor:
             return 'MEDIUM'
         return 'HIGH'
 
-    def _load_model(self):
-        """Load the latest model"""
+    def _load_model(self, model_file=None):
+        """Load the given model file, or the latest one"""
         try:
-            logger.info(f"Checking for model files in directory: {self.model_dir}")
-            
-            model_files = sorted(
-                [f for f in os.listdir(self.model_dir) 
-                 if f.startswith('fraud_model_') and f.endswith('.json')]
-            )
-            logger.info(f"Found model files: {model_files}")
-            
-            if not model_files:
-                raise FileNotFoundError("No model files found in models directory")
-                
-            latest_model = model_files[-1]
+            latest_model = model_file or latest_model_file(self.model_dir)
             model_path = os.path.join(self.model_dir, latest_model)
             logger.info(f"Attempting to load model from path: {model_path}")
             
             # Create a new XGBoost Booster and load the model
             self.model = xgb.Booster()
             self.model.load_model(model_path)
+            self.model_file = latest_model
             logger.info(f"Successfully loaded model: {latest_model}")
             
         except Exception as e:
@@ -178,6 +264,51 @@ class FraudPredictor:
             # Return default importances if there's an error
             return {name: 1.0 for name in self.preprocessor.feature_names()}
 
+    def set_nthread(self, nthread: int) -> None:
+        """
+        Threads used by the booster and the per-call DMatrix. A process that
+        forks after predicting must use 1 until then: OpenMP's thread pool
+        does not survive fork, and children would hang on their first predict.
+        """
+        self.nthread = nthread
+        self.model.set_param({'nthread': nthread})
+
+    def warmup(self, n_transactions: int = 64) -> float:
+        """Load scalers and exercise the scoring path with synthetic transactions; returns seconds taken"""
+        start = time.perf_counter()
+        rng = np.random.default_rng(0)
+        transactions = [
+            {
+                'card_id': f"warmup_card_{i}",
+                'merchant_id': f"warmup_merchant_{i % 10}",
+                'amount': float(rng.exponential(80.0)) + 1.0,
+                'location_id': int(rng.integers(1, 100)),
+                'device_id': f"warmup_device_{i}",
+                'ip_address': f"10.0.0.{i % 256}"
+            }
+            for i in range(n_transactions)
+        ]
+        self.predict_batch(transactions, shadow=False)
+        for transaction in transactions[:4]:
+            self.predict(transaction, shadow=False)
+        elapsed = time.perf_counter() - start
+        logger.info(f"Warmed up predictor with {n_transactions} synthetic transactions in {elapsed:.3f}s")
+        return elapsed
+
+    def check_model(self) -> Dict:
+        """Score a fixed feature vector with the loaded booster; no transform or disk access"""
+        if self._health_dmatrix is None:
+            self._health_dmatrix = xgb.DMatrix(np.zeros((1, self.model.num_features()), dtype=np.float32))
+        
+        start = time.perf_counter()
+        score = float(self.model.predict(self._health_dmatrix)[0])
+        if not np.isfinite(score):
+            raise ValueError(f"Model returned a non-finite score: {score}")
+        return {
+            'model_file': self.model_file,
+            'predict_ms': round((time.perf_counter() - start) * 1000, 3)
+        }
+
     def health_check(self) -> bool:
         """Check if model is loaded and functional"""
         try:
@@ -192,7 +323,7 @@ class FraudPredictor:
             }
             
             # Try to make a prediction
-            self.predict(dummy_features)
+            self.predict(dummy_features, shadow=False)
             return True
         except Exception as e:
             logger.error(f"Health check failed: {str(e)}")
@@ -0,0 +1,214 @@
+# src/ml/prediction/shadow.py
+
+import json
+import os
+import queue
+import threading
+import time
+import logging
+import weakref
+import numpy as np
+import xgboost as xgb
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Upper edges of the |challenger - champion| histogram buckets
+DELTA_BUCKETS = (0.01, 0.05, 0.1, 0.2, 0.5, 1.0)
+
+# Running scorers, restarted in forked children by one hook for the process
+_scorers: "weakref.WeakSet[ShadowScorer]" = weakref.WeakSet()
+
+def _reset_scorers_after_fork() -> None:
+    for scorer in list(_scorers):
+        scorer._reset_after_fork()
+
+os.register_at_fork(after_in_child=_reset_scorers_after_fork)
+
+class ChallengerStats:
+    """Running delta and agreement statistics for one challenger"""
+
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        self.scored = 0
+        self.agreed = 0
+        self.sum_delta = 0.0
+        self.sum_abs_delta = 0.0
+        self.max_abs_delta = 0.0
+        self.histogram = np.zeros(len(DELTA_BUCKETS), dtype=np.int64)
+
+    def update(self, champion: np.ndarray, challenger: np.ndarray) -> None:
+        delta = challenger - champion
+        abs_delta = np.abs(delta)
+        self.scored += len(delta)
+        self.agreed += int(np.sum((champion >= self.threshold) == (challenger >= self.threshold)))
+        self.sum_delta += float(np.sum(delta))
+        self.sum_abs_delta += float(np.sum(abs_delta))
+        self.max_abs_delta = max(self.max_abs_delta, float(np.max(abs_delta)))
+        self.histogram += np.bincount(
+            np.searchsorted(DELTA_BUCKETS, abs_delta), minlength=len(DELTA_BUCKETS)
+        )[:len(DELTA_BUCKETS)]
+
+    def to_dict(self) -> Dict:
+        return {
+            'scored': self.scored,
+            'agreement_rate': self.agreed / self.scored if self.scored else None,
+            'mean_delta': self.sum_delta / self.scored if self.scored else None,
+            'mean_abs_delta': self.sum_abs_delta / self.scored if self.scored else None,
+            'max_abs_delta': self.max_abs_delta,
+            'abs_delta_histogram': dict(zip((f"<={edge}" for edge in DELTA_BUCKETS), self.histogram.tolist()))
+        }
+
+class ShadowScorer:
+    """
+    Re-scores served feature rows with challenger boosters off the request path.
+
+    `submit` never blocks: rows go onto a bounded queue and are dropped when it
+    is full. A small pool of worker threads drains the queue in batches and
+    compares challenger probabilities with the champion's, both as returned
+    by Booster.predict (binary:logistic), so `threshold` is a decision
+    threshold on the models' own scale.
+    """
+
+    def __init__(self, challengers: Dict[str, xgb.Booster], stats_file: str,
+                 workers: int = 1, queue_size: int = 10000, batch_size: int = 256,
+                 flush_seconds: float = 30.0, threshold: float = 0.5):
+        self.challengers = challengers
+        self.stats_file = stats_file
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._queue: "queue.Queue[Tuple[np.ndarray, float]]" = queue.Queue(maxsize=queue_size)
+        self._stats = {name: ChallengerStats(threshold) for name in challengers}
+        self._lock = threading.Lock()
+        self._submitted = 0
+        self._dropped = 0
+        self._last_flush = time.monotonic()
+        self._stop = threading.Event()
+
+        # One thread per challenger prediction keeps shadow work off the champion's cores
+        for booster in challengers.values():
+            booster.set_param({'nthread': 1})
+
+        self._n_workers = workers
+        self._start_workers()
+        # Threads do not survive fork; pre-forked API workers get their own pool
+        _scorers.add(self)
+        logger.info(f"Shadow scoring started with challengers {list(challengers)} on {workers} worker(s)")
+
+    def _start_workers(self) -> None:
+        self._workers = [
+            threading.Thread(target=self._run, name=f"shadow-scorer-{i}", daemon=True)
+            for i in range(self._n_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def _reset_after_fork(self) -> None:
+        # Locks may have been held by parent threads at fork time
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=self._queue.maxsize)
+        self._stop = threading.Event()
+        # Drop the parent's warmup counts and keep each worker's stats in its own file
+        self._stats = {name: ChallengerStats(stats.threshold) for name, stats in self._stats.items()}
+        self._submitted = self._dropped = 0
+        root, ext = os.path.splitext(self.stats_file)
+        self.stats_file = f"{root}.{os.getpid()}{ext}"
+        self._start_workers()
+
+    @classmethod
+    def from_dir(cls, challenger_dir: str, n_features: int, **kwargs) -> Optional['ShadowScorer']:
+        """Load every fraud_model_*.json in challenger_dir whose feature count matches the champion"""
+        if not os.path.isdir(challenger_dir):
+            logger.warning(f"Shadow scoring enabled but {challenger_dir} does not exist")
+            return None
+
+        challengers = {}
+        for model_file in sorted(os.listdir(challenger_dir)):
+            if not (model_file.startswith('fraud_model_') and model_file.endswith('.json')):
+                continue
+            booster = xgb.Booster()
+            booster.load_model(os.path.join(challenger_dir, model_file))
+            if booster.num_features() != n_features:
+                logger.warning(f"Skipping challenger {model_file}: expects {booster.num_features()} features, not {n_features}")
+                continue
+            challengers[model_file] = booster
+
+        if not challengers:
+            logger.warning(f"No usable challenger models found in {challenger_dir}")
+            return None
+        return cls(challengers, **kwargs)
+
+    def submit(self, features: np.ndarray, champion_prob: float) -> bool:
+        """Queue one served row and the champion booster's probability for it; returns False if dropped"""
+        try:
+            self._queue.put_nowait((features, champion_prob))
+        except queue.Full:
+            with self._lock:
+                self._dropped += 1
+            return False
+        with self._lock:
+            self._submitted += 1
+        return True
+
+    def _next_batch(self) -> List[Tuple[np.ndarray, float]]:
+        """Block for the first row, then take whatever else is already queued"""
+        try:
+            batch = [self._queue.get(timeout=1.0)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if batch:
+                try:
+                    self._score(batch)
+                except Exception as e:
+                    logger.error(f"Shadow scoring failed: {str(e)}")
+            if time.monotonic() - self._last_flush >= self.flush_seconds:
+                self.flush()
+
+    def _score(self, batch: List[Tuple[np.ndarray, float]]) -> None:
+        rows = np.vstack([features for features, _ in batch])
+        champion = np.array([prob for _, prob in batch], dtype=np.float64)
+        dmatrix = xgb.DMatrix(rows)
+
+        for name, booster in self.challengers.items():
+            challenger = booster.predict(dmatrix).astype(np.float64)
+            with self._lock:
+                self._stats[name].update(champion, challenger)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'submitted': self._submitted,
+                'dropped': self._dropped,
+                'queued': self._queue.qsize(),
+                'challengers': {name: stats.to_dict() for name, stats in self._stats.items()}
+            }
+
+    def flush(self) -> None:
+        """Atomically rewrite the stats file"""
+        self._last_flush = time.monotonic()
+        stats = {**self.stats(), 'updated_at': time.time()}
+        tmp_path = f"{self.stats_file}.tmp.{os.getpid()}.{threading.get_ident()}"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(stats, f, indent=4)
+            os.replace(tmp_path, self.stats_file)
+        except OSError as e:
+            logger.error(f"Could not write shadow stats to {self.stats_file}: {str(e)}")
+
+    def stop(self) -> None:
+        """Stop the workers and write final stats; rows still queued are discarded"""
+        _scorers.discard(self)
+        self._stop.set()
+        for worker in self._workers:
+            worker.join()
+        self.flush()
@@ -0,0 +1,91 @@
+# src/ml/preprocessing/hashing.py
+
+import numpy as np
+from typing import Sequence
+import logging
+
+logger = logging.getLogger(__name__)
+
+FNV_OFFSET_BASIS = np.uint64(0xcbf29ce484222325)
+FNV_PRIME = np.uint64(0x100000001b3)
+
+def _fmix64(h: np.ndarray) -> np.ndarray:
+    """MurmurHash3 finalizer; spreads FNV's weak low bits before taking a modulus"""
+    h ^= h >> np.uint64(33)
+    h *= np.uint64(0xff51afd7ed558ccd)
+    h ^= h >> np.uint64(33)
+    h *= np.uint64(0xc4ceb9fe1a85ec53)
+    h ^= h >> np.uint64(33)
+    return h
+
+def stable_hash(values: Sequence) -> np.ndarray:
+    """
+    64-bit FNV-1a of each value's UTF-8 bytes with a Murmur3 finalizer, as uint64.
+
+    Unlike the built-in hash() the result does not depend on the process, so
+    API workers, consumers and the training exporter agree. None hashes like ''.
+    The hashing loop runs once per byte position over the whole batch, not per value.
+    """
+    data, lengths = _encode(values)
+    h = np.full(len(lengths), FNV_OFFSET_BASIS, dtype=np.uint64)
+    if not len(lengths) or not lengths.max():
+        return _fmix64(h)
+
+    # Sort rows by length so the rows still active at each byte position are a
+    # contiguous suffix, and update that slice in place
+    order = np.argsort(lengths, kind='stable')
+    sorted_lengths = lengths[order]
+    positions = (np.cumsum(lengths) - lengths)[order]
+    sorted_h = h[order]
+    for position in range(int(sorted_lengths[-1])):
+        first = np.searchsorted(sorted_lengths, position, side='right')
+        active = sorted_h[first:]
+        active ^= data[positions[first:]]
+        active *= FNV_PRIME
+        positions[first:] += 1
+
+    h[order] = sorted_h
+    return _fmix64(h)
+
+_MASK64 = (1 << 64) - 1
+
+def stable_hash_one(value) -> int:
+    """stable_hash of a single value, in plain Python: far cheaper than a one-row batch"""
+    h, prime, mask = int(FNV_OFFSET_BASIS), int(FNV_PRIME), _MASK64
+    for byte in ('' if value is None else str(value)).encode('utf-8'):
+        h = ((h ^ byte) * prime) & mask
+    h ^= h >> 33
+    h = (h * 0xff51afd7ed558ccd) & _MASK64
+    h ^= h >> 33
+    h = (h * 0xc4ceb9fe1a85ec53) & _MASK64
+    return h ^ (h >> 33)
+
+def _encode(values: Sequence):
+    """UTF-8 bytes of all values back to back, as uint64, plus each value's byte length"""
+    try:
+        strings = values if isinstance(values, list) else list(values)
+        joined = '\x00'.join(strings).encode('utf-8')
+    except TypeError:
+        # None or non-string values
+        strings = ['' if value is None else str(value) for value in values]
+        joined = '\x00'.join(strings).encode('utf-8')
+
+    raw = np.frombuffer(joined, dtype=np.uint8)
+    separators = np.flatnonzero(raw == 0)
+    if len(separators) != max(len(strings) - 1, 0):
+        # A value contains NUL itself; split the slow way
+        encoded = [string.encode('utf-8') for string in strings]
+        lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+        return np.frombuffer(b''.join(encoded), dtype=np.uint8).astype(np.uint64), lengths
+
+    bounds = np.concatenate([[-1], separators, [len(raw)]])
+    lengths = np.diff(bounds) - 1 if len(strings) else np.zeros(0, dtype=np.int64)
+    # Row i starts at bounds[i] + 1 in raw; dropping the separators shifts it left by i
+    data = np.delete(raw, separators).astype(np.uint64)
+    return data, lengths
+
+def hash_buckets(values: Sequence, n_buckets: int) -> np.ndarray:
+    """Stable bucket index in [0, n_buckets) for each value"""
+    if n_buckets < 1:
+        raise ValueError("n_buckets must be positive")
+    return (stable_hash(values) % np.uint64(n_buckets)).astype(np.int64)
@@ -0,0 +1,102 @@
+# src/ml/preprocessing/imbalance.py
+
+import numpy as np
+from imblearn.over_sampling import SMOTE
+from sklearn.neighbors import NearestNeighbors
+from typing import Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+IMBALANCE_STRATEGIES = ('smote', 'chunked_smote', 'undersample', 'weight')
+
+def resample(X, y, strategy: str = 'smote', sampling_strategy: float = 0.1,
+             random_state: int = 42, block_size: int = 5000) -> Tuple[np.ndarray, np.ndarray, Optional[float]]:
+    """
+    Rebalance training data with the selected strategy.
+    Returns (X, y, scale_pos_weight); scale_pos_weight is only set by 'weight'.
+    """
+    if strategy not in IMBALANCE_STRATEGIES:
+        raise ValueError(f"Unknown imbalance strategy '{strategy}', expected one of {IMBALANCE_STRATEGIES}")
+    logger.info(f"Applying '{strategy}' imbalance strategy...")
+
+    if strategy == 'smote':
+        X_out, y_out = SMOTE(random_state=random_state, sampling_strategy=sampling_strategy).fit_resample(X, y)
+        return X_out, y_out, None
+    if strategy == 'chunked_smote':
+        X_out, y_out = chunked_smote(X, y, sampling_strategy, random_state=random_state, block_size=block_size)
+        return X_out, y_out, None
+    if strategy == 'undersample':
+        X_out, y_out = random_undersample(X, y, sampling_strategy, random_state=random_state)
+        return X_out, y_out, None
+
+    # 'weight': keep every row and let XGBoost reweight the positive class
+    n_pos = int(np.sum(y == 1))
+    scale_pos_weight = float((len(y) - n_pos) / max(n_pos, 1))
+    logger.info(f"Using scale_pos_weight={scale_pos_weight:.1f} instead of resampling")
+    return X, y, scale_pos_weight
+
+def _synthetic_count(y, sampling_strategy: float) -> int:
+    """Synthetic minority rows needed to reach minority/majority == sampling_strategy"""
+    n_pos = int(np.sum(y == 1))
+    n_neg = len(y) - n_pos
+    return max(0, int(sampling_strategy * n_neg) - n_pos)
+
+def chunked_smote(X, y, sampling_strategy: float = 0.1, k_neighbors: int = 5,
+                  random_state: int = 42, block_size: int = 5000) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    SMOTE with approximate neighbours: minority rows are shuffled into blocks and
+    neighbours are searched only within a block, so k-NN memory is bounded by the
+    block size. Output is written into a single preallocated float32 matrix.
+    """
+    rng = np.random.default_rng(random_state)
+    minority = np.asarray(X[np.flatnonzero(y == 1)], dtype=np.float32)
+    n_synthetic = _synthetic_count(y, sampling_strategy)
+    if n_synthetic == 0 or len(minority) < 2:
+        return np.asarray(X, dtype=np.float32), np.asarray(y)
+
+    X_out = np.empty((len(y) + n_synthetic, X.shape[1]), dtype=np.float32)
+    X_out[:len(y)] = X
+    y_out = np.concatenate([np.asarray(y), np.ones(n_synthetic, dtype=np.asarray(y).dtype)])
+
+    # Share synthetic rows between blocks in proportion to block size
+    order = rng.permutation(len(minority))
+    blocks = [order[i:i + block_size] for i in range(0, len(order), block_size)]
+    per_block = np.diff(np.round(np.linspace(0, n_synthetic, len(blocks) + 1)).astype(int))
+    per_block = rng.permutation(per_block) if len(blocks) > 1 else per_block
+
+    offset = len(y)
+    for block, count in zip(blocks, per_block):
+        if count == 0:
+            continue
+        points = minority[block]
+        k = min(k_neighbors, len(points) - 1)
+        if k < 1:
+            # A singleton block cannot interpolate; reuse random minority rows
+            points = minority
+            k = min(k_neighbors, len(points) - 1)
+
+        # First neighbour of each point is the point itself
+        neighbours = NearestNeighbors(n_neighbors=k + 1).fit(points).kneighbors(points, return_distance=False)[:, 1:]
+
+        base = rng.integers(0, len(points), size=count)
+        partner = neighbours[base, rng.integers(0, k, size=count)]
+        gap = rng.random((count, 1), dtype=np.float32)
+        X_out[offset:offset + count] = points[base] + gap * (points[partner] - points[base])
+        offset += count
+
+    logger.info(f"Chunked SMOTE added {n_synthetic} synthetic rows in {len(blocks)} blocks")
+    return X_out, y_out
+
+def random_undersample(X, y, sampling_strategy: float = 0.1,
+                       random_state: int = 42) -> Tuple[np.ndarray, np.ndarray]:
+    """Keep every minority row and a random majority subset so minority/majority == sampling_strategy"""
+    rng = np.random.default_rng(random_state)
+    positives = np.flatnonzero(y == 1)
+    negatives = np.flatnonzero(y != 1)
+    n_keep = min(len(negatives), int(len(positives) / sampling_strategy))
+
+    # Sorted indices keep reads from a memory-mapped matrix sequential
+    keep = np.sort(np.concatenate([positives, rng.choice(negatives, size=n_keep, replace=False)]))
+    logger.info(f"Undersampled majority class from {len(negatives)} to {n_keep} rows")
+    return np.asarray(X[keep], dtype=np.float32), np.asarray(y[keep])
@@ -2,23 +2,61 @@
 
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
 from sklearn.preprocessing import StandardScaler, RobustScaler
-from imblearn.over_sampling import SMOTE
+from src.ml.preprocessing.hashing import hash_buckets
+from src.ml.preprocessing.imbalance import resample
 import joblib
+import hashlib
+import json
 import os
+import shutil
 import time
-from typing import Tuple, Dict
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 import logging
+from src.config.settings import (
+    TRAINING_CHUNK_SIZE,
+    ROBUST_SCALER_SAMPLE_SIZE,
+    FEATURE_CACHE_DIR,
+    FEATURE_HASH_BUCKETS,
+    IMBALANCE_STRATEGY
+)
 
 # Add logger configuration
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+V_COLUMNS = ['V%d' % i for i in range(1, 29)]
+
+# Explicit dtypes for the training CSV. Time stays float64 because a full year
+# of seconds exceeds float32's exact integer range.
+TRAINING_DTYPES = {
+    **{col: np.float32 for col in V_COLUMNS},
+    'Amount': np.float32,
+    'Time': np.float64,
+    'Class': np.int8
+}
+
+# Training exports written by TrainingDataExporter
+COLUMNAR_SUFFIXES = ('.parquet', '.arrow', '.feather')
+
+# Bump whenever the feature layout changes so stale caches are not reused
+FEATURE_CACHE_VERSION = 2
+
 class FraudDataPreprocessor:
-    def __init__(self, model_dir='models'):
+    def __init__(self, model_dir='models', cache_dir=None, chunk_size=None, hash_buckets=None):
         self.model_dir = model_dir
+        self.cache_dir = cache_dir or FEATURE_CACHE_DIR
+        self.chunk_size = chunk_size or TRAINING_CHUNK_SIZE
+        self.hash_buckets = hash_buckets or FEATURE_HASH_BUCKETS
         self.amount_scaler = RobustScaler()
         self.feature_scaler = StandardScaler()
+        # Latest event Time seen in the training data, recorded in model lineage
+        self.data_watermark = None
+        self._preprocessors_loaded = False
+        # Set when the 'weight' imbalance strategy replaces resampling
+        self.scale_pos_weight = None
         os.makedirs(model_dir, exist_ok=True)
         logger.info(f"Initialized FraudDataPreprocessor with model_dir: {model_dir}")
 
@@ -33,29 +71,222 @@ class FraudDataPreprocessor:
             logger.info(f"Class {class_label}: {count} ({percentage:.2f}%)")
         return dist
         
-    def prepare_training_data(self, data_path: str) -> Tuple[np.ndarray, np.ndarray]:
+    def prepare_training_data(self, data_path: str, imbalance_strategy: str = None) -> Tuple[np.ndarray, np.ndarray]:
         """Prepare data for training"""
         logger.info("Loading and preprocessing training data...")
         
-        # Load data
-        df = pd.read_csv(data_path)
-        logger.info(f"Loaded dataset with shape: {df.shape}")
-        self._check_data_distribution(df['Class'].values)
-        
-        # Process features
-        X = self._preprocess_features(df)
-        y = df['Class'].values
+        # Load the memory-mapped feature matrix, building it on first use
+        X, y = self._load_feature_cache(data_path)
+        logger.info(f"Loaded feature matrix with shape: {X.shape}")
+        self._check_data_distribution(y)
         
         # Handle class imbalance
-        logger.info("Applying SMOTE for class imbalance...")
-        smote = SMOTE(random_state=42, sampling_strategy=0.1)
-        X_resampled, y_resampled = smote.fit_resample(X, y)
-        logger.info(f"After SMOTE - X shape: {X_resampled.shape}, y shape: {y_resampled.shape}")
+        X_resampled, y_resampled, self.scale_pos_weight = resample(
+            X, y, strategy=imbalance_strategy or IMBALANCE_STRATEGY, sampling_strategy=0.1
+        )
+        logger.info(f"After resampling - X shape: {X_resampled.shape}, y shape: {y_resampled.shape}")
         
         # Save preprocessors
         self._save_preprocessors()
         
         return X_resampled, y_resampled
+
+    def _iter_training_chunks(self, data_path: str) -> Iterator[pd.DataFrame]:
+        """Stream training data in chunks with explicit float32 dtypes"""
+        if self._is_columnar(data_path):
+            return self._iter_columnar_chunks(data_path)
+        
+        columns = V_COLUMNS + ['Amount', 'Time', 'Class']
+        return pd.read_csv(
+            data_path,
+            usecols=columns,
+            dtype=TRAINING_DTYPES,
+            chunksize=self.chunk_size
+        )
+
+    def _is_columnar(self, data_path: str) -> bool:
+        """Parquet/Arrow exports are directories of part files or single files"""
+        return os.path.isdir(data_path) or data_path.endswith(COLUMNAR_SUFFIXES)
+
+    def _columnar_files(self, data_path: str) -> List[str]:
+        """Part files of a columnar export, in a stable order"""
+        if not os.path.isdir(data_path):
+            return [data_path]
+        return sorted(
+            os.path.join(data_path, name) for name in os.listdir(data_path)
+            if name.endswith(COLUMNAR_SUFFIXES)
+        )
+
+    def _iter_columnar_chunks(self, data_path: str) -> Iterator[pd.DataFrame]:
+        """Read only the training columns from memory-mapped Parquet/Arrow files"""
+        columns = V_COLUMNS + ['Amount', 'Time', 'Class']
+        for path in self._columnar_files(data_path):
+            if path.endswith('.parquet'):
+                parquet_file = pq.ParquetFile(path, memory_map=True)
+                batches = parquet_file.iter_batches(batch_size=self.chunk_size, columns=columns)
+                for batch in batches:
+                    yield batch.to_pandas().astype(TRAINING_DTYPES, copy=False)
+            else:
+                with pa.memory_map(path) as source:
+                    reader = pa.ipc.open_file(source)
+                    for i in range(reader.num_record_batches):
+                        batch = reader.get_batch(i).select(columns)
+                        yield batch.to_pandas().astype(TRAINING_DTYPES, copy=False)
+
+    def _data_hash(self, data_path: str) -> str:
+        """Hash the raw data file(s) so cached features are keyed by content"""
+        digest = hashlib.sha256(f'v{FEATURE_CACHE_VERSION}'.encode())
+        paths = self._columnar_files(data_path) if self._is_columnar(data_path) else [data_path]
+        for path in paths:
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+        return digest.hexdigest()[:32]
+
+    def _load_feature_cache(self, data_path: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Return memory-mapped features and labels, building the cache if missing"""
+        cache_path = os.path.join(self.cache_dir, self._data_hash(data_path))
+        
+        if not os.path.exists(os.path.join(cache_path, 'features.npy')):
+            self._build_feature_cache(data_path, cache_path)
+        else:
+            logger.info(f"Using cached feature matrix: {cache_path}")
+        
+        # Restore the scalers that produced the cached matrix
+        self.amount_scaler = joblib.load(os.path.join(cache_path, 'amount_scaler.pkl'))
+        self.feature_scaler = joblib.load(os.path.join(cache_path, 'feature_scaler.pkl'))
+        with open(os.path.join(cache_path, 'meta.json')) as f:
+            self.data_watermark = json.load(f)['data_watermark']
+        
+        X = np.load(os.path.join(cache_path, 'features.npy'), mmap_mode='r')
+        y = np.load(os.path.join(cache_path, 'labels.npy'), mmap_mode='r')
+        return X, y
+
+    def _build_feature_cache(self, data_path: str, cache_path: str):
+        """Fit scalers in one streaming pass, then write features in a second"""
+        logger.info(f"Building feature cache from {data_path}...")
+        
+        # 1. Fit scalers without holding the dataset in memory
+        n_rows = self._fit_scalers_streaming(data_path)
+        
+        # 2. Transform chunk by chunk into memory-mapped .npy files
+        tmp_path = f"{cache_path}.tmp-{os.getpid()}"
+        os.makedirs(tmp_path, exist_ok=True)
+        try:
+            X_out = np.lib.format.open_memmap(
+                os.path.join(tmp_path, 'features.npy'), mode='w+',
+                dtype=np.float32, shape=(n_rows, len(self.feature_names()))
+            )
+            y_out = np.lib.format.open_memmap(
+                os.path.join(tmp_path, 'labels.npy'), mode='w+',
+                dtype=np.int8, shape=(n_rows,)
+            )
+            
+            offset = 0
+            for chunk in self._iter_training_chunks(data_path):
+                end = offset + len(chunk)
+                X_out[offset:end] = self._transform_frame(chunk)
+                y_out[offset:end] = chunk['Class'].values
+                offset = end
+            
+            X_out.flush()
+            y_out.flush()
+            del X_out, y_out
+            
+            joblib.dump(self.amount_scaler, os.path.join(tmp_path, 'amount_scaler.pkl'))
+            joblib.dump(self.feature_scaler, os.path.join(tmp_path, 'feature_scaler.pkl'))
+            with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+                json.dump({'rows': n_rows, 'data_watermark': self.data_watermark}, f)
+            
+            # Publish atomically; a concurrent builder may have won the race
+            try:
+                os.replace(tmp_path, cache_path)
+            except OSError:
+                logger.info("Feature cache already published by another process")
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        
+        logger.info(f"Feature cache written: {cache_path} ({n_rows} rows)")
+
+    def _fit_scalers_streaming(self, data_path: str) -> int:
+        """Fit scalers over CSV chunks and return the number of rows seen"""
+        self.feature_scaler = StandardScaler()
+        rng = np.random.default_rng(42)
+        sample = np.empty(ROBUST_SCALER_SAMPLE_SIZE, dtype=np.float32)
+        n_rows = 0
+        self.data_watermark = None
+        
+        for chunk in self._iter_training_chunks(data_path):
+            self._advance_watermark(chunk)
+            
+            # Standard scaler supports exact incremental fitting
+            self.feature_scaler.partial_fit(chunk[V_COLUMNS].values)
+            
+            # Robust scaler needs quantiles, so keep a uniform reservoir sample
+            n_rows = self._update_reservoir(sample, chunk['Amount'].values, n_rows, rng)
+        
+        if n_rows == 0:
+            raise ValueError(f"No rows found in training data: {data_path}")
+        
+        # Median and IQR of the reservoir approximate those of the full column
+        self.amount_scaler = RobustScaler()
+        self.amount_scaler.fit(sample[:min(n_rows, len(sample))].reshape(-1, 1))
+        logger.info(f"Fitted scalers over {n_rows} rows")
+        return n_rows
+
+    def _update_reservoir(self, sample: np.ndarray, values: np.ndarray,
+                          n_seen: int, rng: np.random.Generator) -> int:
+        """Vectorized reservoir sampling (Algorithm R) over one chunk"""
+        capacity = len(sample)
+        
+        # Fill the reservoir until it is full
+        n_fill = max(0, min(capacity - n_seen, len(values)))
+        sample[n_seen:n_seen + n_fill] = values[:n_fill]
+        
+        # Each later element i replaces a random slot with probability capacity / (i + 1)
+        rest = values[n_fill:]
+        if len(rest):
+            positions = np.arange(n_seen + n_fill, n_seen + len(values))
+            slots = rng.integers(0, positions + 1)
+            keep = slots < capacity
+            sample[slots[keep]] = rest[keep]
+        
+        return n_seen + len(values)
+
+    def _advance_watermark(self, chunk: pd.DataFrame):
+        """Track the latest event Time seen so far"""
+        if len(chunk):
+            chunk_max = float(chunk['Time'].max())
+            if self.data_watermark is None or chunk_max > self.data_watermark:
+                self.data_watermark = chunk_max
+
+    def prepare_update_data(self, data_path: str, since: float = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Prepare rows newer than `since` with the saved scalers, for incremental training"""
+        logger.info(f"Loading rows with Time > {since} from {data_path}...")
+        
+        # Incremental updates must reuse the champion's scalers, never refit them
+        self._load_preprocessors()
+        self.data_watermark = since
+        
+        X_parts, y_parts = [], []
+        for chunk in self._iter_training_chunks(data_path):
+            if since is not None:
+                chunk = chunk[chunk['Time'] > since]
+            if chunk.empty:
+                continue
+            self._advance_watermark(chunk)
+            X_parts.append(self._transform_frame(chunk))
+            y_parts.append(chunk['Class'].values)
+        
+        if not X_parts:
+            logger.info("No new rows since the last run")
+            return (np.empty((0, len(self.feature_names())), dtype=np.float32),
+                    np.empty(0, dtype=np.int8))
+        
+        X, y = np.vstack(X_parts), np.concatenate(y_parts)
+        logger.info(f"Loaded {len(y)} new rows")
+        self._check_data_distribution(y)
+        return X, y
     
     def prepare_prediction_data(self, transaction_data: Dict) -> np.ndarray:
         """Prepare single transaction data for prediction"""
@@ -71,8 +302,16 @@ class FraudDataPreprocessor:
         """Preprocess features for model"""
         logger.info("Preprocessing features...")
         
+        # Fit scalers on the in-memory frame
+        self.amount_scaler.fit(df['Amount'].values.reshape(-1, 1))
+        self.feature_scaler.fit(df[V_COLUMNS].values)
+        
+        return self._transform_frame(df)
+
+    def _transform_frame(self, df: pd.DataFrame) -> np.ndarray:
+        """Apply fitted scalers to a raw frame, returning float32 features"""
         # Scale amount
-        amount_scaled = self.amount_scaler.fit_transform(
+        amount_scaled = self.amount_scaler.transform(
             df['Amount'].values.reshape(-1, 1)
         )
         
@@ -80,11 +319,9 @@ class FraudDataPreprocessor:
         time_features = self._process_time_feature(df['Time'])
         
         # Scale V1-V28 features
-        v_features = self.feature_scaler.fit_transform(
-            df[['V%d' % i for i in range(1,29)]]
-        )
+        v_features = self.feature_scaler.transform(df[V_COLUMNS].values)
         
-        return np.hstack([v_features, amount_scaled, time_features])
+        return np.hstack([v_features, amount_scaled, time_features]).astype(np.float32, copy=False)
     
     def _process_time_feature(self, time_series: pd.Series) -> np.ndarray:
         """Process time feature into meaningful components"""
@@ -117,57 +354,63 @@ class FraudDataPreprocessor:
         )
         logger.info("Preprocessors loaded successfully")
 
+    def _ensure_preprocessors_loaded(self):
+        """Load saved preprocessors once per instance"""
+        if not self._preprocessors_loaded:
+            self._load_preprocessors()
+            self._preprocessors_loaded = True
+
+    def build_raw_features(self, transactions: List[Dict], timestamps: Optional[Sequence[float]] = None) -> pd.DataFrame:
+        """Build unscaled V1-V28, Amount and Time columns from raw transactions.
+
+        Shared by online scoring and the training exporter so both produce
+        identical inputs. Time is the event time in epoch seconds and defaults to now.
+        """
+        n_rows = len(transactions)
+        v_features = np.zeros((n_rows, 28), dtype=np.float32)
+        
+        def hashed(field):
+            # Stable across processes, unlike the built-in hash()
+            return hash_buckets([t.get(field) for t in transactions], self.hash_buckets).astype(np.float32)
+        
+        location = np.array([t.get('location_id') or 0 for t in transactions], dtype=np.float32)
+        card_hash = hashed('card_id')
+        
+        # 1. Pattern Risk (V1-V10)
+        v_features[:, 0] = card_hash
+        v_features[:, 1] = hashed('device_id')
+        v_features[:, 2] = hashed('ip_address')
+        # Remaining pattern features can be derived from other transaction patterns
+        
+        # 2. User Behavior (V11-V20)
+        v_features[:, 10] = card_hash  # Reuse card hash for user behavior
+        v_features[:, 11] = location
+        # Additional behavior features can be added here
+        
+        # 3. Location/Merchant Risk (V21-V28)
+        v_features[:, 20] = hashed('merchant_id')
+        v_features[:, 21] = location
+        # Additional location/merchant features can be added here
+        
+        frame = pd.DataFrame(v_features, columns=V_COLUMNS)
+        frame['Amount'] = np.array([t.get('amount') or 0.0 for t in transactions], dtype=np.float32)
+        if timestamps is None:
+            frame['Time'] = np.full(n_rows, time.time())
+        else:
+            frame['Time'] = np.asarray(timestamps, dtype=np.float64)
+        return frame
+
+    def transform_batch(self, transactions: List[Dict], timestamps: Optional[Sequence[float]] = None) -> np.ndarray:
+        """Transform raw transactions into a scaled feature matrix"""
+        self._ensure_preprocessors_loaded()
+        return self._transform_frame(self.build_raw_features(transactions, timestamps))
+
     def transform_transaction_data(self, transaction: Dict) -> np.ndarray:
         """Transform a raw transaction into model features"""
         try:
             logger.info("Transforming transaction data...")
             
-            # Load preprocessors if not already loaded
-            self._load_preprocessors()
-            
-            # Initialize feature arrays
-            pattern_features = np.zeros(10)    # V1-V10
-            behavior_features = np.zeros(10)   # V11-V20
-            location_features = np.zeros(8)    # V21-V28
-            
-            # 1. Pattern Risk (V1-V10)
-            card_hash = hash(transaction.get('card_id', '')) % 100
-            pattern_features[0] = card_hash
-            pattern_features[1] = float(hash(transaction.get('device_id', '')) % 100)
-            pattern_features[2] = float(hash(transaction.get('ip_address', '')) % 100)
-            # Remaining pattern features can be derived from other transaction patterns
-            
-            # 2. User Behavior (V11-V20)
-            behavior_features[0] = card_hash  # Reuse card hash for user behavior
-            behavior_features[1] = float(transaction.get('location_id', 0))
-            # Additional behavior features can be added here
-            
-            # 3. Location/Merchant Risk (V21-V28)
-            merchant_hash = hash(transaction.get('merchant_id', '')) % 100
-            location_features[0] = merchant_hash
-            location_features[1] = float(transaction.get('location_id', 0))
-            # Additional location/merchant features can be added here
-            
-            # Combine and reshape all V features
-            v_features = np.concatenate([
-                pattern_features,
-                behavior_features,
-                location_features
-            ]).reshape(1, -1)
-            
-            # Scale V features
-            v_features_scaled = self.feature_scaler.transform(v_features)
-            
-            # Scale amount
-            amount = float(transaction.get('amount', 0.0))
-            amount_scaled = self.amount_scaler.transform([[amount]])
-            
-            # Add time features
-            current_time = int(time.time() % 86400)  # Current time in seconds since midnight
-            time_features = self._process_time_feature(pd.Series([current_time]))
-            
-            # Combine all features
-            features = np.hstack([v_features_scaled, amount_scaled, time_features])
+            features = self.transform_batch([transaction])
             
             logger.info(f"Transaction transformed successfully. Feature shape: {features.shape}")
             return features
@@ -175,6 +418,7 @@ class FraudDataPreprocessor:
         except Exception as e:
             logger.error(f"Error transforming transaction: {str(e)}")
             raise ValueError(f"Error transforming transaction data: {str(e)}")
+
     def feature_names(self) -> list:
         """Return list of feature names"""
         return ([f'V{i}' for i in range(1, 29)] + 
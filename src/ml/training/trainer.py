@@ -10,18 +10,68 @@ import joblib
 import os
 import logging
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from src.config.settings import TRAINING_NTHREAD, OPTUNA_STORAGE, OPTUNA_STUDY_NAME
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class _OptunaPruningCallback(xgb.callback.TrainingCallback):
+    """Report per-round validation AUPRC to Optuna and stop pruned trials"""
+
+    def __init__(self, trial, stop_event: threading.Event, report: bool):
+        super().__init__()
+        self.trial = trial
+        self.stop_event = stop_event
+        self.report = report
+
+    def after_iteration(self, model, epoch, evals_log) -> bool:
+        # Another fold of the same trial was pruned
+        if self.stop_event.is_set():
+            return True
+        
+        # Only one fold reports so intermediate values form a single curve
+        if self.report:
+            self.trial.report(evals_log['eval']['aucpr'][-1], step=epoch)
+            if self.trial.should_prune():
+                self.stop_event.set()
+                return True
+        return False
+
 class FraudModelTrainer:
-    def __init__(self, model_dir='models'):
+    def __init__(self, model_dir='models', n_trials=20, nthread=None,
+                 parallel_folds=None, enable_pruning=True,
+                 storage=None, study_name=None, scale_pos_weight=None):
         self.model_dir = model_dir
+        self.n_trials = n_trials
+        self.storage = storage or OPTUNA_STORAGE
+        self.study_name = study_name or OPTUNA_STUDY_NAME
         self.cv = StratifiedKFold(n_splits=5, shuffle=True, random_state=42)
+        self.nthread = nthread or TRAINING_NTHREAD or os.cpu_count() or 1
+        self.parallel_folds = parallel_folds or min(self.cv.get_n_splits(), self.nthread)
+        self.enable_pruning = enable_pruning
+        # Class weight from the 'weight' imbalance strategy; None keeps the defaults
+        self.scale_pos_weight = scale_pos_weight
+        self._folds = None
+        self._executor = None
         os.makedirs(model_dir, exist_ok=True)
+
+    def _build_folds(self, X, y):
+        """Quantize every CV fold once so all trials share the same DMatrices"""
+        logger.info("Building cross-validation DMatrices...")
+        folds = []
+        for train_idx, val_idx in self.cv.split(X, y):
+            dtrain = xgb.QuantileDMatrix(X[train_idx], label=y[train_idx], nthread=self.nthread)
+            dval = xgb.QuantileDMatrix(X[val_idx], label=y[val_idx], ref=dtrain, nthread=self.nthread)
+            folds.append((dtrain, dval, np.asarray(y[val_idx])))
+        return folds
         
     def _objective(self, trial, X, y):
+        # Split the thread budget between folds running side by side
+        threads_per_fold = max(1, self.nthread // self.parallel_folds)
         param = {
             'max_depth': trial.suggest_int('max_depth', 2, 4),
             'learning_rate': trial.suggest_float('learning_rate', 0.01, 0.1),
@@ -33,18 +83,20 @@ class FraudModelTrainer:
             'objective': 'binary:logistic',
             'eval_metric': 'aucpr',
             'tree_method': 'hist',
-            'scale_pos_weight': 50
+            'scale_pos_weight': self.scale_pos_weight or 50,
+            'nthread': threads_per_fold
         }
         
         boost_rounds = trial.suggest_int('boost_rounds', 50, 200)
         
-        scores = []
-        for fold, (train_idx, val_idx) in enumerate(self.cv.split(X, y)):
-            X_train, X_val = X[train_idx], X[val_idx]
-            y_train, y_val = y[train_idx], y[val_idx]
-            
-            dtrain = xgb.DMatrix(X_train, label=y_train)
-            dval = xgb.DMatrix(X_val, label=y_val)
+        folds = self._folds or self._build_folds(X, y)
+        stop_event = threading.Event()
+        
+        def run_fold(fold):
+            dtrain, dval, y_val = folds[fold]
+            callbacks = []
+            if self.enable_pruning:
+                callbacks.append(_OptunaPruningCallback(trial, stop_event, report=(fold == 0)))
             
             model = xgb.train(
                 params=param,
@@ -52,33 +104,128 @@ class FraudModelTrainer:
                 num_boost_round=boost_rounds,
                 evals=[(dval, 'eval')],
                 early_stopping_rounds=10,
+                callbacks=callbacks,
                 verbose_eval=False
             )
+            if stop_event.is_set():
+                return None
             
             y_pred = model.predict(dval)
             precision, recall, _ = precision_recall_curve(y_val, y_pred)
             auprc = auc(recall, precision)
-            scores.append(auprc)
             
             logger.info(f"Fold {fold + 1} AUPRC: {auprc:.4f}")
+            return auprc
+        
+        if self._executor is not None and self.parallel_folds > 1:
+            scores = list(self._executor.map(run_fold, range(len(folds))))
+        else:
+            scores = [run_fold(fold) for fold in range(len(folds))]
+        
+        if stop_event.is_set():
+            logger.info(f"Trial {trial.number} pruned")
+            raise optuna.TrialPruned()
         
         mean_score = np.mean(scores)
         logger.info(f"Mean AUPRC: {mean_score:.4f} (std: {np.std(scores):.4f})")
         return mean_score
 
-    def train_model(self, X, y):
+    def _create_pruner(self):
+        """Median pruner over per-round AUPRC, or no pruning"""
+        if not self.enable_pruning:
+            return optuna.pruners.NopPruner()
+        return optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=10)
+
+    def _create_storage(self):
+        """RDB storage for persistent studies, or None for in-memory"""
+        if not self.storage:
+            return None
+        
+        engine_kwargs = {'pool_pre_ping': True}
+        if self.storage.startswith('sqlite'):
+            # Several worker processes share one SQLite file
+            engine_kwargs = {'connect_args': {'timeout': 60}}
+        
+        # Heartbeats let a resumed study detect trials left RUNNING by a crashed worker
+        return optuna.storages.RDBStorage(
+            url=self.storage,
+            engine_kwargs=engine_kwargs,
+            heartbeat_interval=60,
+            grace_period=180,
+            failed_trial_callback=optuna.storages.RetryFailedTrialCallback(max_retry=1)
+        )
+
+    def create_study(self):
+        """Create the study, or resume it if it already exists in storage"""
+        storage = self._create_storage()
+        study = optuna.create_study(
+            study_name=self.study_name if storage else None,
+            storage=storage,
+            direction='maximize',
+            pruner=self._create_pruner(),
+            load_if_exists=True
+        )
+        
+        n_finished = self._count_finished_trials(study)
+        if n_finished:
+            logger.info(f"Resuming study '{study.study_name}' with {n_finished} finished trials")
+        return study
+
+    def _count_finished_trials(self, study) -> int:
+        """Completed and pruned trials, which count towards n_trials"""
+        states = (optuna.trial.TrialState.COMPLETE, optuna.trial.TrialState.PRUNED)
+        return len(study.get_trials(deepcopy=False, states=states))
+
+    def run_search(self, X, y, study):
+        """Run trials until the study holds n_trials finished trials in total"""
+        # The cap is shared by every process working on the same study
+        max_trials = optuna.study.MaxTrialsCallback(
+            self.n_trials,
+            states=(optuna.trial.TrialState.COMPLETE, optuna.trial.TrialState.PRUNED)
+        )
+        remaining = self.n_trials - self._count_finished_trials(study)
+        if remaining <= 0:
+            logger.info(f"Study '{study.study_name}' already has {self.n_trials} finished trials")
+            return study
+        
+        self._folds = self._build_folds(X, y)
+        self._executor = ThreadPoolExecutor(max_workers=self.parallel_folds)
+        try:
+            study.optimize(
+                lambda trial: self._objective(trial, X, y),
+                n_trials=remaining,
+                callbacks=[max_trials],
+                show_progress_bar=True
+            )
+        finally:
+            self._executor.shutdown()
+            self._executor = None
+            self._folds = None
+        return study
+
+    def train_model(self, X, y, data_watermark=None):
         """Train the final model with the best parameters"""
         logger.info("Starting model training process...")
+        start_time = time.perf_counter()
         
-        study = optuna.create_study(direction='maximize')
-        study.optimize(
-            lambda trial: self._objective(trial, X, y),
-            n_trials=20,
-            show_progress_bar=True
-        )
+        study = self.create_study()
+        self.run_search(X, y, study)
         
-        best_params = study.best_params
+        search_time = time.perf_counter() - start_time
+        n_pruned = len(study.get_trials(deepcopy=False, states=(optuna.trial.TrialState.PRUNED,)))
+        logger.info(f"Hyperparameter search took {search_time:.1f}s ({n_pruned}/{self.n_trials} trials pruned)")
+        
+        final_model = self.fit_best_model(X, y, study, data_watermark=data_watermark)
+        
+        logger.info(f"train_model wall-clock time: {time.perf_counter() - start_time:.1f}s")
+        return final_model
+
+    def fit_best_model(self, X, y, study, data_watermark=None):
+        """Fit and save the final model from the study's best trial"""
+        best_params = dict(study.best_params)
         boost_rounds = best_params.pop('boost_rounds')  # Remove and store boost_rounds
+        if self.scale_pos_weight:
+            best_params['scale_pos_weight'] = self.scale_pos_weight
         logger.info(f"Best parameters: {best_params}")
         logger.info(f"Best boost rounds: {boost_rounds}")
         
@@ -86,10 +233,11 @@ class FraudModelTrainer:
             **best_params,
             'objective': 'binary:logistic',
             'eval_metric': 'aucpr',
-            'tree_method': 'hist'
+            'tree_method': 'hist',
+            'nthread': self.nthread
         }
         
-        dtrain = xgb.DMatrix(X, label=y)
+        dtrain = xgb.QuantileDMatrix(X, label=y, nthread=self.nthread)
         
         final_model = xgb.train(
             params=final_params,
@@ -98,11 +246,109 @@ class FraudModelTrainer:
             verbose_eval=True
         )
         
-        self._save_model(final_model, best_params, study.best_value)
+        lineage = {
+            'mode': 'full',
+            'generation': 0,
+            'root_model': None,
+            'parent_model': None,
+            'training_rows': int(len(y))
+        }
+        self._save_model(final_model, best_params, study.best_value,
+                         lineage=lineage, data_watermark=data_watermark)
         
         return final_model
+
+    def latest_model(self):
+        """Return (model_path, metadata) of the current champion"""
+        model_files = sorted(
+            f for f in os.listdir(self.model_dir)
+            if f.startswith('fraud_model_') and f.endswith('.json')
+        )
+        if not model_files:
+            raise FileNotFoundError("No model files found in models directory")
+        
+        model_file = model_files[-1]
+        timestamp = model_file[len('fraud_model_'):-len('.json')]
+        metadata_path = os.path.join(self.model_dir, f'model_metadata_{timestamp}.json')
+        with open(metadata_path) as f:
+            metadata = json.load(f)
+        return os.path.join(self.model_dir, model_file), metadata
+
+    def incremental_watermark(self, since=None):
+        """Time after which rows are new to the champion: `since` if given, else its data watermark"""
+        model_path, metadata = self.latest_model()
+        watermark = metadata.get('data_watermark') if since is None else since
+        if watermark is None:
+            # Every row would count as new, and the update would re-learn the champion's own data
+            raise ValueError(
+                f"{model_path} has no data watermark; pass the time its training data ends "
+                f"(--since) or retrain without --incremental"
+            )
+        return watermark
+
+    def update_model(self, X, y, max_new_trees=50, max_total_trees=400,
+                     refresh_leaves=False, data_watermark=None):
+        """Continue boosting the champion on newly labeled rows instead of retraining"""
+        start_time = time.perf_counter()
+        parent_path, parent_metadata = self.latest_model()
+        logger.info(f"Incremental update of {parent_path} with {len(y)} new rows")
+        
+        booster = xgb.Booster()
+        booster.load_model(parent_path)
+        trees_before = booster.num_boosted_rounds()
+        
+        params = {
+            **parent_metadata['parameters'],
+            'objective': 'binary:logistic',
+            'eval_metric': 'aucpr',
+            'tree_method': 'hist',
+            'nthread': self.nthread
+        }
+        dtrain = xgb.DMatrix(X, label=y, nthread=self.nthread)
+        
+        # 1. Optionally re-fit leaf values of the existing trees on the new rows
+        if refresh_leaves:
+            logger.info(f"Refreshing leaf values of {trees_before} trees")
+            refresh_params = {k: v for k, v in params.items() if k != 'tree_method'}
+            booster = xgb.train(
+                params={**refresh_params, 'process_type': 'update', 'updater': 'refresh', 'refresh_leaf': True},
+                dtrain=dtrain,
+                num_boost_round=trees_before,
+                xgb_model=booster
+            )
+        
+        # 2. Append new trees, never growing past max_total_trees
+        trees_to_add = max(0, min(max_new_trees, max_total_trees - trees_before))
+        if trees_to_add == 0:
+            logger.warning(f"Model already has {trees_before} trees (cap {max_total_trees}); no trees added")
+        else:
+            booster = xgb.train(
+                params=params,
+                dtrain=dtrain,
+                num_boost_round=trees_to_add,
+                xgb_model=booster
+            )
+        
+        parent_lineage = parent_metadata.get('lineage', {})
+        lineage = {
+            'mode': 'incremental',
+            'generation': parent_lineage.get('generation', 0) + 1,
+            'root_model': parent_lineage.get('root_model') or os.path.basename(parent_path),
+            'parent_model': os.path.basename(parent_path),
+            'parent_data_watermark': parent_metadata.get('data_watermark'),
+            'training_rows': int(len(y)),
+            'positive_rows': int(np.sum(y)),
+            'trees_before': trees_before,
+            'trees_added': trees_to_add,
+            'leaves_refreshed': refresh_leaves
+        }
+        self._save_model(booster, parent_metadata['parameters'], parent_metadata['best_score'],
+                         lineage=lineage, data_watermark=data_watermark)
+        
+        logger.info(f"Incremental update took {time.perf_counter() - start_time:.1f}s")
+        return booster
     
-    def _save_model(self, model, params, best_score):
+    def _save_model(self, model, params, best_score, lineage=None, data_watermark=None):
         """Save model and its metadata"""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         
@@ -113,6 +359,8 @@ class FraudModelTrainer:
             'timestamp': timestamp,
             'parameters': params,
             'best_score': float(best_score),
+            'data_watermark': data_watermark,
+            'lineage': lineage,
             'feature_importance': {
                 f'f{i}': float(score) 
                 for i, score in enumerate(model.get_score(importance_type='gain').values())
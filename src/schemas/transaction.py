@@ -1,9 +1,10 @@
 # src/schemas/transaction.py
 
-from pydantic import BaseModel, Field, validator
+from pydantic import BaseModel, Field, TypeAdapter, field_validator
 from datetime import datetime
-from typing import Dict, Optional, Any, List
+from typing import Annotated, Dict, Optional, Any, List
 from decimal import Decimal
+from src.config.settings import VERIFY_BATCH_MAX_SIZE
 
 class TransactionCreate(BaseModel):
     card_id: str = Field(..., description="Unique identifier of the card")
@@ -12,27 +13,42 @@ class TransactionCreate(BaseModel):
     location_id: Optional[int] = Field(None, description="Location identifier")
     device_id: Optional[str] = Field(None, description="Device identifier")
     ip_address: Optional[str] = Field(None, description="IP address of the transaction")
+    idempotency_key: Optional[str] = Field(
+        None, max_length=100,
+        description="Client request ID; retries with the same key return the original result"
+    )
 
-    @validator('amount')
+    @field_validator('amount')
+    @classmethod
     def validate_amount(cls, v):
         if v <= 0:
             raise ValueError('Amount must be positive')
+        # Amounts with at most two decimals (nearly all of them) are already quantized
+        if round(v, 2) == v:
+            return v
         return float(Decimal(str(v)).quantize(Decimal('0.01')))
 
-    @validator('card_id')
+    @field_validator('card_id')
+    @classmethod
     def validate_card_id(cls, v):
-        if not v or len(v.strip()) == 0:
+        v = v.strip()
+        if not v:
             raise ValueError('Card ID cannot be empty')
-        return v.strip()
+        return v
 
-    @validator('merchant_id')
+    @field_validator('merchant_id')
+    @classmethod
     def validate_merchant_id(cls, v):
-        if not v or len(v.strip()) == 0:
+        v = v.strip()
+        if not v:
             raise ValueError('Merchant ID cannot be empty')
-        return v.strip()
+        return v
 
 class TransactionResponse(BaseModel):
-    transaction_id: int = Field(..., description="Unique identifier of the transaction")
+    transaction_id: Optional[int] = Field(
+        None,
+        description="Unique identifier of the transaction; null while its write is deferred"
+    )
     card_id: str = Field(..., description="Card identifier")
     merchant_id: str = Field(..., description="Merchant identifier")
     amount: float = Field(..., description="Transaction amount")
@@ -64,11 +80,29 @@ class TransactionResponse(BaseModel):
         ..., ge=0, le=1,
         description="Risk score based on user behavior"
     )
+    link_risk_score: float = Field(
+        0.0, ge=0, le=1,
+        description="Risk score from the cards sharing the transaction's device, IP and card cluster"
+    )
     
     risk_level: str = Field(
         ...,
         description="Risk level category (LOW/MEDIUM/HIGH)"
     )
+    block_reason: Optional[str] = Field(
+        None,
+        description="Why the transaction was blocked without scoring, when its card, device or IP is blocklisted"
+    )
+    degraded: List[str] = Field(
+        default_factory=list,
+        description="Steps skipped to meet the latency budget or ride out an outage (blocklist_unconfirmed, feature_lookup_skipped, card_lookup_skipped, rule_only_score, persistence_deferred)"
+    )
+
+    @field_validator('degraded', mode='before')
+    @classmethod
+    def validate_degraded(cls, v):
+        # Rows stored before degradations were recorded have none
+        return [] if v is None else v
 
     class Config:
         from_attributes = True
@@ -86,6 +120,22 @@ class TransactionResponse(BaseModel):
                 "amount_risk_score": 0.3,
                 "pattern_risk_score": 0.2,
                 "user_behavior_risk_score": 0.1,
+                "link_risk_score": 0.2,
                 "risk_level": "LOW"
             }
-        }
\ No newline at end of file
+        }
+
+class TransactionError(BaseModel):
+    """In place of a batch item's result when that transaction failed"""
+    idempotency_key: Optional[str] = Field(None, description="The transaction's idempotency key, if it had one")
+    status_code: int = Field(
+        ...,
+        description="Status a single verify would have answered with (422 key reused for a different request, 503 overloaded, 500 error)"
+    )
+    detail: str = Field(..., description="What went wrong")
+
+# Built once at import; validate_json parses and validates request bytes in one pass
+transaction_adapter = TypeAdapter(TransactionCreate)
+transaction_batch_adapter = TypeAdapter(
+    Annotated[List[TransactionCreate], Field(min_length=1, max_length=VERIFY_BATCH_MAX_SIZE)]
+)
@@ -0,0 +1,263 @@
+# src/services/backfill.py
+
+import json
+import multiprocessing
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+from sqlalchemy import create_engine, func, select, update
+from sqlalchemy.orm import Session, sessionmaker
+from src.database.models import Transaction
+from src.ml.prediction.predictor import FraudPredictor
+from src.services.transaction_service import risk_level_for, status_for
+from src.utils.logging_config import setup_logging
+
+# Setup logger
+logger = setup_logging(__name__)
+
+class ScoreBackfill:
+    """
+    Re-scores stored transactions with one model and writes the results back.
+
+    Rows are read by primary key in keyset-paginated batches, so a range can
+    be processed by any worker and re-running it is harmless. Features are
+    rebuilt with each transaction's own event time. Every batch is written
+    with one bulk UPDATE and committed. Blocklisted rows are skipped.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], predictor: FraudPredictor,
+                 batch_size: int = 5000, since: datetime = None, until: datetime = None):
+        self.session_factory = session_factory
+        self.predictor = predictor
+        self.batch_size = batch_size
+        self.since = since
+        self.until = until
+
+    def _filtered(self, query):
+        # Blocklisted rows keep the decision the blocklist forced
+        query = query.where(Transaction.block_reason.is_(None))
+        if self.since is not None:
+            query = query.where(Transaction.timestamp >= self.since)
+        if self.until is not None:
+            query = query.where(Transaction.timestamp < self.until)
+        return query
+
+    def id_ranges(self, range_size: int) -> List[Tuple[int, int]]:
+        """Half-open [start, end) transaction_id ranges covering the selected rows"""
+        db = self.session_factory()
+        try:
+            low, high = db.execute(self._filtered(
+                select(func.min(Transaction.transaction_id), func.max(Transaction.transaction_id))
+            )).one()
+        finally:
+            db.close()
+        if low is None:
+            return []
+        return [(start, min(start + range_size, high + 1)) for start in range(low, high + 1, range_size)]
+
+    def rescore_range(self, start_id: int, end_id: int) -> Dict:
+        """Re-score one id range; returns row count and risk level transitions"""
+        started = time.perf_counter()
+        transitions = Counter()
+        sum_delta = 0.0
+        rows_done = 0
+        cursor = start_id
+
+        db = self.session_factory()
+        try:
+            while cursor < end_id:
+                rows = db.execute(self._filtered(
+                    select(
+                        Transaction.transaction_id, Transaction.card_id, Transaction.merchant_id,
+                        Transaction.amount, Transaction.timestamp, Transaction.location_id,
+                        Transaction.device_id, Transaction.ip_address, Transaction.fraud_probability,
+                        Transaction.risk_level, Transaction.merchant_risk_score,
+                        Transaction.location_risk_score, Transaction.amount_risk_score,
+                        Transaction.link_risk_score
+                    )
+                    .where(Transaction.transaction_id >= cursor, Transaction.transaction_id < end_id)
+                    .order_by(Transaction.transaction_id)
+                    .limit(self.batch_size)
+                )).all()
+                if not rows:
+                    break
+
+                updates = self._score(rows)
+                db.execute(update(Transaction), updates)
+                db.commit()
+
+                for row, values in zip(rows, updates):
+                    transitions[f"{row.risk_level}->{values['risk_level']}"] += 1
+                    sum_delta += values['fraud_probability'] - (row.fraud_probability or 0.0)
+                rows_done += len(rows)
+                cursor = rows[-1].transaction_id + 1
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        return {
+            'rows': rows_done,
+            'seconds': time.perf_counter() - started,
+            'sum_probability_delta': sum_delta,
+            'transitions': dict(transitions)
+        }
+
+    def _score(self, rows) -> List[Dict]:
+        """Bulk UPDATE parameters (keyed by primary key) for one batch"""
+        features = [
+            {
+                'card_id': row.card_id,
+                'merchant_id': row.merchant_id,
+                'amount': float(row.amount),
+                # Missing locations are encoded as 0 by the feature builder anyway
+                'location_id': row.location_id or 0,
+                'device_id': row.device_id,
+                'ip_address': row.ip_address
+            }
+            for row in rows
+        ]
+        # Event time stored as naive UTC, as in the training exporter
+        timestamps = [
+            row.timestamp.replace(tzinfo=timezone.utc).timestamp() if row.timestamp else np.nan
+            for row in rows
+        ]
+        predictions = self.predictor.predict_batch(features, timestamps)
+
+        analyzed_at = datetime.utcnow()
+        updates = []
+        for row, prediction in zip(rows, predictions):
+            components = prediction['risk_components']
+            # Same rule store_transaction applies, with the rule scores stored at decision time
+            risk_level = risk_level_for(prediction['fraud_probability'], [
+                row.merchant_risk_score or 0.0, row.location_risk_score or 0.0, row.amount_risk_score or 0.0,
+                components['pattern_risk'], components['user_behavior_risk'], row.link_risk_score or 0.0
+            ])
+            updates.append({
+                'transaction_id': row.transaction_id,
+                'fraud_probability': prediction['fraud_probability'],
+                'risk_level': risk_level,
+                'status': status_for(risk_level),
+                'pattern_risk_score': components['pattern_risk'],
+                'user_behavior_risk_score': components['user_behavior_risk'],
+                'analysis_version': self.predictor.model_file,
+                'analyzed_at': analyzed_at
+            })
+        return updates
+
+class BackfillCheckpoint:
+    """Completed ranges of one backfill run, rewritten atomically after each range"""
+
+    def __init__(self, path: str, run: Dict):
+        self.path = path
+        self.run = run
+        self.completed: Dict[str, Dict] = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            if state['run'] != run:
+                raise ValueError(
+                    f"Checkpoint {path} belongs to a different run ({state['run']}); "
+                    f"remove it or choose another checkpoint path"
+                )
+            self.completed = state['completed']
+
+    @staticmethod
+    def key(id_range: Tuple[int, int]) -> str:
+        return f"{id_range[0]}-{id_range[1]}"
+
+    def is_done(self, id_range: Tuple[int, int]) -> bool:
+        return self.key(id_range) in self.completed
+
+    def mark_done(self, id_range: Tuple[int, int], result: Dict) -> None:
+        self.completed[self.key(id_range)] = result
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'run': self.run, 'completed': self.completed}, f)
+        os.replace(tmp_path, self.path)
+
+# Per-process state for pool workers
+_worker_backfill: Optional[ScoreBackfill] = None
+
+def _init_worker(database_url: str, model_dir: str, model_file: str, batch_size: int,
+                 since: Optional[datetime], until: Optional[datetime], nthread: int) -> None:
+    global _worker_backfill
+    engine = create_engine(database_url)
+    predictor = FraudPredictor(model_dir=model_dir, cascade=False, shadow=False, model_file=model_file)
+    # Workers share the machine; keep each booster to its share of the cores
+    predictor.set_nthread(nthread)
+    _worker_backfill = ScoreBackfill(sessionmaker(bind=engine), predictor, batch_size, since, until)
+
+def _rescore_in_worker(id_range: Tuple[int, int]) -> Dict:
+    return _worker_backfill.rescore_range(*id_range)
+
+def run_backfill(database_url: str, model_dir: str, model_file: str, checkpoint_path: str,
+                 workers: int, range_size: int, batch_size: int,
+                 since: datetime = None, until: datetime = None) -> Dict:
+    """
+    Split the selected transactions into id ranges and re-score them on a
+    process pool. Ranges already recorded in the checkpoint are skipped, so an
+    interrupted run resumes where it stopped. Returns totals over all ranges.
+    """
+    run = {
+        'model_file': model_file,
+        'since': since.isoformat() if since else None,
+        'until': until.isoformat() if until else None,
+        'range_size': range_size
+    }
+    checkpoint = BackfillCheckpoint(checkpoint_path, run)
+
+    engine = create_engine(database_url)
+    planner = ScoreBackfill(sessionmaker(bind=engine), predictor=None, since=since, until=until)
+    ranges = planner.id_ranges(range_size)
+    engine.dispose()
+    pending = [id_range for id_range in ranges if not checkpoint.is_done(id_range)]
+    logger.info(f"Backfill with {model_file}: {len(ranges)} ranges, {len(pending)} left, {workers} workers")
+
+    started = time.perf_counter()
+    rows_done = 0
+    if pending:
+        nthread = max(1, (os.cpu_count() or 1) // workers)
+        # Spawned, not forked: DB connections and XGBoost's thread pool are not fork-safe
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(database_url, model_dir, model_file, batch_size, since, until, nthread)
+        ) as pool:
+            futures = {pool.submit(_rescore_in_worker, id_range): id_range for id_range in pending}
+            for future in as_completed(futures):
+                id_range = futures[future]
+                result = future.result()
+                checkpoint.mark_done(id_range, result)
+                rows_done += result['rows']
+                elapsed = time.perf_counter() - started
+                logger.info(
+                    f"Range {id_range[0]}-{id_range[1]}: {result['rows']} rows in {result['seconds']:.1f}s; "
+                    f"{len(checkpoint.completed)}/{len(ranges)} ranges, {rows_done / elapsed:.0f} rows/s"
+                )
+
+    return summarize(checkpoint.completed.values(), time.perf_counter() - started, rows_done)
+
+def summarize(results, elapsed: float, rows_this_run: int) -> Dict:
+    """Totals over every completed range, including those from earlier runs"""
+    transitions = Counter()
+    rows = 0
+    sum_delta = 0.0
+    for result in results:
+        rows += result['rows']
+        sum_delta += result['sum_probability_delta']
+        transitions.update(result['transitions'])
+    return {
+        'rows': rows,
+        'rows_this_run': rows_this_run,
+        'seconds': round(elapsed, 3),
+        'rows_per_second': round(rows_this_run / elapsed, 1) if elapsed > 0 else None,
+        'mean_probability_delta': sum_delta / rows if rows else None,
+        'risk_level_transitions': dict(transitions.most_common())
+    }
@@ -0,0 +1,243 @@
+# src/services/blocklist.py
+
+import json
+import math
+import os
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from src.config.settings import BLOCKLIST_DIR, BLOCKLIST_RELOAD_SECONDS
+from src.database.models import BlocklistEntry
+from src.database.routing import replica_read
+from src.ml.preprocessing.hashing import stable_hash, stable_hash_one
+from src.utils.logging_config import setup_logging
+from src.utils.versioned_files import publish_version
+
+# Setup logger
+logger = setup_logging(__name__)
+
+ENTITY_TYPES = ('card', 'device', 'ip')
+
+def _probes(hashes: np.ndarray, n_hashes: int, n_bits: int) -> np.ndarray:
+    """(len(hashes), n_hashes) bit positions, by double hashing with the two 32-bit halves"""
+    low = hashes & np.uint64(0xFFFFFFFF)
+    step = (hashes >> np.uint64(32)) | np.uint64(1)
+    return (low[:, None] + np.arange(n_hashes, dtype=np.uint64)[None, :] * step[:, None]) % np.uint64(n_bits)
+
+class BloomFilter:
+    """
+    Bloom filter over stable_hash of string values. Never misses an added
+    value; reports a value that was not added with about the false positive
+    rate it was sized for. The bits are a plain uint8 array, so a saved
+    filter can be memory-mapped.
+    """
+
+    def __init__(self, bits: np.ndarray, n_hashes: int, entries: int):
+        self.bits = bits
+        self.n_bits = len(bits) * 8
+        self.n_hashes = n_hashes
+        self.entries = entries
+        # Indexing a memoryview returns Python ints, much cheaper than numpy scalars
+        self._bytes = memoryview(bits)
+
+    @classmethod
+    def build(cls, values: Sequence[str], false_positive_rate: float = 0.001,
+              chunk_size: int = 1000000) -> 'BloomFilter':
+        n = max(len(values), 1)
+        n_bits = math.ceil(-n * math.log(false_positive_rate) / math.log(2) ** 2)
+        n_bits = max(64, (n_bits + 63) // 64 * 64)
+        # Optimal count, capped: tiny filters would otherwise probe dozens of bits
+        n_hashes = min(16, max(1, round(n_bits / n * math.log(2))))
+        flags = np.zeros(n_bits, dtype=bool)
+        for start in range(0, len(values), chunk_size):
+            flags[_probes(stable_hash(values[start:start + chunk_size]), n_hashes, n_bits).ravel()] = True
+        return cls(np.packbits(flags, bitorder='little'), n_hashes, len(values))
+
+    def __contains__(self, value: str) -> bool:
+        h = stable_hash_one(value)
+        low, step = h & 0xFFFFFFFF, (h >> 32) | 1
+        data, n_bits = self._bytes, self.n_bits
+        for i in range(self.n_hashes):
+            position = (low + i * step) % n_bits
+            if not data[position >> 3] >> (position & 7) & 1:
+                return False
+        return True
+
+    def contains_many(self, values: Sequence[str]) -> np.ndarray:
+        positions = _probes(stable_hash(values), self.n_hashes, self.n_bits)
+        return ((self.bits[positions >> np.uint64(3)] >> (positions & np.uint64(7)).astype(np.uint8)) & 1).all(axis=1)
+
+def build_filters(values_by_type: Dict[str, Sequence[str]], output_dir: str,
+                  false_positive_rate: float = 0.001) -> Dict:
+    """Write one filter per entity type, plus meta.json, to output_dir; returns the metadata"""
+    os.makedirs(output_dir, exist_ok=True)
+    filters = {}
+    for entity_type, values in values_by_type.items():
+        bloom = BloomFilter.build(values, false_positive_rate)
+        np.save(os.path.join(output_dir, f"{entity_type}.npy"), bloom.bits)
+        filters[entity_type] = {'entries': bloom.entries, 'bits': bloom.n_bits, 'hashes': bloom.n_hashes}
+    meta = {
+        'built_at': datetime.utcnow().isoformat(),
+        'false_positive_rate': false_positive_rate,
+        'filters': filters,
+        'nbytes': sum(info['bits'] // 8 for info in filters.values())
+    }
+    with open(os.path.join(output_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+def load_entries(db: Session) -> Dict[str, List[str]]:
+    """Every blocklisted id, by entity type"""
+    values_by_type: Dict[str, List[str]] = {entity_type: [] for entity_type in ENTITY_TYPES}
+    rows = db.execute(select(BlocklistEntry.entity_type, BlocklistEntry.entity_id)).yield_per(100000)
+    for entity_type, entity_id in rows:
+        values_by_type.setdefault(entity_type, []).append(entity_id)
+    return values_by_type
+
+def entries_version(db: Session) -> Tuple:
+    """Changes whenever entries are added or removed; cheap enough to poll"""
+    return tuple(db.execute(select(func.count(), func.max(BlocklistEntry.created_at))).one())
+
+def import_entries(db: Session, entries: Iterable[Tuple[str, str, str]], source: Optional[str] = None,
+                   batch_size: int = 5000) -> int:
+    """Upsert (entity_type, entity_id, reason) rows into blocklist_entries"""
+    insert = postgresql.insert if db.bind.dialect.name == 'postgresql' else sqlite.insert
+    now = datetime.utcnow()
+    count = 0
+    batch = []
+
+    def flush():
+        statement = insert(BlocklistEntry).values(batch)
+        db.execute(statement.on_conflict_do_update(
+            index_elements=['entity_type', 'entity_id'],
+            set_={'reason': statement.excluded.reason, 'source': statement.excluded.source}
+        ))
+        batch.clear()
+
+    for entity_type, entity_id, reason in entries:
+        if entity_type not in ENTITY_TYPES:
+            raise ValueError(f"Unknown blocklist entity type: {entity_type}")
+        batch.append({'entity_type': entity_type, 'entity_id': str(entity_id), 'reason': reason,
+                      'source': source, 'created_at': now})
+        count += 1
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    db.commit()
+    logger.info(f"Imported {count} blocklist entries")
+    return count
+
+def publish_filters(db: Session, root_dir: str, false_positive_rate: float = 0.001, keep: int = 2) -> str:
+    """Build filters from blocklist_entries as a new version under root_dir and make it current"""
+    values_by_type = load_entries(db)
+    return publish_version(root_dir, lambda path: build_filters(values_by_type, path, false_positive_rate), keep)
+
+class BlocklistFilters:
+    """The per-type filters of one version directory, memory-mapped"""
+
+    def __init__(self, path: str):
+        self.path = os.path.realpath(path)
+        with open(os.path.join(self.path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self.filters = {
+            entity_type: BloomFilter(
+                np.asarray(np.load(os.path.join(self.path, f"{entity_type}.npy"), mmap_mode='r')),
+                info['hashes'], info['entries']
+            )
+            for entity_type, info in self.meta['filters'].items()
+        }
+
+    def might_contain(self, entity_type: str, value: str) -> bool:
+        bloom = self.filters.get(entity_type)
+        return bloom is not None and bloom.entries > 0 and value in bloom
+
+class Blocklist:
+    """
+    Pre-check of a transaction's card, device and IP against the blocklist.
+
+    The filters (the `current` version under a directory, reopened when the
+    link changes, like IpRiskLookup) rule out almost every transaction
+    without touching the database. A filter hit is confirmed with one exact
+    query on blocklist_entries, which drops the filter's false positives
+    and entries removed since the build. Entries added since the build are
+    missed until the filters are republished.
+    """
+
+    def __init__(self, path: str, reload_interval_seconds: float = 30.0):
+        self.path = path
+        self.reload_interval_seconds = reload_interval_seconds
+        self._filters: Optional[BlocklistFilters] = None
+        self._target: Optional[str] = None
+        self._checked_at = -float('inf')
+        self.counts = Counter()
+
+    def filters(self) -> Optional[BlocklistFilters]:
+        now = time.monotonic()
+        if now - self._checked_at >= self.reload_interval_seconds:
+            self._checked_at = now
+            self._reload()
+        return self._filters
+
+    def _reload(self) -> None:
+        target = os.path.realpath(self.path)
+        if target == self._target:
+            return
+        self._target = target
+        if not os.path.isfile(os.path.join(target, 'meta.json')):
+            logger.warning(f"No blocklist filters at {self.path}; keeping the current ones, if any")
+            return
+        try:
+            filters = BlocklistFilters(target)
+        except Exception as e:
+            logger.error(f"Failed to open blocklist filters {target}: {str(e)}")
+            self._target = None
+            return
+        self._filters = filters
+        logger.info(f"Loaded blocklist filters {target}: " + ", ".join(
+            f"{info['entries']} {entity_type}" for entity_type, info in filters.meta['filters'].items()
+        ))
+
+    def check(self, db: Session, card_id: str, device_id: Optional[str] = None,
+              ip_address: Optional[str] = None) -> Optional[str]:
+        """The block reason of the first blocklisted entity, or None"""
+        filters = self.filters()
+        if filters is None:
+            return None
+        self.counts['checked'] += 1
+        candidates = [
+            (entity_type, str(value)) for entity_type, value in
+            (('card', card_id), ('device', device_id), ('ip', ip_address))
+            if value and filters.might_contain(entity_type, str(value))
+        ]
+        if not candidates:
+            return None
+
+        self.counts['filter_hits'] += 1
+        entries = replica_read(db, lambda: db.query(BlocklistEntry).filter(
+            tuple_(BlocklistEntry.entity_type, BlocklistEntry.entity_id).in_(candidates)
+        ).all())
+        if not entries:
+            self.counts['false_positives'] += 1
+            return None
+        self.counts['blocked'] += 1
+        # Report in card, device, IP order
+        entry = min(entries, key=lambda entry: ENTITY_TYPES.index(entry.entity_type))
+        return f"{entry.entity_type} blocklisted: {entry.reason}"
+
+    def stats(self) -> Dict:
+        filters = self._filters
+        return {
+            'version': os.path.basename(filters.path) if filters else None,
+            'built_at': filters.meta['built_at'] if filters else None,
+            'entries': {entity_type: info['entries'] for entity_type, info in filters.meta['filters'].items()} if filters else {},
+            **self.counts
+        }
+
+# One per worker; the mapped filters are shared by all workers through the page cache
+blocklist = Blocklist(os.path.join(BLOCKLIST_DIR, 'current'), BLOCKLIST_RELOAD_SECONDS)
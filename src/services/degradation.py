@@ -0,0 +1,256 @@
+# src/services/degradation.py
+
+import math
+import queue
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+from sqlalchemy.exc import InterfaceError, OperationalError
+from src.utils.logging_config import setup_logging
+
+# Setup logger
+logger = setup_logging(__name__)
+
+class Overloaded(Exception):
+    """Work rejected to protect latency; the client should retry after `retry_after_seconds`"""
+
+    def __init__(self, reason: str, retry_after_seconds: float):
+        super().__init__(reason)
+        self.retry_after_seconds = retry_after_seconds
+
+class StageLatency:
+    """
+    Recent latency of each request stage (exponentially weighted), used to
+    decide up front whether a stage fits in what is left of a budget.
+
+    A stage that does not fit is skipped, which means it is no longer
+    measured; so once every `probe_interval_seconds` one request runs it
+    anyway, and a recovered dependency is picked up again. Stages run on
+    threadpool threads, so updates are locked.
+    """
+
+    def __init__(self, alpha: float = 0.2, probe_interval_seconds: float = 1.0):
+        self.alpha = alpha
+        self.probe_interval_seconds = probe_interval_seconds
+        self._ewma_ms: Dict[str, float] = {}
+        self._last_run: Dict[str, float] = {}
+        self.degradations = Counter()
+        self._lock = threading.Lock()
+
+    def fits(self, stage: str, budget_ms: float) -> bool:
+        estimate = self._ewma_ms.get(stage)
+        if estimate is None or estimate <= budget_ms:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_run.get(stage, 0.0) >= self.probe_interval_seconds:
+                self._last_run[stage] = now
+                return True
+        return False
+
+    def record(self, stage: str, elapsed_ms: float) -> None:
+        with self._lock:
+            previous = self._ewma_ms.get(stage)
+            self._ewma_ms[stage] = elapsed_ms if previous is None else previous + self.alpha * (elapsed_ms - previous)
+            self._last_run[stage] = time.monotonic()
+
+    def count_degradation(self, step: str) -> None:
+        with self._lock:
+            self.degradations[step] += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'latency_ms': {stage: round(value, 3) for stage, value in self._ewma_ms.items()},
+                'degradations': dict(self.degradations)
+            }
+
+class Deadline:
+    """
+    Time budget of one request, handed down through its stages.
+
+    Each stage gets its own budget, capped by what is left of the request's.
+    `allows(stage)` says whether the stage is expected to finish in time;
+    callers that get False take their degraded path and record it with
+    `degrade`, so the response can say what was skipped.
+    """
+
+    def __init__(self, budget_ms: float, stage_budgets_ms: Dict[str, float], latency: StageLatency):
+        self.budget_ms = budget_ms
+        self.expires_at = time.monotonic() + budget_ms / 1000
+        self.stage_budgets_ms = stage_budgets_ms
+        self.latency = latency
+        self.degraded: List[str] = []
+
+    def remaining_ms(self) -> float:
+        return max(0.0, (self.expires_at - time.monotonic()) * 1000)
+
+    def stage_budget_ms(self, stage: str) -> float:
+        return min(self.stage_budgets_ms.get(stage, math.inf), self.remaining_ms())
+
+    def allows(self, stage: str) -> bool:
+        return self.latency.fits(stage, self.stage_budget_ms(stage))
+
+    @contextmanager
+    def measure(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.latency.record(stage, (time.perf_counter() - start) * 1000)
+
+    def degrade(self, step: str) -> None:
+        self.degraded.append(step)
+        self.latency.count_degradation(step)
+
+class DeferredWriteQueue:
+    """
+    Bounded queue of writes taken off the request path, applied in order by
+    one background thread.
+
+    While the database is unavailable the head write is retried with
+    backoff, so nothing is lost short of a process exit; any other error
+    drops that write with a log line. The queue lives in memory only.
+    """
+
+    def __init__(self, write: Callable[[Any], None], max_size: int = 10000,
+                 retry_seconds: float = 0.5, max_retry_seconds: float = 10.0):
+        self.write = write
+        self.max_size = max_size
+        self.retry_seconds = retry_seconds
+        self.max_retry_seconds = max_retry_seconds
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_size)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._drain_rate: Optional[float] = None
+        self.written = 0
+        self.failed = 0
+        self.retries = 0
+
+    def submit(self, item: Any) -> bool:
+        """Queue a write; False when the queue is full"""
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            return False
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def drain_rate(self) -> Optional[float]:
+        """Recent writes per second, or None before the first write"""
+        return self._drain_rate
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="deferred-writes", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                item = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            self._apply(item)
+
+    def _apply(self, item: Any) -> None:
+        delay = self.retry_seconds
+        while True:
+            start = time.perf_counter()
+            try:
+                self.write(item)
+            except (OperationalError, InterfaceError) as e:
+                self.retries += 1
+                logger.warning(f"Deferred write failed, retrying in {delay:.1f}s: {str(e)}")
+                if self._stop.wait(delay):
+                    # Shutting down while the database is away; put it back to be counted as lost
+                    self._queue.put_nowait(item)
+                    return
+                delay = min(delay * 2, self.max_retry_seconds)
+                continue
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Dropping deferred write: {str(e)}")
+                return
+            rate = 1 / max(time.perf_counter() - start, 1e-6)
+            self._drain_rate = rate if self._drain_rate is None else 0.8 * self._drain_rate + 0.2 * rate
+            self.written += 1
+            return
+
+    def stop(self, timeout_seconds: float = 10.0) -> None:
+        """Finish queued writes (within the timeout), then stop the thread"""
+        deadline = time.monotonic() + timeout_seconds
+        while self.depth() and time.monotonic() < deadline and self._thread is not None and self._thread.is_alive():
+            time.sleep(0.05)
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self.depth():
+            logger.error(f"{self.depth()} deferred writes were not applied before shutdown")
+
+    def stats(self) -> Dict:
+        return {
+            'depth': self.depth(),
+            'max_size': self.max_size,
+            'written': self.written,
+            'failed': self.failed,
+            'retries': self.retries,
+            'drain_rate_per_second': round(self._drain_rate, 1) if self._drain_rate else None
+        }
+
+class LoadShedder:
+    """
+    Admission control for the verify routes, called from the event loop.
+
+    Requests are rejected while too many are already in flight or while the
+    deferred write backlog is above its limit. The retry hint is the time
+    the backlog needs to drain back under the limit at the current rate.
+    """
+
+    def __init__(self, max_in_flight: int, max_deferred_depth: int, deferred: DeferredWriteQueue,
+                 max_retry_after_seconds: float = 30.0):
+        self.max_in_flight = max_in_flight
+        self.max_deferred_depth = max_deferred_depth
+        self.deferred = deferred
+        self.max_retry_after_seconds = max_retry_after_seconds
+        self.in_flight = 0
+        self.shed = Counter()
+
+    def retry_after(self, backlog: int) -> float:
+        rate = self.deferred.drain_rate()
+        seconds = backlog / rate if rate else self.max_retry_after_seconds
+        return min(max(seconds, 1.0), self.max_retry_after_seconds)
+
+    def check_deferred(self) -> None:
+        """Raise Overloaded while the deferred write backlog is over its limit"""
+        depth = self.deferred.depth()
+        if depth >= self.max_deferred_depth:
+            self.shed['deferred_backlog'] += 1
+            raise Overloaded(
+                f"Deferred write backlog is {depth}",
+                self.retry_after(depth - self.max_deferred_depth + 1)
+            )
+
+    @contextmanager
+    def admit(self):
+        if self.in_flight >= self.max_in_flight:
+            self.shed['in_flight'] += 1
+            raise Overloaded(f"{self.in_flight} requests in flight", 1.0)
+        self.check_deferred()
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+
+    def stats(self) -> Dict:
+        return {
+            'in_flight': self.in_flight,
+            'max_in_flight': self.max_in_flight,
+            'max_deferred_depth': self.max_deferred_depth,
+            'shed': dict(self.shed)
+        }
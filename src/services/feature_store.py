@@ -0,0 +1,175 @@
+# src/services/feature_store.py
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from src.config.settings import FEATURE_STORE_CACHE_SIZE, FEATURE_STORE_TTL_SECONDS
+from src.database.models import EntityFeature
+from src.utils.logging_config import setup_logging
+
+# Setup logger
+logger = setup_logging(__name__)
+
+# Features served per entity type, with the version currently read.
+# Bump a version to roll out a recomputed feature without overwriting the old one.
+FEATURE_REGISTRY = {
+    'card': {'card_type': 1, 'avg_transaction_amount': 1},
+    'merchant': {'merchant_risk_score': 1},
+    'location': {'location_risk_score': 1},
+    'device': {'device_risk_score': 1},
+    'ip': {'ip_risk_score': 1},
+}
+
+EntityKey = Tuple[str, str]
+
+# Cached marker for features known to be absent, so misses skip the DB too
+_MISSING = object()
+
+class InMemoryFeatureTier:
+    """Thread-safe LRU of feature values with a TTL, shared by all requests in a worker"""
+
+    def __init__(self, max_entries: int = 100000, ttl_seconds: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: Iterable[tuple]) -> Dict[tuple, Any]:
+        """Return cached values (possibly _MISSING) for the keys that are present"""
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                if entry[0] < now:
+                    del self._entries[key]
+                    continue
+                self._entries.move_to_end(key)
+                found[key] = entry[1]
+        return found
+
+    def put_many(self, values: Dict[tuple, Any]) -> None:
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            for key, value in values.items():
+                self._entries[key] = (expires_at, value)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+class FeatureStore:
+    """
+    Online entity features: an in-memory tier with read-through to the
+    entity_features table, and bulk materialization for writes.
+    """
+
+    def __init__(self, memory_tier: InMemoryFeatureTier = None, registry: Dict = None):
+        self.memory = memory_tier or InMemoryFeatureTier(FEATURE_STORE_CACHE_SIZE, FEATURE_STORE_TTL_SECONDS)
+        self.registry = registry or FEATURE_REGISTRY
+
+    def _feature_keys(self, entities: Iterable[EntityKey]) -> List[tuple]:
+        """Expand entities into (entity_type, entity_id, feature_name, version) keys"""
+        keys = []
+        for entity_type, entity_id in entities:
+            if entity_id is None:
+                continue
+            for feature_name, version in self.registry.get(entity_type, {}).items():
+                keys.append((entity_type, str(entity_id), feature_name, version))
+        return keys
+
+    def get_many(self, db: Session, entities: Iterable[EntityKey]) -> Dict[EntityKey, Dict[str, Any]]:
+        """
+        Fetch every registered feature for the given entities.
+        Memory misses are resolved with a single DB query.
+        """
+        entities = list(entities)
+        keys = self._feature_keys(entities)
+        values = self.memory.get_many(keys)
+
+        misses = [key for key in keys if key not in values]
+        if misses:
+            loaded = self._load(db, misses)
+            # Absent features are cached too, so cold entities do not hit the DB each time
+            fetched = {key: loaded.get(key, _MISSING) for key in misses}
+            self.memory.put_many(fetched)
+            values.update(fetched)
+
+        result = {(entity_type, str(entity_id)): {} for entity_type, entity_id in entities if entity_id is not None}
+        for (entity_type, entity_id, feature_name, _), value in values.items():
+            if value is not _MISSING:
+                result[(entity_type, entity_id)][feature_name] = value
+        return result
+
+    def _load(self, db: Session, keys: List[tuple]) -> Dict[tuple, Any]:
+        """Read feature rows for the keys in one round trip"""
+        key_columns = tuple_(
+            EntityFeature.entity_type,
+            EntityFeature.entity_id,
+            EntityFeature.feature_name,
+            EntityFeature.version
+        )
+        rows = db.execute(
+            select(
+                EntityFeature.entity_type,
+                EntityFeature.entity_id,
+                EntityFeature.feature_name,
+                EntityFeature.version,
+                EntityFeature.value
+            ).where(key_columns.in_(keys))
+        ).all()
+        logger.debug(f"Feature store read {len(rows)} of {len(keys)} features from the database")
+        return {(row.entity_type, row.entity_id, row.feature_name, row.version): row.value for row in rows}
+
+    def put(self, entity_type: str, entity_id: str, values: Dict[str, Any]) -> None:
+        """Populate the memory tier only, e.g. after a read-through fallback"""
+        registered = self.registry.get(entity_type, {})
+        self.memory.put_many({
+            (entity_type, str(entity_id), name, registered[name]): value
+            for name, value in values.items() if name in registered
+        })
+
+    def materialize(self, db: Session, entity_type: str, feature_name: str,
+                    values: Dict[str, Any], version: Optional[int] = None,
+                    batch_size: int = 5000) -> int:
+        """Bulk upsert one feature for many entities and refresh the memory tier"""
+        version = version or self.registry[entity_type][feature_name]
+        insert = postgresql.insert if db.bind.dialect.name == 'postgresql' else sqlite.insert
+        now = datetime.utcnow()
+        items = list(values.items())
+
+        for start in range(0, len(items), batch_size):
+            batch = [
+                {
+                    'entity_type': entity_type,
+                    'entity_id': str(entity_id),
+                    'feature_name': feature_name,
+                    'version': version,
+                    'value': value,
+                    'updated_at': now
+                }
+                for entity_id, value in items[start:start + batch_size]
+            ]
+            statement = insert(EntityFeature).values(batch)
+            db.execute(statement.on_conflict_do_update(
+                index_elements=['entity_type', 'entity_id', 'feature_name', 'version'],
+                set_={'value': statement.excluded.value, 'updated_at': statement.excluded.updated_at}
+            ))
+        db.commit()
+
+        if version == self.registry.get(entity_type, {}).get(feature_name):
+            self.memory.put_many({
+                (entity_type, str(entity_id), feature_name, version): value
+                for entity_id, value in items
+            })
+        logger.info(f"Materialized {len(items)} values of {entity_type}.{feature_name} v{version}")
+        return len(items)
+
+# Shared by every request in this worker
+feature_store = FeatureStore()
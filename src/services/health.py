@@ -0,0 +1,95 @@
+# src/services/health.py
+
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from src.utils.logging_config import setup_logging
+
+# Setup logger
+logger = setup_logging(__name__)
+
+class HealthChecker:
+    """
+    Runs deep readiness checks on a background thread and caches the result.
+
+    Each check is a callable returning a dict of details; raising marks it
+    failed. Probes read the cached result, so they never wait on the model or
+    the database. A result older than `max_age_seconds` counts as not ready,
+    which also catches a stalled checker thread.
+    """
+
+    def __init__(self, interval_seconds: float = 5.0, max_age_seconds: float = 30.0):
+        self.interval_seconds = interval_seconds
+        self.max_age_seconds = max_age_seconds
+        self.checks: Dict[str, Callable[[], Dict]] = {}
+        self._result: Optional[Dict] = None
+        self._checked_at: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, name: str, check: Callable[[], Dict]) -> None:
+        self.checks[name] = check
+
+    def run_checks(self) -> Dict:
+        """Run every check once and cache the combined result"""
+        results = {}
+        for name, check in self.checks.items():
+            start = time.perf_counter()
+            try:
+                results[name] = {'ok': True, **(check() or {})}
+            except Exception as e:
+                logger.warning(f"Readiness check '{name}' failed: {str(e)}")
+                results[name] = {'ok': False, 'error': str(e)}
+            results[name]['duration_ms'] = round((time.perf_counter() - start) * 1000, 3)
+
+        self._result = {'ready': all(result['ok'] for result in results.values()), 'checks': results}
+        self._checked_at = time.monotonic()
+        return self._result
+
+    def readiness(self) -> Tuple[bool, Dict]:
+        """Cached readiness; cheap enough to call from every probe"""
+        result, checked_at = self._result, self._checked_at
+        if result is None:
+            return False, {'ready': False, 'reason': 'checks have not run yet'}
+
+        age = time.monotonic() - checked_at
+        if age > self.max_age_seconds:
+            return False, {'ready': False, 'reason': f'last check is {age:.1f}s old', **result}
+        return result['ready'], {**result, 'age_seconds': round(age, 3)}
+
+    def start(self) -> None:
+        """Run the checks once, then keep refreshing them in the background"""
+        self.run_checks()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="health-checker", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            self.run_checks()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+def database_check(engine: Engine) -> Callable[[], Dict]:
+    """Round-trip SELECT 1 plus connection pool statistics"""
+    def check() -> Dict:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+
+        pool = engine.pool
+        if not hasattr(pool, 'checkedout'):
+            return {'pool': pool.status()}
+        return {
+            'pool': {
+                'size': pool.size(),
+                'checked_in': pool.checkedin(),
+                'checked_out': pool.checkedout(),
+                'overflow': pool.overflow()
+            }
+        }
+    return check
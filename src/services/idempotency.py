@@ -0,0 +1,161 @@
+# src/services/idempotency.py
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from src.utils.logging_config import setup_logging
+
+# Setup logger
+logger = setup_logging(__name__)
+
+class IdempotencyKeyReused(Exception):
+    """An idempotency key was sent again with a different request"""
+
+    def __init__(self, key: str):
+        super().__init__(f"Idempotency key {key} was already used for a different request")
+        self.key = key
+
+class IdempotencyCache:
+    """
+    Bounded, TTL-limited cache of responses keyed by client idempotency key.
+
+    Duplicates that arrive while the first request is still running await the
+    same future instead of starting another computation. When a request
+    fingerprint is given, a key reused for a different request raises
+    IdempotencyKeyReused instead of returning the other request's response.
+    All methods are meant to be called from the event loop thread.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._inflight: Dict[str, Tuple[asyncio.Future, Optional[str]]] = {}
+
+    def get(self, key: str, fingerprint: Optional[str] = None) -> Optional[Any]:
+        """Return the cached response for key, if present and not expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, cached_fingerprint, response = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+
+        _check_fingerprint(key, cached_fingerprint, fingerprint)
+        self._entries.move_to_end(key)
+        return response
+
+    def set(self, key: str, response: Any, fingerprint: Optional[str] = None) -> None:
+        """Cache a response, evicting the least recently used entries beyond the bound"""
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, fingerprint, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def run(self, key: str, compute: Callable[[], Awaitable[Any]], fingerprint: Optional[str] = None) -> Any:
+        """Return the response for key, computing it at most once at a time"""
+        cached = self.get(key, fingerprint)
+        if cached is not None:
+            logger.info(f"Idempotency key {key} served from cache")
+            return cached
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            inflight, inflight_fingerprint = inflight
+            _check_fingerprint(key, inflight_fingerprint, fingerprint)
+            logger.info(f"Idempotency key {key} is in flight; waiting for the first request")
+            # shield: a cancelled duplicate must not cancel the shared future
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = (future, fingerprint)
+        try:
+            response = await compute()
+            self.set(key, response, fingerprint)
+            future.set_result(response)
+            return response
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception retrieved when no duplicate is waiting
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def run_many(self, fingerprints: Dict[str, Optional[str]],
+                       compute: Callable[[List[str]], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        Responses for several keys (mapped to their request fingerprints). Keys
+        neither cached nor in flight are computed together: `compute` is awaited
+        once, with those keys (possibly none), and returns a response or an
+        exception for each. Exceptions, including IdempotencyKeyReused, are
+        returned in place of responses and not cached.
+        """
+        responses: Dict[str, Any] = {}
+        waiting: Dict[str, asyncio.Future] = {}
+        claimed: Dict[str, asyncio.Future] = {}
+        for key, fingerprint in fingerprints.items():
+            try:
+                cached = self.get(key, fingerprint)
+                if cached is not None:
+                    responses[key] = cached
+                    continue
+                inflight = self._inflight.get(key)
+                if inflight is not None:
+                    inflight, inflight_fingerprint = inflight
+                    _check_fingerprint(key, inflight_fingerprint, fingerprint)
+                    waiting[key] = inflight
+                    continue
+            except IdempotencyKeyReused as e:
+                responses[key] = e
+                continue
+            claimed[key] = asyncio.get_running_loop().create_future()
+            self._inflight[key] = (claimed[key], fingerprint)
+
+        try:
+            computed = await compute(list(claimed))
+            for key, future in claimed.items():
+                response = computed[key]
+                responses[key] = response
+                if isinstance(response, Exception):
+                    future.set_exception(response)
+                    future.exception()
+                else:
+                    self.set(key, response, fingerprints[key])
+                    future.set_result(response)
+        except BaseException as e:
+            for future in claimed.values():
+                if future.done():
+                    continue
+                if isinstance(e, Exception):
+                    future.set_exception(e)
+                    future.exception()
+                else:
+                    future.cancel()
+            raise
+        finally:
+            for key in claimed:
+                del self._inflight[key]
+
+        for key, future in waiting.items():
+            logger.info(f"Idempotency key {key} is in flight; waiting for the first request")
+            try:
+                responses[key] = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                responses[key] = RuntimeError(f"The first request with idempotency key {key} was cancelled")
+            except Exception as e:
+                responses[key] = e
+        return responses
+
+def _check_fingerprint(key: str, stored: Optional[str], fingerprint: Optional[str]) -> None:
+    """Raise IdempotencyKeyReused when both fingerprints are known and differ"""
+    if stored is not None and fingerprint is not None and stored != fingerprint:
+        raise IdempotencyKeyReused(key)
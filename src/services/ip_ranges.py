@@ -0,0 +1,267 @@
+# src/services/ip_ranges.py
+
+import json
+import os
+import socket
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from src.config.settings import IP_RANGES_DIR, IP_RANGES_RELOAD_SECONDS
+from src.utils.logging_config import setup_logging
+from src.utils.versioned_files import publish_version
+
+# Setup logger
+logger = setup_logging(__name__)
+
+# Risk columns read from the CSV, in the order they are stored
+VALUE_COLUMNS = ('reputation_risk', 'geo_risk')
+# Risks are stored as uint8 steps of 1/255, which is finer than any source provides
+RISK_SCALE = 255
+ARRAY_FILES = ('v4_start', 'v4_end', 'v4_values', 'v6_start', 'v6_end', 'v6_values')
+
+def _ipv4_to_int(addresses: pd.Series) -> np.ndarray:
+    """Dotted-quad strings to uint32, vectorized; raises on anything else"""
+    octets = addresses.str.split('.', expand=True)
+    if octets.shape[1] != 4:
+        raise ValueError(f"Invalid IPv4 address among {addresses.head(3).tolist()}")
+    octets = octets.apply(pd.to_numeric, errors='coerce')
+    if octets.isna().any().any() or (octets > 255).any().any() or (octets < 0).any().any():
+        bad = addresses[octets.isna().any(axis=1) | (octets > 255).any(axis=1) | (octets < 0).any(axis=1)]
+        raise ValueError(f"Invalid IPv4 address: {bad.iloc[0]}")
+    octets = octets.to_numpy(dtype=np.uint32)
+    return (octets[:, 0] << 24) | (octets[:, 1] << 16) | (octets[:, 2] << 8) | octets[:, 3]
+
+def _ipv6_to_pairs(addresses: pd.Series) -> np.ndarray:
+    """IPv6 strings to (n, 2) big-endian uint64 (high, low) pairs"""
+    packed = b''.join(socket.inet_pton(socket.AF_INET6, address) for address in addresses)
+    return np.frombuffer(packed, dtype='>u8').reshape(-1, 2).copy()
+
+def _keys(pairs: np.ndarray) -> np.ndarray:
+    """16-byte view of big-endian pairs; bytewise order is numeric order, so searchsorted works on it"""
+    return pairs.view('S16').reshape(-1)
+
+def _check_ranges(start: np.ndarray, end: np.ndarray, family: str) -> None:
+    if len(start) == 0:
+        return
+    if (end < start).any():
+        raise ValueError(f"{family} range ends before it starts at row {int(np.argmax(end < start))} (sorted)")
+    overlapping = start[1:] <= end[:-1]
+    if overlapping.any():
+        raise ValueError(f"Overlapping {family} ranges at row {int(np.argmax(overlapping)) + 1} (sorted)")
+
+def _quantize(values: np.ndarray) -> np.ndarray:
+    return np.rint(np.clip(np.nan_to_num(values, nan=0.0), 0.0, 1.0) * RISK_SCALE).astype(np.uint8)
+
+def build_table(csv_path: str, output_dir: str, chunk_size: int = 1000000) -> Dict:
+    """
+    Compile a CSV of IP ranges into the array files IpRangeTable maps.
+
+    Columns: start_ip, end_ip (inclusive, IPv4 or IPv6) and any of
+    VALUE_COLUMNS (risks in [0, 1]; missing ones are 0). Ranges must not
+    overlap. Returns the table's metadata.
+    """
+    v4_parts: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+    v6_parts: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+    for chunk in pd.read_csv(csv_path, chunksize=chunk_size, dtype={'start_ip': str, 'end_ip': str}):
+        values = np.column_stack([
+            chunk[column].to_numpy(dtype=np.float64) if column in chunk else np.zeros(len(chunk))
+            for column in VALUE_COLUMNS
+        ])
+        is_v6 = chunk['start_ip'].str.contains(':', regex=False).to_numpy()
+        if (is_v6 != chunk['end_ip'].str.contains(':', regex=False).to_numpy()).any():
+            raise ValueError("A range mixes IPv4 and IPv6 addresses")
+        if (~is_v6).any():
+            v4 = chunk[~is_v6]
+            v4_parts.append((_ipv4_to_int(v4['start_ip']), _ipv4_to_int(v4['end_ip']), _quantize(values[~is_v6])))
+        if is_v6.any():
+            v6 = chunk[is_v6]
+            v6_parts.append((_ipv6_to_pairs(v6['start_ip']), _ipv6_to_pairs(v6['end_ip']), _quantize(values[is_v6])))
+
+    arrays = {}
+    v4_start, v4_end, v4_values = (
+        [np.concatenate(part) for part in zip(*v4_parts)] if v4_parts
+        else [np.empty(0, np.uint32), np.empty(0, np.uint32), np.empty((0, len(VALUE_COLUMNS)), np.uint8)]
+    )
+    order = np.argsort(v4_start, kind='stable')
+    arrays['v4_start'], arrays['v4_end'], arrays['v4_values'] = v4_start[order], v4_end[order], v4_values[order]
+    _check_ranges(arrays['v4_start'], arrays['v4_end'], 'IPv4')
+
+    v6_start, v6_end, v6_values = (
+        [np.concatenate(part) for part in zip(*v6_parts)] if v6_parts
+        else [np.empty((0, 2), '>u8'), np.empty((0, 2), '>u8'), np.empty((0, len(VALUE_COLUMNS)), np.uint8)]
+    )
+    # concatenate returns native byte order; the 16-byte keys need big-endian
+    v6_start, v6_end = v6_start.astype('>u8', copy=False), v6_end.astype('>u8', copy=False)
+    order = np.argsort(_keys(v6_start), kind='stable')
+    arrays['v6_start'], arrays['v6_end'], arrays['v6_values'] = v6_start[order], v6_end[order], v6_values[order]
+    _check_ranges(_keys(arrays['v6_start']), _keys(arrays['v6_end']), 'IPv6')
+
+    os.makedirs(output_dir, exist_ok=True)
+    for name in ARRAY_FILES:
+        np.save(os.path.join(output_dir, f"{name}.npy"), arrays[name])
+    meta = {
+        'source': os.path.abspath(csv_path),
+        'built_at': datetime.utcnow().isoformat(),
+        'columns': list(VALUE_COLUMNS),
+        'v4_ranges': len(arrays['v4_start']),
+        'v6_ranges': len(arrays['v6_start']),
+        'nbytes': sum(array.nbytes for array in arrays.values())
+    }
+    with open(os.path.join(output_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+def publish_table(csv_path: str, root_dir: str, keep: int = 2) -> str:
+    """
+    Build a new version under root_dir and repoint root_dir/current at it in
+    one rename, so workers never see a half-written table. Versions beyond
+    the newest `keep` are removed; workers still mapping one keep their pages.
+    """
+    return publish_version(root_dir, lambda path: build_table(csv_path, path), keep)
+
+class IpRangeTable:
+    """
+    Sorted, non-overlapping IPv4 and IPv6 ranges with risk values, as
+    parallel arrays memory-mapped from a directory written by build_table.
+
+    Every process maps the same files, so the page cache holds one copy for
+    all workers. A lookup is a binary search on the start addresses followed
+    by a check against that range's end. IPv6 addresses are (high, low)
+    uint64 pairs searched through their 16-byte big-endian view.
+    """
+
+    def __init__(self, path: str):
+        self.path = os.path.realpath(path)
+        with open(os.path.join(self.path, 'meta.json')) as f:
+            self.meta = json.load(f)
+        arrays = {}
+        for name in ARRAY_FILES:
+            file_path = os.path.join(self.path, f"{name}.npy")
+            try:
+                # Plain ndarray view of the mapping; np.memmap adds overhead to every call
+                arrays[name] = np.asarray(np.load(file_path, mmap_mode='r'))
+            except ValueError:
+                # Older numpy cannot map an empty array; it is only a header anyway
+                arrays[name] = np.load(file_path)
+        self.v4_start, self.v4_end, self.v4_values = arrays['v4_start'], arrays['v4_end'], arrays['v4_values']
+        if arrays['v6_start'].dtype != np.dtype('>u8') or arrays['v6_end'].dtype != np.dtype('>u8'):
+            raise ValueError(f"IPv6 arrays in {self.path} must be big-endian uint64 pairs")
+        self.v6_start, self.v6_end = _keys(arrays['v6_start']), _keys(arrays['v6_end'])
+        self.v6_values = arrays['v6_values']
+        self.columns = tuple(self.meta['columns'])
+
+    @property
+    def nbytes(self) -> int:
+        return self.meta['nbytes']
+
+    @staticmethod
+    def _pack(ip: str) -> Optional[bytes]:
+        """4 bytes for IPv4, 16 for IPv6, None if not an address"""
+        for family in (socket.AF_INET, socket.AF_INET6):
+            try:
+                return socket.inet_pton(family, ip)
+            except (OSError, TypeError):
+                continue
+        return None
+
+    def lookup(self, ip: str) -> Optional[Dict[str, float]]:
+        """Risk values of the range containing ip, or None"""
+        packed = self._pack(ip)
+        if packed is None:
+            return None
+        if len(packed) == 4:
+            # Same dtype as the array, or searchsorted would cast the whole array per call
+            key = np.uint32(int.from_bytes(packed, 'big'))
+            starts, ends, values = self.v4_start, self.v4_end, self.v4_values
+        else:
+            # numpy returns S16 elements without trailing NULs; strip them so comparisons agree
+            key = packed.rstrip(b'\x00')
+            starts, ends, values = self.v6_start, self.v6_end, self.v6_values
+        i = int(starts.searchsorted(key, side='right')) - 1
+        if i < 0 or key > ends[i]:
+            return None
+        return dict(zip(self.columns, [value / RISK_SCALE for value in values[i].tolist()]))
+
+    def lookup_many(self, ips: Sequence[Optional[str]]) -> np.ndarray:
+        """(n, len(columns)) float32 risks, NaN where an address is in no range or not an address"""
+        result = np.full((len(ips), len(self.columns)), np.nan, dtype=np.float32)
+        v4_rows, v4_keys, v6_rows, v6_keys = [], [], [], []
+        for row, ip in enumerate(ips):
+            packed = self._pack(ip) if ip else None
+            if packed is None:
+                continue
+            if len(packed) == 4:
+                v4_rows.append(row)
+                v4_keys.append(packed)
+            else:
+                v6_rows.append(row)
+                v6_keys.append(packed)
+
+        if v4_rows:
+            self._search(np.frombuffer(b''.join(v4_keys), dtype='>u4').astype(np.uint32),
+                         self.v4_start, self.v4_end, self.v4_values, np.array(v4_rows), result)
+        if v6_rows:
+            self._search(np.frombuffer(b''.join(v6_keys), dtype='S16'),
+                         self.v6_start, self.v6_end, self.v6_values, np.array(v6_rows), result)
+        return result
+
+    @staticmethod
+    def _search(keys: np.ndarray, starts: np.ndarray, ends: np.ndarray, values: np.ndarray,
+                rows: np.ndarray, result: np.ndarray) -> None:
+        if not len(starts):
+            return
+        index = np.searchsorted(starts, keys, side='right') - 1
+        hit = index >= 0
+        hit[hit] = keys[hit] <= ends[index[hit]]
+        result[rows[hit]] = values[index[hit]] / np.float32(RISK_SCALE)
+
+class IpRiskLookup:
+    """
+    The current IpRangeTable behind a path (normally the `current` symlink
+    written by publish_table). The link target is checked at most every
+    `reload_interval_seconds` and the table reopened when it changed, so a
+    published file is picked up by every worker without a restart.
+    """
+
+    def __init__(self, path: str, reload_interval_seconds: float = 30.0):
+        self.path = path
+        self.reload_interval_seconds = reload_interval_seconds
+        self._table: Optional[IpRangeTable] = None
+        self._target: Optional[str] = None
+        self._checked_at = -float('inf')
+
+    def table(self) -> Optional[IpRangeTable]:
+        now = time.monotonic()
+        if now - self._checked_at >= self.reload_interval_seconds:
+            self._checked_at = now
+            self._reload()
+        return self._table
+
+    def _reload(self) -> None:
+        target = os.path.realpath(self.path)
+        if target == self._target:
+            return
+        if not os.path.isfile(os.path.join(target, 'meta.json')):
+            logger.warning(f"No IP range table at {self.path}; keeping the current one, if any")
+            self._target = target
+            return
+        try:
+            table = IpRangeTable(target)
+        except Exception as e:
+            logger.error(f"Failed to open IP range table {target}: {str(e)}")
+            return
+        # One reference swap; lookups in flight finish on the table they started with
+        self._table, self._target = table, target
+        logger.info(f"Loaded IP range table {target}: {table.meta['v4_ranges']} IPv4 and "
+                    f"{table.meta['v6_ranges']} IPv6 ranges, {table.nbytes / 1e6:.1f} MB")
+
+    def lookup(self, ip: Optional[str]) -> Optional[Dict[str, float]]:
+        table = self.table()
+        if table is None or not ip:
+            return None
+        return table.lookup(ip)
+
+# One per worker; the mapped arrays themselves are shared by all workers through the page cache
+ip_risk = IpRiskLookup(os.path.join(IP_RANGES_DIR, 'current'), IP_RANGES_RELOAD_SECONDS)
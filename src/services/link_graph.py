@@ -0,0 +1,689 @@
+# src/services/link_graph.py
+
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from src.config.settings import (
+    LINK_GRAPH_DIR,
+    LINK_GRAPH_MAX_DEGREE,
+    LINK_GRAPH_MAX_LOCAL_EDGES,
+    LINK_GRAPH_RELOAD_SECONDS,
+    LINK_GRAPH_RETENTION_SECONDS,
+    LINK_GRAPH_WINDOW_SECONDS,
+    LINK_RISK_COMPONENT_CARDS,
+    LINK_RISK_DEVICE_CARDS,
+    LINK_RISK_IP_CARDS
+)
+from src.database.models import Transaction
+from src.ml.preprocessing.hashing import stable_hash, stable_hash_one
+from src.utils.logging_config import setup_logging
+from src.utils.versioned_files import publish_version
+
+# Setup logger
+logger = setup_logging(__name__)
+
+# Node types; every edge joins a card to a device or to an IP
+CARD, DEVICE, IP = 0, 1, 2
+NODE_TYPES = {'card': CARD, 'device': DEVICE, 'ip': IP}
+SNAPSHOT_ARRAYS = ('keys', 'ids', 'node_type', 'offsets', 'neighbors', 'seen', 'parent', 'component_size', 'component_cards')
+# Restored as private copies: union-find writes to them in place
+UNION_FIND_ARRAYS = ('parent', 'component_size', 'component_cards')
+
+def node_keys(node_type: str, values: Sequence) -> np.ndarray:
+    """64-bit keys of typed node values; the type prefix keeps card "1" and device "1" apart"""
+    return stable_hash([f"{node_type}:{value}" for value in values])
+
+def node_key(node_type: str, value) -> int:
+    """node_keys of a single value"""
+    return stable_hash_one(f"{node_type}:{value}")
+
+def link_risk_score(features: Dict[str, int], device_cards: int = LINK_RISK_DEVICE_CARDS,
+                    ip_cards: int = LINK_RISK_IP_CARDS, component_cards: int = LINK_RISK_COMPONENT_CARDS) -> float:
+    """
+    Fraud-ring risk in [0, 1] from LinkGraph.features: the largest of the
+    device's, the IP's and the card's component card counts, each relative to
+    the count at which it is fully risky.
+    """
+    return min(1.0, max(
+        features['device_distinct_cards'] / device_cards,
+        features['ip_distinct_cards'] / ip_cards,
+        features['link_component_cards'] / component_cards
+    ))
+
+class _Interner:
+    """
+    64-bit node keys to dense int32 ids. Keys live in one sorted array (12
+    bytes a node) searched with searchsorted; keys added one at a time go to a
+    dict until the next merge.
+    """
+
+    def __init__(self):
+        self.keys = np.empty(0, dtype=np.uint64)
+        self.ids = np.empty(0, dtype=np.int32)
+        self.pending: Dict[int, int] = {}
+        self.size = 0
+
+    def get(self, key: int) -> Optional[int]:
+        node = self.pending.get(key)
+        if node is not None:
+            return node
+        position = int(self.keys.searchsorted(np.uint64(key)))
+        if position < len(self.keys) and int(self.keys[position]) == key:
+            return int(self.ids[position])
+        return None
+
+    def get_or_add(self, key: int) -> int:
+        node = self.get(key)
+        if node is None:
+            node = self.pending[key] = self.size
+            self.size += 1
+        return node
+
+    def get_or_add_many(self, keys: np.ndarray) -> np.ndarray:
+        self.merge_pending()
+        nodes = np.full(len(keys), -1, dtype=np.int32)
+        if len(self.keys):
+            positions = np.minimum(self.keys.searchsorted(keys), len(self.keys) - 1)
+            found = self.keys[positions] == keys
+            nodes[found] = self.ids[positions[found]]
+        missing = nodes < 0
+        if missing.any():
+            new_keys, inverse = np.unique(keys[missing], return_inverse=True)
+            new_ids = np.arange(self.size, self.size + len(new_keys), dtype=np.int32)
+            nodes[missing] = new_ids[inverse]
+            self.size += len(new_keys)
+            self._merge(new_keys, new_ids)
+        return nodes
+
+    def merge_pending(self) -> None:
+        if self.pending:
+            keys = np.fromiter(self.pending.keys(), dtype=np.uint64, count=len(self.pending))
+            ids = np.fromiter(self.pending.values(), dtype=np.int32, count=len(self.pending))
+            self.pending = {}
+            order = np.argsort(keys)
+            self._merge(keys[order], ids[order])
+
+    def _merge(self, keys: np.ndarray, ids: np.ndarray) -> None:
+        """Merge sorted, new keys into the sorted arrays"""
+        positions = self.keys.searchsorted(keys) + np.arange(len(keys))
+        merged_keys = np.empty(len(self.keys) + len(keys), dtype=np.uint64)
+        merged_ids = np.empty(len(merged_keys), dtype=np.int32)
+        old = np.ones(len(merged_keys), dtype=bool)
+        old[positions] = False
+        merged_keys[positions], merged_ids[positions] = keys, ids
+        merged_keys[old], merged_ids[old] = self.keys, self.ids
+        self.keys, self.ids = merged_keys, merged_ids
+
+class LinkGraph:
+    """
+    In-memory bipartite graph of cards and the devices and IPs they were used
+    from, for fraud-ring features: how many distinct cards a device or IP saw
+    within the window, how many devices and IPs a card used, and the size of
+    the connected component a card belongs to.
+
+    Edges carry the time they were last seen (uint32 epoch seconds). Most of
+    the graph is a compacted adjacency array (CSR, both directions);
+    transactions added since the last compaction sit in a per-node dict, so
+    `add` is O(1) and `features` is O(degree). Compaction drops edges not seen
+    within the retention period, keeps only the `max_degree` most recent
+    neighbours of each node, and recomputes connected components; between
+    compactions, components are kept by union-find.
+
+    scripts/build_link_graph.py builds the graph from the transactions table
+    and publishes snapshots; API workers read them through PublishedLinkGraph.
+    """
+
+    def __init__(self, max_degree: int = 64, window_seconds: float = 86400.0,
+                 retention_seconds: float = 30 * 86400.0, compact_every: Optional[int] = 100000):
+        self.max_degree = max_degree
+        self.window_seconds = window_seconds
+        self.retention_seconds = retention_seconds
+        self.compact_every = compact_every
+        self._lock = threading.RLock()
+        # One compaction at a time; it only holds _lock to freeze its input and to swap
+        self._compaction_lock = threading.Lock()
+        self._compacting: Optional[threading.Thread] = None
+        self.nodes = _Interner()
+        self.node_type = np.empty(0, dtype=np.uint8)
+        # Compacted adjacency: neighbours of node i are neighbors[offsets[i]:offsets[i + 1]]
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.neighbors = np.empty(0, dtype=np.int32)
+        self.seen = np.empty(0, dtype=np.uint32)
+        # Edges added since the last compaction: node -> {neighbour: last seen}. During a
+        # compaction the frozen dict is still read, and new edges go to a fresh one.
+        self._recent: Dict[int, Dict[int, int]] = defaultdict(dict)
+        self._frozen: Dict[int, Dict[int, int]] = {}
+        self._recent_edges = 0
+        # Bulk-loaded (card, entity, seen) edges waiting for the next compaction
+        self._bulk: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        self._bulk_edges = 0
+        # Union-find over nodes; sizes and card counts are valid at roots
+        self.parent = np.empty(0, dtype=np.int32)
+        self.component_size = np.empty(0, dtype=np.int32)
+        self.component_cards = np.empty(0, dtype=np.int32)
+        self.compactions = 0
+        self.compacted_at: Optional[float] = None
+
+    # --- node ids ---
+
+    def _grow(self, size: int) -> None:
+        """Extend the per-node arrays to `size` nodes, with capacity doubling"""
+        if size <= len(self.node_type):
+            return
+        capacity = max(size, 2 * len(self.node_type), 1024)
+        old = len(self.node_type)
+        self.node_type = np.resize(self.node_type, capacity)
+        self.parent = np.resize(self.parent, capacity)
+        self.parent[old:] = np.arange(old, capacity, dtype=np.int32)
+        self.component_size = np.resize(self.component_size, capacity)
+        self.component_size[old:] = 1
+        self.component_cards = np.resize(self.component_cards, capacity)
+
+    def _new_nodes(self, start: int, node_type: int) -> None:
+        self._grow(self.nodes.size)
+        self.node_type[start:self.nodes.size] = node_type
+        self.component_cards[start:self.nodes.size] = node_type == CARD
+
+    def _node(self, node_type: str, value) -> Optional[int]:
+        return self.nodes.get(node_key(node_type, value))
+
+    def _add_node(self, node_type: str, value) -> int:
+        start = self.nodes.size
+        node = self.nodes.get_or_add(node_key(node_type, value))
+        if node >= start:
+            self._new_nodes(start, NODE_TYPES[node_type])
+        return node
+
+    def _add_nodes(self, node_type: str, values: Sequence) -> np.ndarray:
+        start = self.nodes.size
+        nodes = self.nodes.get_or_add_many(node_keys(node_type, values))
+        self._new_nodes(start, NODE_TYPES[node_type])
+        return nodes
+
+    # --- union-find ---
+
+    def _find(self, node: int) -> int:
+        parent = self.parent
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = int(parent[node])
+        return node
+
+    def _union(self, a: int, b: int) -> None:
+        a, b = self._find(a), self._find(b)
+        if a == b:
+            return
+        if self.component_size[a] < self.component_size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.component_size[a] += self.component_size[b]
+        self.component_cards[a] += self.component_cards[b]
+
+    # --- updates ---
+
+    def _link(self, card: int, entity: int, seen: int) -> None:
+        for node, neighbour in ((card, entity), (entity, card)):
+            edges = self._recent[node]
+            edges[neighbour] = seen
+            if len(edges) > self.max_degree:
+                del edges[min(edges, key=edges.get)]
+        self._union(card, entity)
+        self._recent_edges += 1
+
+    def add(self, card_id: str, device_id: Optional[str], ip_address: Optional[str], timestamp: float = None) -> None:
+        """Record one transaction's card-device and card-IP edges"""
+        seen = int(time.time() if timestamp is None else timestamp)
+        with self._lock:
+            card = self._add_node('card', card_id)
+            if device_id:
+                self._link(card, self._add_node('device', device_id), seen)
+            if ip_address:
+                self._link(card, self._add_node('ip', ip_address), seen)
+            # None leaves compaction to explicit compact() calls
+            due = self.compact_every is not None and self._recent_edges >= self.compact_every
+        if due:
+            self.compact_in_background()
+
+    def add_many(self, card_ids: Sequence, device_ids: Sequence, ip_addresses: Sequence,
+                 timestamps: Sequence[float]) -> None:
+        """
+        Record many transactions at once (loading history). They are counted
+        by features once compacted: call compact() after the last batch. A
+        compaction also runs whenever the batches add up to the compacted size.
+        """
+        seen = np.asarray(timestamps, dtype=np.float64).astype(np.uint32)
+        with self._lock:
+            cards = self._add_nodes('card', card_ids)
+            for node_type, values in (('device', device_ids), ('ip', ip_addresses)):
+                values = np.asarray(values, dtype=object)
+                present = np.array([bool(value) for value in values], dtype=bool)
+                if present.any():
+                    entities = self._add_nodes(node_type, values[present])
+                    self._bulk.append((cards[present], entities, seen[present]))
+                    self._bulk_edges += int(present.sum())
+            due = self._bulk_edges >= max(self.compact_every or 0, len(self.neighbors) // 2)
+        if due:
+            self.compact()
+
+    # --- features ---
+
+    def _neighbours(self, node: Optional[int], cutoff: int) -> set:
+        """Neighbours of a node seen at or after `cutoff`"""
+        if node is None:
+            return set()
+        offsets = self.offsets
+        found = set()
+        if node < len(offsets) - 1:
+            start, end = offsets[node], offsets[node + 1]
+            if end > start:
+                found.update(self.neighbors[start:end][self.seen[start:end] >= cutoff].tolist())
+        for recent in (self._frozen, self._recent):
+            edges = recent.get(node)
+            if edges:
+                found.update(neighbour for neighbour, last_seen in edges.items() if last_seen >= cutoff)
+        return found
+
+    def features(self, card_id: str, device_id: Optional[str], ip_address: Optional[str],
+                 now: float = None) -> Dict[str, int]:
+        """
+        Link features of a transaction from what the graph has seen so far;
+        counts are of distinct neighbours seen within the window.
+        """
+        cutoff = int((time.time() if now is None else now) - self.window_seconds)
+        with self._lock:
+            card = self._node('card', card_id)
+            device = self._node('device', device_id) if device_id else None
+            ip = self._node('ip', ip_address) if ip_address else None
+            card_neighbours = self._neighbours(card, cutoff)
+            types = self.node_type[list(card_neighbours)] if card_neighbours else np.empty(0, dtype=np.uint8)
+            root = self._find(card) if card is not None else None
+            return {
+                'device_distinct_cards': len(self._neighbours(device, cutoff)),
+                'ip_distinct_cards': len(self._neighbours(ip, cutoff)),
+                'card_distinct_devices': int(np.count_nonzero(types == DEVICE)),
+                'card_distinct_ips': int(np.count_nonzero(types == IP)),
+                'link_component_size': int(self.component_size[root]) if root is not None else 1,
+                'link_component_cards': int(self.component_cards[root]) if root is not None else 1
+            }
+
+    # --- compaction ---
+
+    def compact_in_background(self) -> None:
+        """Start a compaction on its own thread unless one is running"""
+        with self._lock:
+            if self._compacting is not None and self._compacting.is_alive():
+                return
+            self._compacting = threading.Thread(target=self.compact, name="link-graph-compaction", daemon=True)
+            self._compacting.start()
+
+    def compact(self, now: float = None) -> None:
+        """
+        Fold recent and bulk-loaded edges into the adjacency arrays. The
+        arrays are rebuilt off the lock; edges added meanwhile stay in the
+        recent dict and are unioned into the new components at the swap.
+        """
+        with self._compaction_lock:
+            self._compact(now)
+
+    def _compact(self, now: float = None) -> None:
+        started = time.perf_counter()
+        cutoff = int(max(0.0, (time.time() if now is None else now) - self.retention_seconds))
+        with self._lock:
+            self.nodes.merge_pending()
+            size = self.nodes.size
+            node_type = self.node_type[:size].copy()
+            self._frozen, self._recent = self._recent, defaultdict(dict)
+            self._recent_edges = 0
+            bulk, self._bulk, self._bulk_edges = self._bulk, [], 0
+            offsets, neighbors, seen = self.offsets, self.neighbors, self.seen
+
+        sources = [np.repeat(np.arange(len(offsets) - 1, dtype=np.int32), np.diff(offsets))]
+        targets, times = [neighbors], [seen]
+        for cards, entities, bulk_seen in bulk:
+            sources += [cards, entities]
+            targets += [entities, cards]
+            times += [bulk_seen, bulk_seen]
+        recent = [(node, neighbour, last_seen)
+                  for node, edges in self._frozen.items() for neighbour, last_seen in edges.items()]
+        if recent:
+            recent = np.array(recent, dtype=np.int64)
+            sources.append(recent[:, 0].astype(np.int32))
+            targets.append(recent[:, 1].astype(np.int32))
+            times.append(recent[:, 2].astype(np.uint32))
+        del bulk, recent
+        offsets, neighbors, seen = self._build_adjacency(
+            np.concatenate(sources), np.concatenate(targets), np.concatenate(times), size, cutoff
+        )
+        del sources, targets, times
+        parent, component_size, component_cards = self._components(offsets, neighbors, node_type)
+
+        with self._lock:
+            self.offsets, self.neighbors, self.seen = offsets, neighbors, seen
+            self._grow(self.nodes.size)
+            self.parent[:size] = parent
+            self.parent[size:] = np.arange(size, len(self.parent), dtype=np.int32)
+            self.component_size[:size] = component_size
+            self.component_size[size:] = 1
+            self.component_cards[:size] = component_cards
+            self.component_cards[size:] = self.node_type[size:] == CARD
+            self._frozen = {}
+            # Edges added while the arrays were rebuilt
+            for node, edges in self._recent.items():
+                for neighbour in edges:
+                    self._union(node, neighbour)
+            self.compactions += 1
+            self.compacted_at = time.time()
+        logger.info(f"Compacted link graph: {size} nodes, {len(neighbors)} adjacency entries "
+                    f"in {time.perf_counter() - started:.2f}s")
+
+    def _build_adjacency(self, sources: np.ndarray, targets: np.ndarray, times: np.ndarray,
+                         size: int, cutoff: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """CSR of the latest sighting of each directed edge, within retention and max_degree"""
+        keep = times >= cutoff
+        pairs = (sources[keep].astype(np.uint64) << np.uint64(32)) | targets[keep].astype(np.uint64)
+        times = times[keep]
+        del sources, targets, keep
+        order = np.argsort(pairs, kind='stable')
+        pairs, times = pairs[order], times[order]
+        del order
+        # One row per pair, with its latest sighting
+        starts = np.flatnonzero(np.r_[True, pairs[1:] != pairs[:-1]]) if len(pairs) else np.empty(0, dtype=np.int64)
+        times = np.maximum.reduceat(times, starts) if len(starts) else times
+        pairs = pairs[starts]
+        del starts
+        sources = (pairs >> np.uint64(32)).astype(np.int32)
+        targets = (pairs & np.uint64(0xFFFFFFFF)).astype(np.int32)
+        del pairs
+
+        degree = np.bincount(sources, minlength=size)
+        over = degree > self.max_degree
+        if over.any():
+            # Keep the max_degree most recent neighbours of each node over the bound
+            rows = np.flatnonzero(over[sources])
+            by_recency = rows[np.lexsort((-times[rows].astype(np.int64), sources[rows]))]
+            starts = np.flatnonzero(np.r_[True, sources[by_recency][1:] != sources[by_recency][:-1]])
+            rank = np.arange(len(by_recency)) - np.repeat(starts, np.diff(np.r_[starts, len(by_recency)]))
+            keep = np.ones(len(sources), dtype=bool)
+            keep[by_recency[rank >= self.max_degree]] = False
+            sources, targets, times = sources[keep], targets[keep], times[keep]
+            degree = np.minimum(degree, self.max_degree)
+
+        offsets = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum(degree, out=offsets[1:])
+        return offsets, targets, times
+
+    @staticmethod
+    def _components(offsets: np.ndarray, neighbors: np.ndarray,
+                    node_type: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Union-find arrays with every node pointing at its component's first node"""
+        size = len(offsets) - 1
+        if size == 0:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32)
+        adjacency = csr_matrix((np.ones(len(neighbors), dtype=np.int8), neighbors, offsets), shape=(size, size))
+        count, labels = connected_components(adjacency, directed=False)
+        del adjacency
+        _, first = np.unique(labels, return_index=True)
+        parent = first.astype(np.int32)[labels]
+        component_size = np.zeros(size, dtype=np.int32)
+        component_size[first] = np.bincount(labels, minlength=count)
+        component_cards = np.zeros(size, dtype=np.int32)
+        component_cards[first] = np.bincount(labels, weights=node_type == CARD, minlength=count)
+        return parent, component_size, component_cards
+
+    # --- persistence ---
+
+    def snapshot(self, path: str, now: float = None, **meta) -> Dict:
+        """
+        Compact, then write the graph to a new directory: one .npy file per
+        array and meta.json, written last. Extra keyword arguments are
+        recorded in the meta. Returns the meta.
+        """
+        self.compact(now)
+        with self._lock:
+            self.nodes.merge_pending()
+            size = self.nodes.size
+            arrays = {
+                'keys': self.nodes.keys, 'ids': self.nodes.ids, 'node_type': self.node_type[:size],
+                'offsets': self.offsets, 'neighbors': self.neighbors, 'seen': self.seen,
+                'parent': self.parent[:size], 'component_size': self.component_size[:size],
+                'component_cards': self.component_cards[:size]
+            }
+            meta = {
+                'max_degree': self.max_degree,
+                'window_seconds': self.window_seconds,
+                'retention_seconds': self.retention_seconds,
+                'nodes': size,
+                'adjacency_entries': len(self.neighbors),
+                'snapshot_at': time.time(),
+                **meta
+            }
+            os.makedirs(path, exist_ok=True)
+            for name, array in arrays.items():
+                np.save(os.path.join(path, f"{name}.npy"), array)
+            meta['nbytes'] = sum(os.path.getsize(os.path.join(path, f"{name}.npy")) for name in arrays)
+            with open(os.path.join(path, 'meta.json'), 'w') as f:
+                json.dump(meta, f)
+        logger.info(f"Wrote link graph snapshot {path}: {size} nodes, {len(self.neighbors)} adjacency entries")
+        return meta
+
+    def restore(self, path: str) -> Dict:
+        """
+        Replace the graph with a snapshot written by snapshot(). The
+        adjacency and node arrays are memory-mapped read-only, so processes
+        restoring the same snapshot share them through the page cache; only
+        the union-find arrays (12 bytes a node) are copied. Returns the meta.
+        """
+        path = os.path.realpath(path)
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        arrays = {}
+        for name in SNAPSHOT_ARRAYS:
+            file_path = os.path.join(path, f"{name}.npy")
+            if name in UNION_FIND_ARRAYS:
+                arrays[name] = np.load(file_path)
+                continue
+            try:
+                arrays[name] = np.asarray(np.load(file_path, mmap_mode='r'))
+            except ValueError:
+                # Older numpy cannot map an empty array; it is only a header anyway
+                arrays[name] = np.load(file_path)
+        with self._lock:
+            self.nodes = _Interner()
+            self.nodes.keys, self.nodes.ids, self.nodes.size = arrays['keys'], arrays['ids'], meta['nodes']
+            self.node_type = arrays['node_type']
+            self.offsets, self.neighbors, self.seen = arrays['offsets'], arrays['neighbors'], arrays['seen']
+            self.parent = arrays['parent']
+            self.component_size = arrays['component_size']
+            self.component_cards = arrays['component_cards']
+            self._recent, self._frozen, self._recent_edges = defaultdict(dict), {}, 0
+            self._bulk, self._bulk_edges = [], 0
+            self.compacted_at = meta['snapshot_at']
+        logger.info(f"Restored link graph from {path}: {meta['nodes']} nodes, {meta['adjacency_entries']} adjacency entries")
+        return meta
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'nodes': self.nodes.size,
+                'adjacency_entries': len(self.neighbors),
+                'recent_edges': self._recent_edges,
+                'pending_bulk_edges': self._bulk_edges,
+                'compactions': self.compactions,
+                'compacted_at': self.compacted_at,
+                'nbytes': sum(array.nbytes for array in (
+                    self.nodes.keys, self.nodes.ids, self.node_type, self.offsets, self.neighbors,
+                    self.seen, self.parent, self.component_size, self.component_cards
+                ))
+            }
+
+def load_transactions(db: Session, graph: LinkGraph, after_id: int = 0, since: datetime = None,
+                      settle_seconds: float = 60.0, batch_size: int = 100000) -> int:
+    """
+    Add the edges of stored transactions with ids above `after_id` (and
+    timestamps from `since`) to the graph, then compact it. Returns the id to
+    continue from next time: the last of the rows created more than
+    `settle_seconds` ago, up to the first newer one. Ids are assigned before
+    commit, so a row with a lower id than one already read may still appear;
+    later rows are read again on the next call, which only re-sees their edges.
+    """
+    settled_before = time.time() - settle_seconds
+    cursor = settled = after_id
+    settling = True
+    rows_read = 0
+    while True:
+        query = (
+            select(Transaction.transaction_id, Transaction.card_id, Transaction.device_id,
+                   Transaction.ip_address, Transaction.timestamp, Transaction.created_at)
+            .where(Transaction.transaction_id > cursor)
+            .order_by(Transaction.transaction_id)
+            .limit(batch_size)
+        )
+        if since is not None:
+            query = query.where(Transaction.timestamp >= since)
+        rows = db.execute(query).all()
+        if not rows:
+            break
+        # Timestamps are stored as naive UTC
+        graph.add_many(
+            [row.card_id for row in rows], [row.device_id for row in rows], [row.ip_address for row in rows],
+            [(row.timestamp or row.created_at).replace(tzinfo=timezone.utc).timestamp() for row in rows]
+        )
+        for row in rows:
+            if settling and row.created_at is not None and \
+                    row.created_at.replace(tzinfo=timezone.utc).timestamp() < settled_before:
+                settled = row.transaction_id
+            else:
+                settling = False
+        rows_read += len(rows)
+        cursor = rows[-1].transaction_id
+    graph.compact()
+    logger.info(f"Loaded {rows_read} transactions into the link graph; settled up to id {settled}")
+    return settled
+
+def publish_graph(graph: LinkGraph, root_dir: str, last_transaction_id: int, loaded_at: float,
+                  keep: int = 2, now: float = None) -> str:
+    """
+    Snapshot the graph as a new version under root_dir and repoint
+    root_dir/current at it. `last_transaction_id` is where the next
+    load_transactions continues; `loaded_at` is when the last one started,
+    so workers know which of their own edges the version already holds.
+    """
+    return publish_version(root_dir, lambda path: graph.snapshot(
+        path, now, last_transaction_id=last_transaction_id, loaded_at=loaded_at
+    ), keep)
+
+class PublishedLinkGraph:
+    """
+    The current LinkGraph behind a path (normally the `current` symlink
+    written by publish_graph). As with IpRiskLookup, the link target is
+    checked every `reload_interval_seconds` and the snapshot restored when it
+    changed; here on a background thread started by start(), as restoring
+    copies the union-find arrays and replays local edges.
+
+    Transactions this worker stores are added to the graph it is serving, so
+    they count before the builder reads them back from the table. They are
+    also kept in a log and replayed onto each newly restored version, unless
+    they were stored more than `replay_margin_seconds` before that version's
+    load started. The serving graph is never compacted here, which would
+    replace the shared mapped arrays with private copies; instead, once
+    `max_local_edges` are waiting for a version that covers them, further
+    transactions are not added until the next version.
+    """
+
+    def __init__(self, path: str, reload_interval_seconds: float = 60.0, replay_margin_seconds: float = 60.0,
+                 max_local_edges: int = 100000, **graph_kwargs):
+        self.path = path
+        self.reload_interval_seconds = reload_interval_seconds
+        self.replay_margin_seconds = replay_margin_seconds
+        self.max_local_edges = max_local_edges
+        self.graph_kwargs = {**graph_kwargs, 'compact_every': None}
+        self._lock = threading.Lock()
+        self._graph = LinkGraph(**self.graph_kwargs)
+        self._target: Optional[str] = None
+        # (stored at, card, device, ip, timestamp) of transactions stored by this worker
+        self._local: deque = deque()
+        self._skipped = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def graph(self) -> LinkGraph:
+        return self._graph
+
+    def start(self) -> None:
+        """Load the current version, then keep following the link in the background"""
+        self.reload()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="link-graph-reload", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.reload_interval_seconds):
+            self.reload()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def reload(self) -> None:
+        """Restore the version the link points at, if it changed"""
+        target = os.path.realpath(self.path)
+        if target == self._target:
+            return
+        if not os.path.isfile(os.path.join(target, 'meta.json')):
+            logger.warning(f"No link graph at {self.path}; keeping the current one")
+            self._target = target
+            return
+        try:
+            graph = LinkGraph(**self.graph_kwargs)
+            meta = graph.restore(target)
+        except Exception as e:
+            logger.error(f"Failed to restore link graph {target}: {str(e)}")
+            return
+        covered_before = meta.get('loaded_at', meta['snapshot_at']) - self.replay_margin_seconds
+        with self._lock:
+            while self._local and self._local[0][0] < covered_before:
+                self._local.popleft()
+            for _, card_id, device_id, ip_address, timestamp in self._local:
+                graph.add(card_id, device_id, ip_address, timestamp)
+            # One reference swap; lookups in flight finish on the graph they started with
+            self._graph, self._target = graph, target
+            if self._skipped:
+                logger.warning(f"{self._skipped} stored transactions were not added to the link graph "
+                               f"while waiting for a new version")
+            self._skipped = 0
+
+    def add(self, card_id: str, device_id: Optional[str], ip_address: Optional[str], timestamp: float = None) -> None:
+        """Record one transaction stored by this worker"""
+        with self._lock:
+            if len(self._local) >= self.max_local_edges:
+                # The builder is behind; it will still read these from the table
+                self._skipped += 1
+                return
+            self._local.append((time.time(), card_id, device_id, ip_address, timestamp))
+            self._graph.add(card_id, device_id, ip_address, timestamp)
+
+    def features(self, card_id: str, device_id: Optional[str], ip_address: Optional[str],
+                 now: float = None) -> Dict[str, int]:
+        return self._graph.features(card_id, device_id, ip_address, now)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            local = {'version': self._target, 'local_edges': len(self._local), 'skipped_edges': self._skipped}
+        return {**local, **self._graph.stats()}
+
+# One per worker; the mapped adjacency arrays are shared by all workers through the page cache
+link_graph = PublishedLinkGraph(
+    os.path.join(LINK_GRAPH_DIR, 'current'), LINK_GRAPH_RELOAD_SECONDS, max_local_edges=LINK_GRAPH_MAX_LOCAL_EDGES,
+    max_degree=LINK_GRAPH_MAX_DEGREE, window_seconds=LINK_GRAPH_WINDOW_SECONDS,
+    retention_seconds=LINK_GRAPH_RETENTION_SECONDS
+)
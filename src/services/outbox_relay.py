@@ -0,0 +1,180 @@
+# src/services/outbox_relay.py
+
+import json
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+from kafka import KafkaProducer
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+from src.database.models import FraudCase, OutboxEvent
+from src.utils.logging_config import setup_logging
+
+# Setup logger
+logger = setup_logging(__name__)
+
+EVENTS_RELAYED = Counter('outbox_events_relayed_total', 'Outbox events published downstream', ['event_type'])
+FRAUD_CASES_CREATED = Counter('outbox_fraud_cases_created_total', 'FraudCase rows created for HIGH risk decisions')
+RELAY_FAILURES = Counter('outbox_relay_failures_total', 'Relay batches rolled back after an error')
+BATCH_SECONDS = Histogram('outbox_relay_batch_seconds', 'Time to claim, publish and commit one batch')
+EVENT_LAG_SECONDS = Histogram(
+    'outbox_event_lag_seconds', 'Time from transaction commit to publication',
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+)
+PENDING_EVENTS = Gauge('outbox_pending_events', 'Unprocessed outbox events')
+OLDEST_PENDING_SECONDS = Gauge('outbox_oldest_pending_seconds', 'Age of the oldest unprocessed outbox event')
+
+def outbox_backlog(session_factory: Callable[[], Session]) -> Dict:
+    """Pending count and oldest pending age; updates the backlog gauges"""
+    db = session_factory()
+    try:
+        pending, oldest = db.execute(
+            select(func.count(OutboxEvent.id), func.min(OutboxEvent.created_at))
+            .where(OutboxEvent.processed_at.is_(None))
+        ).one()
+    finally:
+        db.close()
+
+    oldest_age = (datetime.utcnow() - oldest).total_seconds() if oldest else 0.0
+    PENDING_EVENTS.set(pending)
+    OLDEST_PENDING_SECONDS.set(oldest_age)
+    return {'pending': pending, 'oldest_pending_seconds': round(oldest_age, 3)}
+
+class FileSink:
+    """Local sink: appends one JSON document per event to a file"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def publish(self, events: List[Dict]) -> None:
+        with open(self.path, 'a') as f:
+            for event in events:
+                f.write(json.dumps(event) + '\n')
+            f.flush()
+
+class KafkaSink:
+    """Publishes events to a Kafka topic, keyed by card so a card's decisions stay ordered"""
+
+    def __init__(self, bootstrap_servers: List[str], topic: str):
+        self.topic = topic
+        self.producer = KafkaProducer(
+            bootstrap_servers=bootstrap_servers,
+            acks='all',
+            linger_ms=5,
+            key_serializer=lambda k: k.encode('utf-8'),
+            value_serializer=lambda v: json.dumps(v).encode('utf-8')
+        )
+
+    def publish(self, events: List[Dict]) -> None:
+        futures = [self.producer.send(self.topic, key=event['card_id'], value=event) for event in events]
+        self.producer.flush()
+        # Surface any broker error before the batch is marked processed
+        for future in futures:
+            future.get()
+
+class OutboxRelay:
+    """
+    Drains outbox_events in batches. Each batch is claimed with
+    FOR UPDATE SKIP LOCKED (a no-op on SQLite), so several relays can run
+    in parallel on Postgres. FraudCase rows for HIGH risk decisions are
+    created and the batch is marked processed in the same commit, after the
+    sink has accepted the events. Delivery is at-least-once: consumers can
+    deduplicate on event_id.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session], sink, batch_size: int = 500):
+        self.session_factory = session_factory
+        self.sink = sink
+        self.batch_size = batch_size
+
+    def run_once(self) -> int:
+        """Relay one batch; returns the number of events published"""
+        db = self.session_factory()
+        start = time.perf_counter()
+        try:
+            events = db.execute(
+                select(OutboxEvent)
+                .where(OutboxEvent.processed_at.is_(None))
+                .order_by(OutboxEvent.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            ).scalars().all()
+            if not events:
+                db.rollback()
+                return 0
+
+            self._create_fraud_cases(db, events)
+            self.sink.publish([self._message(event) for event in events])
+
+            # Read before commit expires the instances
+            relayed = [(event.event_type, event.created_at) for event in events]
+            now = datetime.utcnow()
+            db.execute(
+                update(OutboxEvent)
+                .where(OutboxEvent.id.in_([event.id for event in events]))
+                .values(processed_at=now)
+            )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            RELAY_FAILURES.inc()
+            logger.error(f"Outbox relay batch failed: {str(e)}")
+            raise
+        finally:
+            db.close()
+
+        for event_type, created_at in relayed:
+            EVENTS_RELAYED.labels(event_type).inc()
+            EVENT_LAG_SECONDS.observe((now - created_at).total_seconds())
+        BATCH_SECONDS.observe(time.perf_counter() - start)
+        logger.info(f"Relayed {len(relayed)} outbox events")
+        return len(relayed)
+
+    def _create_fraud_cases(self, db: Session, events: List[OutboxEvent]) -> None:
+        high_risk = {
+            event.transaction_id: event for event in events
+            if event.event_type == 'fraud_decision' and event.payload.get('risk_level') == 'HIGH'
+        }
+        if not high_risk:
+            return
+
+        # A batch replayed after a failed commit must not duplicate cases
+        existing = set(db.execute(
+            select(FraudCase.transaction_id).where(FraudCase.transaction_id.in_(list(high_risk)))
+        ).scalars())
+        cases = [
+            FraudCase(
+                transaction_id=transaction_id,
+                status='open',
+                fraud_type='blocklist' if event.payload.get('block_reason') else 'model_high_risk',
+                confidence_score=event.payload.get('fraud_probability')
+            )
+            for transaction_id, event in high_risk.items() if transaction_id not in existing
+        ]
+        db.add_all(cases)
+        FRAUD_CASES_CREATED.inc(len(cases))
+
+    def _message(self, event: OutboxEvent) -> Dict:
+        return {
+            'event_id': event.id,
+            'event_type': event.event_type,
+            'transaction_id': event.transaction_id,
+            'created_at': event.created_at.isoformat(),
+            **event.payload
+        }
+
+    def run_forever(self, poll_interval: float = 1.0, metrics_interval: float = 10.0) -> None:
+        """Drain continuously, sleeping only when a batch comes back short"""
+        last_metrics = 0.0
+        while True:
+            if time.monotonic() - last_metrics >= metrics_interval:
+                outbox_backlog(self.session_factory)
+                last_metrics = time.monotonic()
+            try:
+                relayed = self.run_once()
+            except Exception:
+                time.sleep(poll_interval)
+                continue
+            if relayed < self.batch_size:
+                time.sleep(poll_interval)
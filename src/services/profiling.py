@@ -0,0 +1,204 @@
+# src/services/profiling.py
+
+import cProfile
+import json
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional
+from src.utils.logging_config import setup_logging
+
+# Setup logger
+logger = setup_logging(__name__)
+
+PROFILE_MODES = ('timing', 'cprofile')
+
+_current: ContextVar[Optional['RequestProfile']] = ContextVar('request_profile', default=None)
+_not_profiled = nullcontext()
+# The interpreter has one profiling hook; concurrent 'cprofile' requests fall back to timing
+_cprofile_lock = threading.Lock()
+
+class RequestProfile:
+    """
+    Time spent in each stage of one request (stages are summed when one
+    runs several times), plus a cProfile of the whole request in 'cprofile'
+    mode. cProfile only sees the thread that enabled it: the request's own
+    thread is profiled from active(), and work it hands to other threads is
+    profiled by running it through profiled_call(). On the event loop this
+    includes other requests interleaved meanwhile, and only one request is
+    cProfiled at a time.
+    """
+
+    def __init__(self, name: str, mode: str = 'timing', sampled: bool = False):
+        self.name = name
+        self.mode = mode
+        self.sampled = sampled
+        self.stages_ms: Dict[str, float] = {}
+        self.total_ms: Optional[float] = None
+        self._profiler = cProfile.Profile() if mode == 'cprofile' else None
+        # One per profiled_call; a profiler must not be shared between threads
+        self._thread_profilers: List[cProfile.Profile] = []
+        self._started: Optional[float] = None
+
+    def record(self, stage: str, elapsed_ms: float) -> None:
+        self.stages_ms[stage] = self.stages_ms.get(stage, 0.0) + elapsed_ms
+
+    @contextmanager
+    def active(self):
+        """Make this the current request's profile for profile_stage() calls"""
+        token = _current.set(self)
+        if self._profiler is not None and not _cprofile_lock.acquire(blocking=False):
+            self._profiler, self.mode = None, 'timing'
+        self._started = time.perf_counter()
+        if self._profiler is not None:
+            self._profiler.enable()
+        try:
+            yield self
+        finally:
+            if self._profiler is not None:
+                self._profiler.disable()
+                _cprofile_lock.release()
+            self.total_ms = (time.perf_counter() - self._started) * 1000
+            _current.reset(token)
+
+    def run_profiled(self, func: Callable, *args, **kwargs):
+        """Call func on this thread under a cProfile merged into top_functions ('cprofile' mode)"""
+        if self._profiler is None:
+            return func(*args, **kwargs)
+        profiler = cProfile.Profile()
+        self._thread_profilers.append(profiler)
+        return profiler.runcall(func, *args, **kwargs)
+
+    def server_timing(self) -> str:
+        """Server-Timing header value; browsers' network panels chart it"""
+        entries = [f"{stage};dur={elapsed:.3f}" for stage, elapsed in self.stages_ms.items()]
+        if self.total_ms is not None:
+            entries.append(f"total;dur={self.total_ms:.3f}")
+        return ", ".join(entries)
+
+    def top_functions(self, limit: int = 25) -> List[Dict]:
+        """The request's most expensive functions by cumulative time ('cprofile' mode only)"""
+        if self._profiler is None:
+            return []
+        stats = pstats.Stats()
+        for profiler in [self._profiler, *self._thread_profilers]:
+            try:
+                stats.add(profiler)
+            except TypeError:
+                # Nothing was recorded
+                pass
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+        return [
+            {
+                'function': f"{function} ({filename}:{line})",
+                'calls': calls,
+                'own_ms': round(own * 1000, 3),
+                'cumulative_ms': round(cumulative * 1000, 3)
+            }
+            for (filename, line, function), (_, calls, own, cumulative, _) in rows
+        ]
+
+    def log(self, top: int = 25) -> None:
+        logger.info("Request profile " + json.dumps({
+            'request': self.name,
+            'mode': self.mode,
+            'sampled': self.sampled,
+            'total_ms': round(self.total_ms, 3) if self.total_ms is not None else None,
+            'stages_ms': {stage: round(elapsed, 3) for stage, elapsed in self.stages_ms.items()},
+            **({'top_functions': self.top_functions(top)} if self._profiler is not None else {})
+        }))
+
+def request_profile(name: str, header: Optional[str], header_enabled: bool,
+                    sample_rate: float) -> Optional[RequestProfile]:
+    """A profile for this request when asked for by header (if allowed) or picked by sampling"""
+    if header is not None and header_enabled:
+        mode = header.strip().lower()
+        if mode in PROFILE_MODES:
+            return RequestProfile(name, mode)
+    if sample_rate > 0 and random.random() < sample_rate:
+        return RequestProfile(name, sampled=True)
+    return None
+
+def profiled_call(func: Callable, *args, **kwargs):
+    """
+    func(*args, **kwargs), cProfiled into the current request's profile when
+    it has one. For callables run on other threads, e.g. by run_in_threadpool,
+    which carries the request's context over.
+    """
+    profile = _current.get()
+    if profile is None:
+        return func(*args, **kwargs)
+    return profile.run_profiled(func, *args, **kwargs)
+
+class _StageTimer:
+    __slots__ = ('profile', 'stage', 'start')
+
+    def __init__(self, profile: RequestProfile, stage: str):
+        self.profile = profile
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.profile.record(self.stage, (time.perf_counter() - self.start) * 1000)
+        return False
+
+def profile_stage(stage: str):
+    """Context manager timing `stage` into the current request's profile; a shared no-op otherwise"""
+    profile = _current.get()
+    if profile is None:
+        return _not_profiled
+    return _StageTimer(profile, stage)
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})"
+
+class SamplingProfiler:
+    """
+    Statistical profiler over every thread of this process: samples all
+    stacks every `interval_seconds` and counts identical stacks. Costs
+    nothing until run; while running, one stack walk per thread per sample.
+    Only one run at a time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def run(self, seconds: float, interval_seconds: float = 0.005) -> Counter:
+        """Sample for `seconds`; raises RuntimeError when a run is in progress"""
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("A profiling run is already in progress")
+        try:
+            own = threading.get_ident()
+            stacks = Counter()
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own:
+                        continue
+                    labels = []
+                    while frame is not None:
+                        labels.append(_frame_label(frame.f_code))
+                        frame = frame.f_back
+                    labels.append(names.get(thread_id, str(thread_id)))
+                    stacks[';'.join(reversed(labels))] += 1
+                time.sleep(interval_seconds)
+            logger.info(f"Sampled {sum(stacks.values())} stacks over {seconds}s")
+            return stacks
+        finally:
+            self._lock.release()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+def collapsed_stacks(stacks: Counter) -> str:
+    """Folded 'frame;frame;frame count' lines, as read by flamegraph.pl and speedscope"""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
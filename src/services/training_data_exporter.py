@@ -0,0 +1,127 @@
+# src/services/training_data_exporter.py
+
+import os
+from datetime import datetime, timezone
+from typing import List, Optional
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import select, or_
+from sqlalchemy.orm import Session
+from src.config.settings import TRAINING_CHUNK_SIZE
+from src.database.models import Transaction, FraudCase
+from src.ml.preprocessing.preprocessor import FraudDataPreprocessor
+from src.utils.logging_config import setup_logging
+
+# Setup logger
+logger = setup_logging(__name__)
+
+# A closed case is confirmed fraud unless it was resolved as a false positive.
+# Transactions with open or under_review cases are not labeled yet and are skipped.
+FALSE_POSITIVE_RESOLUTION = 'false_positive'
+
+class TrainingDataExporter:
+    def __init__(self, db: Session, preprocessor: FraudDataPreprocessor = None,
+                 chunk_size: int = None, file_format: str = 'parquet'):
+        if file_format not in ('parquet', 'arrow'):
+            raise ValueError(f"Unsupported export format: {file_format}")
+        self.db = db
+        self.preprocessor = preprocessor or FraudDataPreprocessor()
+        self.chunk_size = chunk_size or TRAINING_CHUNK_SIZE
+        self.file_format = file_format
+        logger.info("TrainingDataExporter initialized with database session")
+
+    def _labeled_transactions_query(self, since: Optional[datetime], until: Optional[datetime]):
+        """Transactions joined to their fraud case, excluding unresolved cases"""
+        query = (
+            select(
+                Transaction.transaction_id,
+                Transaction.card_id,
+                Transaction.merchant_id,
+                Transaction.amount,
+                Transaction.timestamp,
+                Transaction.location_id,
+                Transaction.device_id,
+                Transaction.ip_address,
+                FraudCase.status.label('case_status'),
+                FraudCase.resolution.label('case_resolution')
+            )
+            .outerjoin(FraudCase, FraudCase.transaction_id == Transaction.transaction_id)
+            .where(or_(FraudCase.case_id.is_(None), FraudCase.status == 'closed'))
+            .order_by(Transaction.transaction_id)
+        )
+        if since is not None:
+            query = query.where(Transaction.timestamp >= since)
+        if until is not None:
+            query = query.where(Transaction.timestamp < until)
+        return query
+
+    def export(self, output_dir: str, since: datetime = None, until: datetime = None) -> List[str]:
+        """
+        Stream labeled transactions into partitioned Parquet/Arrow files.
+        Only one chunk of rows is held in memory at a time.
+        """
+        logger.info(f"Exporting labeled transactions to {output_dir} (since={since}, until={until})")
+        os.makedirs(output_dir, exist_ok=True)
+
+        # stream_results uses a server-side cursor on Postgres
+        result = self.db.execute(
+            self._labeled_transactions_query(since, until).execution_options(
+                stream_results=True, yield_per=self.chunk_size
+            )
+        )
+
+        paths = []
+        total_rows = 0
+        for part, rows in enumerate(result.partitions()):
+            table = self._rows_to_table(rows)
+            paths.append(self._write_part(table, output_dir, part))
+            total_rows += table.num_rows
+            logger.info(f"Wrote part {part} ({table.num_rows} rows, {total_rows} total)")
+
+        logger.info(f"Export finished: {total_rows} rows in {len(paths)} files")
+        return paths
+
+    def _rows_to_table(self, rows) -> pa.Table:
+        """Build the training schema for one chunk with the inference-side feature builder"""
+        transactions = [
+            {
+                'card_id': row.card_id,
+                'merchant_id': row.merchant_id,
+                'amount': float(row.amount),
+                'location_id': row.location_id,
+                'device_id': row.device_id,
+                'ip_address': row.ip_address
+            }
+            for row in rows
+        ]
+        # Features use each transaction's own event time (stored as naive UTC)
+        timestamps = [
+            row.timestamp.replace(tzinfo=timezone.utc).timestamp() if row.timestamp else np.nan
+            for row in rows
+        ]
+        frame = self.preprocessor.build_raw_features(transactions, timestamps)
+
+        frame['Class'] = np.array(
+            [row.case_status == 'closed' and row.case_resolution != FALSE_POSITIVE_RESOLUTION
+             for row in rows],
+            dtype=np.int8
+        )
+        frame['transaction_id'] = np.array([row.transaction_id for row in rows], dtype=np.int64)
+        return pa.Table.from_pandas(frame, preserve_index=False)
+
+    def _write_part(self, table: pa.Table, output_dir: str, part: int) -> str:
+        """Write one partition, renaming into place so readers never see partial files"""
+        suffix = 'parquet' if self.file_format == 'parquet' else 'arrow'
+        path = os.path.join(output_dir, f'part-{part:05d}.{suffix}')
+        tmp_path = f'{path}.tmp'
+
+        if self.file_format == 'parquet':
+            pq.write_table(table, tmp_path)
+        else:
+            with pa.OSFile(tmp_path, 'wb') as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table, max_chunksize=self.chunk_size)
+
+        os.replace(tmp_path, path)
+        return path
@@ -1,23 +1,77 @@
 # src/services/transaction_service.py
 
+from contextlib import nullcontext
+from sqlalchemy.exc import IntegrityError, InterfaceError, OperationalError
 from sqlalchemy.orm import Session
-from src.database.models import Transaction, Card, TransactionPattern
+from src.database.models import Transaction, Card, TransactionPattern, OutboxEvent
+from src.database.routing import replica_read
 from src.schemas.transaction import TransactionCreate, TransactionResponse
-from datetime import datetime
+from src.services.blocklist import Blocklist, blocklist as default_blocklist
+from src.services.degradation import Deadline
+from src.services.feature_store import FeatureStore, feature_store as default_feature_store
+from src.services.idempotency import IdempotencyKeyReused
+from src.services.ip_ranges import IpRiskLookup, ip_risk as default_ip_risk
+from src.services.link_graph import PublishedLinkGraph, link_graph as default_link_graph, link_risk_score
+from src.services.profiling import profile_stage
+from src.config.settings import BLOCKLIST_ENABLED, LINK_GRAPH_ENABLED
+from datetime import datetime, timezone
 from src.utils.logging_config import setup_logging
-from typing import Dict
+from typing import Dict, Iterable, List, Optional, Tuple
+import hashlib
+import json
 
 # Setup logger
 logger = setup_logging(__name__)
 
+def risk_level_for(fraud_probability: float, risk_scores: Iterable[float]) -> str:
+    """Stored risk level: HIGH/MEDIUM/LOW from the model probability and the count of scores above 0.8"""
+    high_risk_count = sum(1 for score in risk_scores if score > 0.8)
+    if fraud_probability > 0.7 or high_risk_count >= 2:
+        return 'HIGH'
+    if fraud_probability > 0.3 or high_risk_count >= 1:
+        return 'MEDIUM'
+    return 'LOW'
+
+def status_for(risk_level: str) -> str:
+    """Stored status, kept consistent with the risk level"""
+    return "fraud" if risk_level == "HIGH" else "legit"
+
+def request_fingerprint(transaction_data: TransactionCreate) -> str:
+    """SHA-256 of the validated request without its idempotency key, which may also come as a header"""
+    request = transaction_data.model_dump(mode='json', exclude={'idempotency_key'})
+    return hashlib.sha256(json.dumps(request, sort_keys=True, separators=(',', ':')).encode()).hexdigest()
+
 class TransactionService:
-   def __init__(self, db: Session):
+   def __init__(self, db: Session, feature_store: FeatureStore = None, ip_risk: IpRiskLookup = None,
+                link_graph: PublishedLinkGraph = None, blocklist: Blocklist = None):
        self.db = db
+       self.feature_store = feature_store or default_feature_store
+       self.ip_risk = ip_risk or default_ip_risk
+       self.link_graph = link_graph or (default_link_graph if LINK_GRAPH_ENABLED else None)
+       self.blocklist = blocklist or (default_blocklist if BLOCKLIST_ENABLED else None)
        logger.info("TransactionService initialized with database session")
 
-   def enrich_transaction(self, transaction_data: TransactionCreate):
+   def check_blocklist(self, transaction_data: TransactionCreate) -> Optional[str]:
+       """
+       Why the transaction's card, device or IP is blocklisted, or None.
+       """
+       if self.blocklist is None:
+           return None
+       block_reason = self.blocklist.check(
+           self.db, transaction_data.card_id, transaction_data.device_id, transaction_data.ip_address
+       )
+       if block_reason is not None:
+           logger.warning(f"Blocked transaction for card_id {transaction_data.card_id}: {block_reason}")
+       return block_reason
+
+   def blocked_prediction(self) -> Dict:
+       """Stand-in for the model's prediction of a blocklisted transaction"""
+       return {'fraud_probability': 1.0, 'risk_components': {}, 'risk_level': 'HIGH'}
+
+   def enrich_transaction(self, transaction_data: TransactionCreate, deadline: Deadline = None):
        """
        Enrich transaction data with additional features for fraud detection.
+       With a deadline, the card lookup is skipped when it would not fit.
        """
        logger.info(f"Starting transaction enrichment for card_id: {transaction_data.card_id}")
        try:
@@ -31,16 +85,66 @@ class TransactionService:
                "ip_address": transaction_data.ip_address
            }
 
+           # One multi-get for every entity feature used below; misses may be read from a replica
+           try:
+               with profile_stage('feature_lookup'):
+                   entity_features = replica_read(self.db, lambda: self.feature_store.get_many(self.db, [
+                       ('card', transaction_data.card_id),
+                       ('merchant', transaction_data.merchant_id),
+                       ('location', transaction_data.location_id),
+                       ('device', transaction_data.device_id),
+                       ('ip', transaction_data.ip_address)
+                   ]))
+           except (OperationalError, InterfaceError) as e:
+               if deadline is None:
+                   raise
+               # Database unavailable: score on the rule defaults below rather than fail
+               logger.warning(f"Feature lookup failed, continuing without stored features: {str(e)}")
+               self.db.rollback()
+               entity_features = {}
+               deadline.degrade('feature_lookup_skipped')
+
+           def features_for(entity_type, entity_id):
+               return entity_features.get((entity_type, str(entity_id)), {})
+
+           card_features = features_for('card', transaction_data.card_id)
+           merchant_features = features_for('merchant', transaction_data.merchant_id)
+           location_features = features_for('location', transaction_data.location_id)
+
            # Adding calculated risks
-           card_type = self.get_card_type(transaction_data.card_id)
+           card_type = card_features.get('card_type')
+           if card_type is None and deadline is not None and not deadline.allows('card_lookup'):
+               # Not cached, so the next request with time to spare looks it up
+               card_type = "unknown"
+               deadline.degrade('card_lookup_skipped')
+           elif card_type is None:
+               # Read through to the cards table once, then serve from the memory tier
+               try:
+                   with profile_stage('card_lookup'), \
+                           deadline.measure('card_lookup') if deadline is not None else nullcontext():
+                       card_type = self.get_card_type(transaction_data.card_id)
+                   self.feature_store.put('card', transaction_data.card_id, {'card_type': card_type})
+               except (OperationalError, InterfaceError):
+                   if deadline is None:
+                       raise
+                   self.db.rollback()
+                   card_type = "unknown"
+                   deadline.degrade('card_lookup_skipped')
            enriched_data["card_type"] = card_type
            logger.debug(f"Retrieved card type: {card_type}")
 
-           merchant_risk = self.calculate_merchant_risk(transaction_data.merchant_id)
+           if 'avg_transaction_amount' in card_features:
+               enriched_data["avg_transaction_amount"] = card_features['avg_transaction_amount']
+
+           merchant_risk = merchant_features.get('merchant_risk_score')
+           if merchant_risk is None:
+               merchant_risk = self.calculate_merchant_risk(transaction_data.merchant_id)
            enriched_data["merchant_risk_score"] = merchant_risk
            logger.debug(f"Calculated merchant risk: {merchant_risk}")
 
-           location_risk = self.calculate_location_risk(transaction_data.location_id)
+           location_risk = location_features.get('location_risk_score')
+           if location_risk is None:
+               location_risk = self.calculate_location_risk(transaction_data.location_id)
            enriched_data["location_risk_score"] = location_risk
            logger.debug(f"Calculated location risk: {location_risk}")
 
@@ -48,6 +152,31 @@ class TransactionService:
            enriched_data["amount_risk_score"] = amount_risk
            logger.debug(f"Calculated amount risk: {amount_risk}")
 
+           # Device risk is only known once materialized
+           device_risk = features_for('device', transaction_data.device_id).get('device_risk_score')
+           if device_risk is not None:
+               enriched_data["device_risk_score"] = device_risk
+
+           # A materialized IP risk wins over the range table's reputation risk
+           with profile_stage('ip_ranges'):
+               ip_range_risk = self.ip_risk.lookup(transaction_data.ip_address) or {}
+           ip_risk = features_for('ip', transaction_data.ip_address).get('ip_risk_score')
+           if ip_risk is None:
+               ip_risk = ip_range_risk.get('reputation_risk')
+           if ip_risk is not None:
+               enriched_data["ip_risk_score"] = ip_risk
+           if 'geo_risk' in ip_range_risk:
+               enriched_data["ip_geo_risk_score"] = ip_range_risk['geo_risk']
+
+           # Fraud-ring signals: cards sharing this device/IP, and the size of the card's cluster
+           if self.link_graph is not None:
+               with profile_stage('link_graph'):
+                   link_features = self.link_graph.features(
+                       transaction_data.card_id, transaction_data.device_id, transaction_data.ip_address
+                   )
+               enriched_data.update(link_features)
+               enriched_data["link_risk_score"] = link_risk_score(link_features)
+
            logger.info("Successfully enriched transaction data")
            return enriched_data
 
@@ -61,7 +190,7 @@ class TransactionService:
        """
        logger.debug(f"Fetching card type for card_id: {card_id}")
        try:
-           card = self.db.query(Card).filter(Card.card_id == card_id).first()
+           card = replica_read(self.db, lambda: self.db.query(Card).filter(Card.card_id == card_id).first())
            if card:
                logger.debug(f"Found card type: {card.card_type}")
                return card.card_type
@@ -126,91 +255,233 @@ class TransactionService:
            logger.error(f"Error calculating amount risk: {str(e)}")
            raise
 
-   def store_transaction(self, transaction_data: TransactionCreate, fraud_probability: float, risk_components: Dict = None):
-    """Store a transaction in the database with fraud probability and risk components."""
+   def rule_only_prediction(self, enriched_data: Dict) -> Dict:
+       """
+       Stand-in for the model's prediction built from the rule scores alone, for
+       when the model is too slow or failing. The highest rule score (including
+       IP and link risks, when known) is used, so a single risky signal is not
+       averaged away.
+       """
+       fraud_probability = max(
+           enriched_data['merchant_risk_score'],
+           enriched_data['location_risk_score'],
+           enriched_data['amount_risk_score'],
+           enriched_data.get('ip_risk_score') or 0.0,
+           enriched_data.get('ip_geo_risk_score') or 0.0,
+           enriched_data.get('link_risk_score') or 0.0
+       )
+       return {
+           'fraud_probability': fraud_probability,
+           'risk_components': {'pattern_risk': 0.0, 'user_behavior_risk': 0.0},
+           'risk_level': 'HIGH' if fraud_probability >= 0.7 else 'MEDIUM' if fraud_probability >= 0.3 else 'LOW'
+       }
+
+   def _decision(self, transaction_data: TransactionCreate, fraud_probability: float,
+                 risk_components: Dict = None, enriched_data: Dict = None) -> Dict:
+       """Risk scores, risk level and status stored with a transaction"""
+       # Reuse the scores the model saw when enrichment already computed them
+       if enriched_data:
+           merchant_risk = enriched_data['merchant_risk_score']
+           location_risk = enriched_data['location_risk_score']
+           amount_risk = enriched_data['amount_risk_score']
+           link_risk = enriched_data.get('link_risk_score') or 0.0
+       else:
+           merchant_risk = self.calculate_merchant_risk(transaction_data.merchant_id)
+           location_risk = self.calculate_location_risk(transaction_data.location_id)
+           amount_risk = self.calculate_amount_risk(transaction_data.amount)
+           link_risk = 0.0
+
+       # Get ML model risk components or use defaults
+       pattern_risk = risk_components.get('pattern_risk', 0.0) if risk_components else 0.0
+       user_behavior_risk = risk_components.get('user_behavior_risk', 0.0) if risk_components else 0.0
+
+       # Determine risk level based on both probability and risk scores
+       risk_level = risk_level_for(fraud_probability, [
+           merchant_risk, location_risk, amount_risk,
+           pattern_risk, user_behavior_risk, link_risk
+       ])
+
+       return {
+           'fraud_probability': fraud_probability,
+           'merchant_risk_score': merchant_risk,
+           'location_risk_score': location_risk,
+           'amount_risk_score': amount_risk,
+           'pattern_risk_score': pattern_risk,
+           'user_behavior_risk_score': user_behavior_risk,
+           'link_risk_score': link_risk,
+           'risk_level': risk_level,
+           'status': status_for(risk_level)
+       }
+
+   def decision_response(self, transaction_data: TransactionCreate, fraud_probability: float,
+                         risk_components: Dict = None, enriched_data: Dict = None,
+                         timestamp: datetime = None) -> TransactionResponse:
+       """
+       The response store_transaction would return, without storing anything.
+       Used when the write is deferred; there is no transaction_id yet.
+       """
+       return TransactionResponse.model_construct(
+           transaction_id=None,
+           card_id=transaction_data.card_id,
+           amount=float(transaction_data.amount),
+           merchant_id=transaction_data.merchant_id,
+           timestamp=timestamp or datetime.utcnow(),
+           **self._decision(transaction_data, fraud_probability, risk_components, enriched_data)
+       )
+
+   def store_transaction(self, transaction_data: TransactionCreate, fraud_probability: float, risk_components: Dict = None,
+                         idempotency_key: Optional[str] = None, enriched_data: Dict = None,
+                         timestamp: datetime = None, block_reason: Optional[str] = None,
+                         degraded: Optional[List[str]] = None):
+    """
+    Store a transaction in the database with fraud probability and risk components.
+    `timestamp` defaults to now; deferred writes pass the time of the decision.
+    A `block_reason` is stored on the row and passed on in the decision event.
+    The `degraded` steps, and with an idempotency key the request's fingerprint,
+    are stored too, so a replay returns exactly this response.
+    """
     logger.info(f"Storing transaction for card_id: {transaction_data.card_id}")
     try:
-        # Calculate base risk scores
-        merchant_risk = self.calculate_merchant_risk(transaction_data.merchant_id)
-        location_risk = self.calculate_location_risk(transaction_data.location_id)
-        amount_risk = self.calculate_amount_risk(transaction_data.amount)
-        
-        # Get ML model risk components or use defaults
-        pattern_risk = risk_components.get('pattern_risk', 0.0) if risk_components else 0.0
-        user_behavior_risk = risk_components.get('user_behavior_risk', 0.0) if risk_components else 0.0
-        
-        # Count high risk indicators
-        high_risk_count = sum(1 for score in [
-            merchant_risk, location_risk, amount_risk, 
-            pattern_risk, user_behavior_risk
-        ] if score > 0.8)
-        
-        # Determine risk level based on both probability and risk scores
-        if fraud_probability > 0.7 or high_risk_count >= 2:
-            risk_level = 'HIGH'
-        elif fraud_probability > 0.3 or high_risk_count >= 1:
-            risk_level = 'MEDIUM'
-        else:
-            risk_level = 'LOW'
-        
-        # Status should be consistent with risk level
-        status = "fraud" if risk_level == "HIGH" else "legit"
+        decision = self._decision(transaction_data, fraud_probability, risk_components, enriched_data)
         
         transaction = Transaction(
             card_id=transaction_data.card_id,
             merchant_id=transaction_data.merchant_id,
             amount=transaction_data.amount,
-            timestamp=datetime.utcnow(),
+            timestamp=timestamp or datetime.utcnow(),
             location_id=transaction_data.location_id,
             device_id=transaction_data.device_id,
             ip_address=transaction_data.ip_address,
-            status=status,
-            fraud_probability=fraud_probability,
-            risk_level=risk_level,
-            merchant_risk_score=merchant_risk,
-            location_risk_score=location_risk,
-            amount_risk_score=amount_risk,
-            pattern_risk_score=pattern_risk,
-            user_behavior_risk_score=user_behavior_risk,
-            created_at=datetime.utcnow()
+            created_at=datetime.utcnow(),
+            idempotency_key=idempotency_key,
+            request_fingerprint=request_fingerprint(transaction_data) if idempotency_key else None,
+            block_reason=block_reason,
+            degraded=degraded or None,
+            **decision
         )
 
         self.db.add(transaction)
-        self.db.commit()
+        # Decision event for the outbox relay, committed atomically with the transaction
+        self.db.add(OutboxEvent(
+            event_type='fraud_decision',
+            transaction=transaction,
+            payload={
+                'card_id': transaction_data.card_id,
+                'merchant_id': transaction_data.merchant_id,
+                'amount': float(transaction_data.amount),
+                'status': decision['status'],
+                'risk_level': decision['risk_level'],
+                'fraud_probability': fraud_probability,
+                'decided_at': transaction.timestamp.isoformat(),
+                **({'block_reason': block_reason} if block_reason else {})
+            }
+        ))
+        try:
+            self.db.commit()
+        except IntegrityError:
+            # Another worker stored the same idempotency key first; return its row
+            self.db.rollback()
+            existing = self.find_by_idempotency_key(idempotency_key) if idempotency_key else None
+            if existing is None:
+                raise
+            self.check_replay(existing, transaction_data)
+            logger.info(f"Duplicate idempotency key {idempotency_key}; returning transaction {existing.transaction_id}")
+            return self.build_response(existing)
         self.db.refresh(transaction)
         
         logger.info(f"Successfully stored transaction with id: {transaction.transaction_id}")
+
+        if self.link_graph is not None:
+            self.link_graph.add(
+                transaction.card_id, transaction.device_id, transaction.ip_address,
+                transaction.timestamp.replace(tzinfo=timezone.utc).timestamp()
+            )
         
-        return TransactionResponse(
+        # Every value was computed above or read back from the row; skip re-validation
+        return TransactionResponse.model_construct(
             transaction_id=transaction.transaction_id,
             card_id=transaction.card_id,
-            amount=transaction.amount,
+            amount=float(transaction.amount),
             merchant_id=transaction.merchant_id,
             timestamp=transaction.timestamp,
-            status=status,
-            fraud_probability=fraud_probability,
-            risk_level=risk_level,
-            merchant_risk_score=merchant_risk,
-            location_risk_score=location_risk,
-            amount_risk_score=amount_risk,
-            pattern_risk_score=pattern_risk,
-            user_behavior_risk_score=user_behavior_risk
+            block_reason=block_reason,
+            degraded=degraded or [],
+            **decision
         )
 
+    except IdempotencyKeyReused:
+        raise
     except Exception as e:
         logger.error(f"Error storing transaction: {str(e)}")
         self.db.rollback()
         raise
 
+   def find_by_idempotency_key(self, idempotency_key: str) -> Optional[Transaction]:
+       """
+       Fetch a previously stored transaction by its idempotency key.
+       """
+       logger.debug(f"Looking up idempotency key: {idempotency_key}")
+       try:
+           # Always on the primary: a lagging replica would miss a retry's first attempt
+           return self.db.query(Transaction).filter(
+               Transaction.idempotency_key == idempotency_key
+           ).first()
+       except Exception as e:
+           logger.error(f"Error looking up idempotency key: {str(e)}")
+           raise
+
+   def check_replay(self, transaction: Transaction, transaction_data: TransactionCreate) -> None:
+       """
+       Raise IdempotencyKeyReused when a stored transaction's key is sent with a
+       different request. Rows stored before fingerprints were recorded pass.
+       """
+       if transaction.request_fingerprint is not None and \
+               transaction.request_fingerprint != request_fingerprint(transaction_data):
+           raise IdempotencyKeyReused(transaction.idempotency_key)
+
+   def get_transaction(self, transaction_id: int) -> Optional[Transaction]:
+       """
+       Fetch a stored transaction by id, from a replica if one is fresh enough.
+       """
+       logger.debug(f"Fetching transaction: {transaction_id}")
+       try:
+           transaction = replica_read(self.db, lambda: self.db.get(Transaction, transaction_id))
+           # Not replicated yet, if it was stored within the staleness budget
+           return transaction if transaction is not None else self.db.get(Transaction, transaction_id)
+       except Exception as e:
+           logger.error(f"Error fetching transaction: {str(e)}")
+           raise
+
+   def scoring_features(self, transaction: Transaction) -> Tuple[Dict, float]:
+       """
+       Raw fields the model scored for a stored transaction, and its event time
+       in epoch seconds (timestamps are stored as naive UTC).
+       """
+       features = {
+           "card_id": transaction.card_id,
+           "merchant_id": transaction.merchant_id,
+           "amount": float(transaction.amount),
+           "location_id": transaction.location_id,
+           "device_id": transaction.device_id,
+           "ip_address": transaction.ip_address
+       }
+       return features, transaction.timestamp.replace(tzinfo=timezone.utc).timestamp()
+
+   def build_response(self, transaction: Transaction) -> TransactionResponse:
+       """
+       Build the API response for a stored transaction.
+       """
+       return TransactionResponse.model_validate(transaction)
+
    def get_transaction_history(self, card_id: str):
        """
        Fetch the transaction history for a specific card.
        """
        logger.info(f"Fetching transaction history for card_id: {card_id}")
        try:
-           transactions = self.db.query(Transaction).filter(
+           transactions = replica_read(self.db, lambda: self.db.query(Transaction).filter(
                Transaction.card_id == card_id
-           ).all()
+           ).all())
            logger.info(f"Found {len(transactions)} transactions for card_id: {card_id}")
            return transactions
        except Exception as e:
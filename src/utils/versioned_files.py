@@ -0,0 +1,37 @@
+# src/utils/versioned_files.py
+
+import os
+from datetime import datetime
+from typing import Callable
+from src.utils.logging_config import setup_logging
+
+# Setup logger
+logger = setup_logging(__name__)
+
+def publish_version(root_dir: str, build: Callable[[str], object], keep: int = 2, marker: str = 'meta.json') -> str:
+    """
+    Build a new version directory under root_dir with `build(path)` and
+    repoint root_dir/current at it in one rename, so readers never see a
+    half-written version. Versions (directories holding `marker`) beyond the
+    newest `keep` are removed; processes still mapping one keep their pages.
+    """
+    version = datetime.utcnow().strftime('%Y%m%d_%H%M%S_%f')
+    build(os.path.join(root_dir, version))
+
+    link = os.path.join(root_dir, 'current')
+    tmp_link = f"{link}.tmp"
+    if os.path.lexists(tmp_link):
+        os.remove(tmp_link)
+    os.symlink(version, tmp_link)
+    os.replace(tmp_link, link)
+    logger.info(f"Published {version} at {link}")
+
+    versions = sorted(
+        name for name in os.listdir(root_dir)
+        if not os.path.islink(os.path.join(root_dir, name)) and os.path.isfile(os.path.join(root_dir, name, marker))
+    )
+    for old in versions[:-keep] if keep > 0 else []:
+        for name in os.listdir(os.path.join(root_dir, old)):
+            os.remove(os.path.join(root_dir, old, name))
+        os.rmdir(os.path.join(root_dir, old))
+    return version
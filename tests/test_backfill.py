@@ -0,0 +1,95 @@
+# tests/test_backfill.py
+
+from datetime import datetime, timezone
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from src.database.models import Base, Location, Transaction
+from src.services.backfill import BackfillCheckpoint, ScoreBackfill
+
+class StubPredictor:
+    model_file = 'fraud_model_new.json'
+
+    def __init__(self):
+        self.timestamps = []
+
+    def predict_batch(self, features_list, timestamps=None):
+        self.timestamps.extend(timestamps)
+        return [
+            {
+                'fraud_probability': 0.9 if features['amount'] > 100 else 0.1,
+                'risk_components': {'pattern_risk': 0.1, 'user_behavior_risk': 0.2}
+            }
+            for features in features_list
+        ]
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'backfill.db'}")
+    Base.metadata.create_all(engine, tables=[Location.__table__, Transaction.__table__])
+    factory = sessionmaker(bind=engine)
+
+    db = factory()
+    db.add_all([
+        Transaction(
+            card_id=f"card_{i}", merchant_id="merch_1", amount=50 + 40 * i, location_id=1,
+            timestamp=datetime(2024, 1, 1 + i, 12, 0), status='legit',
+            fraud_probability=0.2, risk_level='LOW', merchant_risk_score=0.2,
+            location_risk_score=0.2, amount_risk_score=0.2
+        )
+        for i in range(5)
+    ])
+    db.commit()
+    db.close()
+    return factory
+
+def test_rescore_range_writes_scores_using_event_time(session_factory):
+    predictor = StubPredictor()
+    backfill = ScoreBackfill(session_factory, predictor, batch_size=2, since=datetime(2024, 1, 2))
+
+    assert backfill.id_ranges(range_size=3) == [(2, 5), (5, 6)]
+    result = backfill.rescore_range(2, 5)
+
+    assert result['rows'] == 3
+    assert result['transitions'] == {'LOW->LOW': 1, 'LOW->HIGH': 2}
+    assert predictor.timestamps[0] == datetime(2024, 1, 2, 12, 0, tzinfo=timezone.utc).timestamp()
+
+    db = session_factory()
+    rows = {t.transaction_id: t for t in db.query(Transaction).all()}
+    assert rows[1].analysis_version is None
+    assert rows[4].risk_level == 'HIGH'
+    # Status follows the new risk level, as when the row was first stored
+    assert (rows[4].status, rows[2].status) == ('fraud', 'legit')
+    assert rows[4].fraud_probability == 0.9
+    assert rows[4].analysis_version == 'fraud_model_new.json'
+    assert rows[4].analyzed_at is not None
+    assert rows[5].analysis_version is None
+    db.close()
+
+def test_blocklisted_rows_keep_their_decision(session_factory):
+    db = session_factory()
+    db.query(Transaction).filter(Transaction.transaction_id == 5).update(
+        {'block_reason': 'card blocklisted: reported stolen', 'fraud_probability': 1.0, 'risk_level': 'HIGH'}
+    )
+    db.commit()
+    db.close()
+    backfill = ScoreBackfill(session_factory, StubPredictor(), batch_size=10)
+
+    assert backfill.id_ranges(range_size=10) == [(1, 5)]
+    assert backfill.rescore_range(1, 6)['rows'] == 4
+
+    db = session_factory()
+    blocked = db.get(Transaction, 5)
+    assert (blocked.fraud_probability, blocked.risk_level, blocked.analysis_version) == (1.0, 'HIGH', None)
+    db.close()
+
+def test_checkpoint_resumes_only_the_same_run(tmp_path):
+    path = str(tmp_path / 'checkpoint.json')
+    run = {'model_file': 'fraud_model_new.json', 'since': None, 'until': None, 'range_size': 100}
+
+    BackfillCheckpoint(path, run).mark_done((1, 101), {'rows': 100})
+    assert BackfillCheckpoint(path, run).is_done((1, 101))
+    assert not BackfillCheckpoint(path, run).is_done((101, 201))
+
+    with pytest.raises(ValueError):
+        BackfillCheckpoint(path, {**run, 'model_file': 'fraud_model_other.json'})
@@ -0,0 +1,50 @@
+# tests/test_batcher.py
+
+import asyncio
+import pytest
+from src.ml.prediction.batcher import MicroBatcher
+
+@pytest.mark.asyncio
+async def test_concurrent_submits_share_one_batch():
+    calls = []
+
+    def double(items):
+        calls.append(list(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(double, max_batch_size=8, max_wait_ms=20)
+    results = await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+
+    assert results == [0, 2, 4, 6, 8]
+    assert calls == [[0, 1, 2, 3, 4]]
+
+@pytest.mark.asyncio
+async def test_full_batch_flushes_without_waiting():
+    batcher = MicroBatcher(lambda items: items, max_batch_size=4, max_wait_ms=10000)
+    results = await asyncio.wait_for(asyncio.gather(*(batcher.submit(i) for i in range(4))), timeout=1)
+
+    assert results == [0, 1, 2, 3]
+
+@pytest.mark.asyncio
+async def test_bad_item_only_fails_its_caller():
+    def invert(items):
+        return [1 / item for item in items]
+
+    batcher = MicroBatcher(invert, max_batch_size=3, max_wait_ms=20)
+    results = await asyncio.gather(*(batcher.submit(i) for i in (1, 0, 2)), return_exceptions=True)
+
+    assert results[0] == 1.0 and results[2] == 0.5
+    assert isinstance(results[1], ZeroDivisionError)
+
+@pytest.mark.asyncio
+async def test_missing_results_fail_callers_instead_of_hanging():
+    batcher = MicroBatcher(lambda items: items[:-1], max_batch_size=3, max_wait_ms=20)
+    results = await asyncio.wait_for(
+        asyncio.gather(*(batcher.submit(i) for i in range(3)), return_exceptions=True), timeout=1
+    )
+
+    assert all(isinstance(result, ValueError) for result in results)
+    # Individual retries are not counted as batches
+    assert (batcher.stats()['batches'], batcher.stats()['retried_items']) == (1, 3)
+    await asyncio.sleep(0)
+    assert not batcher._tasks
@@ -0,0 +1,84 @@
+# tests/test_blocklist.py
+
+import os
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from src.database.models import Base, BlocklistEntry, FraudCase, Location, OutboxEvent, Transaction
+from src.schemas.transaction import TransactionCreate
+from src.services.blocklist import Blocklist, BloomFilter, import_entries, publish_filters
+from src.services.outbox_relay import OutboxRelay
+from src.services.transaction_service import TransactionService
+
+class ListSink:
+    def __init__(self):
+        self.events = []
+
+    def publish(self, events):
+        self.events.extend(events)
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'blocklist.db'}")
+    tables = [model.__table__ for model in (Location, Transaction, FraudCase, OutboxEvent, BlocklistEntry)]
+    Base.metadata.create_all(engine, tables=tables)
+    session = sessionmaker(bind=engine)()
+    import_entries(session, [
+        ('card', 'card_stolen', 'reported stolen'),
+        ('device', 'device_bad', 'emulator farm'),
+        ('ip', '203.0.113.7', 'botnet exit')
+    ], source='test.csv')
+    yield session
+    session.close()
+
+def test_bloom_filter_has_no_false_negatives_and_about_the_sized_false_positive_rate():
+    values = [f"card_{i}" for i in range(20000)]
+    bloom = BloomFilter.build(values, false_positive_rate=0.01)
+
+    assert bloom.contains_many(values).all()
+    assert all(value in bloom for value in values[:1000])
+    others = [f"other_{i}" for i in range(20000)]
+    hits = bloom.contains_many(others)
+    assert hits.mean() < 0.02
+    # The per-value check probes the same bits as the batch one
+    assert [value in bloom for value in others[:2000]] == hits[:2000].tolist()
+
+def test_filter_hits_are_confirmed_against_the_table(db, tmp_path):
+    root = str(tmp_path / 'filters')
+    os.makedirs(root)
+    publish_filters(db, root)
+    blocklist = Blocklist(os.path.join(root, 'current'))
+
+    assert blocklist.check(db, 'card_ok', 'device_bad', '10.0.0.1') == 'device blocklisted: emulator farm'
+    assert blocklist.check(db, 'card_stolen', 'device_bad', '203.0.113.7') == 'card blocklisted: reported stolen'
+    assert blocklist.check(db, 'card_ok', 'device_ok', '10.0.0.1') is None
+
+    # Removed after the build: the filter still hits, the table says no
+    db.query(BlocklistEntry).filter(BlocklistEntry.entity_id == 'card_stolen').delete()
+    db.commit()
+    assert blocklist.check(db, 'card_stolen') is None
+    assert blocklist.stats()['false_positives'] == 1
+    assert blocklist.stats()['entries'] == {'card': 1, 'device': 1, 'ip': 1}
+
+def test_blocked_transactions_are_stored_as_high_risk_with_the_reason(db, tmp_path):
+    root = str(tmp_path / 'filters')
+    os.makedirs(root)
+    publish_filters(db, root)
+    service = TransactionService(db, blocklist=Blocklist(os.path.join(root, 'current')))
+    transaction = TransactionCreate(card_id='card_1', merchant_id='merch_1', amount=20.0,
+                                    location_id=1, ip_address='203.0.113.7')
+
+    block_reason = service.check_blocklist(transaction)
+    assert block_reason == 'ip blocklisted: botnet exit'
+    prediction = service.blocked_prediction()
+    result = service.store_transaction(transaction, prediction['fraud_probability'], prediction['risk_components'],
+                                       idempotency_key='retry-1', block_reason=block_reason)
+    assert (result.risk_level, result.status, result.block_reason) == ('HIGH', 'fraud', block_reason)
+    # Idempotent replays are built from the stored row
+    replay = service.build_response(service.find_by_idempotency_key('retry-1'))
+    assert replay.block_reason == block_reason
+
+    sink = ListSink()
+    OutboxRelay(sessionmaker(bind=db.bind), sink).run_once()
+    assert sink.events[0]['block_reason'] == block_reason
+    assert db.query(FraudCase).one().fraud_type == 'blocklist'
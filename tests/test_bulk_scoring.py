@@ -0,0 +1,52 @@
+# tests/test_bulk_scoring.py
+
+import pandas as pd
+import pytest
+from src.ml.prediction.bulk_scoring import frame_to_transactions, score_file
+
+class StubPredictor:
+    def predict_batch(self, features_list, timestamps=None):
+        return [
+            {'fraud_probability': features['amount'] / 1000, 'risk_level': 'HIGH' if features['amount'] > 500 else 'LOW'}
+            for features in features_list
+        ]
+
+@pytest.fixture
+def input_csv(tmp_path):
+    path = tmp_path / 'input.csv'
+    pd.DataFrame({
+        'ref': range(100),
+        'card_id': [f"{i:04d}" for i in range(100)],
+        'merchant_id': 'merch_1',
+        'amount': [10.0 * i for i in range(100)],
+        'location_id': [None if i % 10 == 0 else i for i in range(100)],
+        'timestamp': '2024-01-01T00:00:10'
+    }).to_csv(path, index=False)
+    return str(path)
+
+def test_frame_to_transactions_handles_missing_values_and_event_time(input_csv):
+    frame = next(iter(pd.read_csv(input_csv, chunksize=5, dtype={'card_id': str, 'location_id': 'Int64'})))
+
+    transactions, timestamps = frame_to_transactions(frame)
+
+    assert transactions[0] == {
+        'card_id': '0000', 'merchant_id': 'merch_1', 'amount': 0.0,
+        'location_id': 0, 'device_id': None, 'ip_address': None
+    }
+    assert timestamps[0] == pd.Timestamp('2024-01-01T00:00:10', tz='UTC').timestamp()
+
+@pytest.mark.parametrize('workers, preserve_order', [(1, True), (3, True), (3, False)])
+def test_score_file_streams_every_row(input_csv, tmp_path, workers, preserve_order):
+    output = str(tmp_path / 'scored.parquet')
+
+    summary = score_file(StubPredictor(), input_csv, output, workers=workers,
+                         chunk_size=7, preserve_order=preserve_order)
+
+    scored = pd.read_parquet(output)
+    assert summary['rows'] == 100
+    assert summary['chunks'] == 15
+    assert sorted(scored['ref']) == list(range(100))
+    if preserve_order:
+        assert list(scored['ref']) == list(range(100))
+    assert (scored['fraud_probability'] == scored['amount'] / 1000).all()
+    assert scored.loc[scored['amount'] > 500, 'risk_level'].eq('HIGH').all()
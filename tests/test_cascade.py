@@ -0,0 +1,52 @@
+# tests/test_cascade.py
+
+import numpy as np
+import xgboost as xgb
+from src.ml.prediction.cascade import calibrate_cascade, cascade_predict
+
+def _data(seed, n_rows=4000):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, 6)).astype(np.float32)
+    y = (X[:, 0] + 0.5 * X[:, 1] + rng.normal(scale=0.5, size=n_rows) > 2.0).astype(int)
+    return X, y
+
+def _model():
+    X, y = _data(0)
+    return xgb.train({'objective': 'binary:logistic', 'max_depth': 3, 'eta': 0.3},
+                     xgb.DMatrix(X, label=y), num_boost_round=40)
+
+def test_calibration_bounds_recall_loss_and_straddles_the_threshold():
+    model = _model()
+    X, y = _data(1)
+
+    config = calibrate_cascade(model, X, y, prefix_trees=8, max_recall_loss=0.01, max_false_positive_rate=0.01)
+
+    assert config['lower_margin'] <= 0.0 <= config['upper_margin']
+    assert config['holdout']['short_circuit_rate'] > 0.5
+    assert config['holdout']['recall_loss'] <= 0.01
+
+    # A loose false positive budget would put the upper bound below the
+    # threshold's margin; rows above it must still be served as fraud
+    loose = calibrate_cascade(model, X, y, prefix_trees=8, max_false_positive_rate=0.5)
+    assert loose['upper_margin'] >= 0.0
+
+def test_served_scores_match_the_calibrated_decisions():
+    model = _model()
+    X, y = _data(1)
+    dmatrix = xgb.DMatrix(X)
+    full = model.predict(dmatrix)
+    margins = model.predict(dmatrix, output_margin=True, iteration_range=(0, 8))
+
+    for max_false_positive_rate in (0.01, 0.5):
+        config = calibrate_cascade(model, X, y, prefix_trees=8, max_false_positive_rate=max_false_positive_rate)
+        served, short_circuit = cascade_predict(model, dmatrix, config)
+
+        assert np.sum((served >= 0.5) != (full >= 0.5)) == config['holdout']['decision_flips']
+        assert (served[margins > config['upper_margin']] >= 0.5).all()
+        assert (served[margins < config['lower_margin']] < 0.5).all()
+        np.testing.assert_allclose(served[~short_circuit], full[~short_circuit], rtol=1e-6)
+
+    # A strong rule signal sends rows below the band to the full model
+    config = calibrate_cascade(model, X, y, prefix_trees=8)
+    served, short_circuit = cascade_predict(model, dmatrix, config, rule_scores=np.ones(len(X)))
+    assert not short_circuit[margins < config['lower_margin']].any()
@@ -0,0 +1,103 @@
+# tests/test_degradation.py
+
+import asyncio
+import time
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from src.database.models import Card, EntityFeature
+from src.schemas.transaction import TransactionCreate
+from src.services.degradation import Deadline, DeferredWriteQueue, LoadShedder, Overloaded, StageLatency
+from src.services.feature_store import FeatureStore, InMemoryFeatureTier
+from src.services.transaction_service import TransactionService
+
+def test_slow_card_lookup_is_skipped_until_the_next_probe():
+    engine = create_engine("sqlite://")
+    Card.__table__.create(engine)
+    EntityFeature.__table__.create(engine)
+    db = sessionmaker(bind=engine)()
+    latency = StageLatency(probe_interval_seconds=0.05)
+    latency.record('card_lookup', 500.0)
+    service = TransactionService(db, FeatureStore(InMemoryFeatureTier()))
+    transaction = TransactionCreate(card_id="card_1", merchant_id="merch_1", amount=5.0, location_id=1)
+
+    deadline = Deadline(50, {'card_lookup': 10}, latency)
+    enriched = service.enrich_transaction(transaction, deadline)
+    assert enriched['card_type'] == 'unknown'
+    assert deadline.degraded == ['card_lookup_skipped']
+
+    # Once the probe interval has passed the lookup runs again and refreshes the estimate
+    time.sleep(0.06)
+    deadline = Deadline(50, {'card_lookup': 10}, latency)
+    service.enrich_transaction(transaction, deadline)
+    assert deadline.degraded == []
+    assert latency.stats()['latency_ms']['card_lookup'] < 500
+
+    prediction = service.rule_only_prediction(enriched)
+    assert prediction['fraud_probability'] == 0.7
+    assert prediction['risk_level'] == 'HIGH'
+    db.close()
+
+def test_deferred_writes_retry_while_the_database_is_down():
+    written = []
+    outage = {'failures': 2}
+
+    def write(item):
+        if outage['failures']:
+            outage['failures'] -= 1
+            raise OperationalError("INSERT", {}, Exception("database is unavailable"))
+        written.append(item)
+
+    deferred = DeferredWriteQueue(write, max_size=10, retry_seconds=0.01)
+    deferred.start()
+    for i in range(5):
+        assert deferred.submit(i)
+    deferred.stop(timeout_seconds=5)
+
+    assert written == [0, 1, 2, 3, 4]
+    assert deferred.stats()['retries'] == 2
+
+def test_load_shedder_rejects_past_the_limits_with_a_retry_hint():
+    deferred = DeferredWriteQueue(lambda item: None, max_size=10)
+    shedder = LoadShedder(max_in_flight=1, max_deferred_depth=3, deferred=deferred)
+
+    with shedder.admit():
+        with pytest.raises(Overloaded):
+            with shedder.admit():
+                pass
+
+    for i in range(3):
+        deferred.submit(i)
+    with pytest.raises(Overloaded) as rejected:
+        with shedder.admit():
+            pass
+    # No drain rate measured yet, so the longest hint
+    assert rejected.value.retry_after_seconds == 30.0
+    assert shedder.stats()['shed'] == {'in_flight': 1, 'deferred_backlog': 1}
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_past_the_in_flight_limit_are_shed():
+    deferred = DeferredWriteQueue(lambda item: None, max_size=10)
+    shedder = LoadShedder(max_in_flight=2, max_deferred_depth=3, deferred=deferred)
+    release = asyncio.Event()
+
+    async def request():
+        try:
+            with shedder.admit():
+                # Admitted requests hold their slot until released, while the others arrive
+                await release.wait()
+                return 200
+        except Overloaded as e:
+            assert e.retry_after_seconds > 0
+            return 503
+
+    requests = [asyncio.create_task(request()) for _ in range(6)]
+    while len([task for task in requests if task.done()]) < 4:
+        await asyncio.sleep(0)
+    assert shedder.stats()['in_flight'] == 2
+    release.set()
+
+    assert sorted(await asyncio.gather(*requests)) == [200, 200, 503, 503, 503, 503]
+    assert shedder.stats()['in_flight'] == 0
+    assert shedder.stats()['shed'] == {'in_flight': 4}
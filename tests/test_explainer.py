@@ -0,0 +1,59 @@
+# tests/test_explainer.py
+
+import asyncio
+import numpy as np
+import pytest
+import xgboost as xgb
+from src.ml.prediction.explainer import Explainer
+
+class StubPreprocessor:
+    def transform_batch(self, transactions, timestamps=None):
+        return np.array([[t['amount'], t['location_id'], ts] for t, ts in zip(transactions, timestamps)],
+                        dtype=np.float32)
+
+    def feature_names(self):
+        return ['Amount', 'Location', 'Time']
+
+class StubPredictor:
+    model_file = 'fraud_model_test.json'
+
+    def __init__(self):
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(200, 3))
+        y = (X[:, 0] + 0.5 * X[:, 1] > 0).astype(int)
+        self.model = xgb.train({'objective': 'binary:logistic', 'max_depth': 3}, xgb.DMatrix(X, label=y), 10)
+        self.preprocessor = StubPreprocessor()
+
+@pytest.mark.asyncio
+async def test_contributions_sum_to_model_margin():
+    predictor = StubPredictor()
+    explainer = Explainer(predictor)
+
+    explanation = await explainer.explain(1, {'amount': 1.5, 'location_id': -0.3}, 0.2)
+
+    margin = predictor.model.predict(
+        xgb.DMatrix(np.array([[1.5, -0.3, 0.2]], dtype=np.float32)), output_margin=True
+    )[0]
+    total = explanation['base_value'] + sum(c['contribution'] for c in explanation['contributions'])
+    assert explanation['margin'] == pytest.approx(margin, abs=1e-5)
+    assert total == pytest.approx(margin, abs=1e-5)
+    # Largest absolute contribution first
+    magnitudes = [abs(c['contribution']) for c in explanation['contributions']]
+    assert magnitudes == sorted(magnitudes, reverse=True)
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_are_batched_and_cached():
+    explainer = Explainer(StubPredictor(), cache_size=2, max_wait_ms=20)
+    features = {'amount': 1.0, 'location_id': 0.0}
+
+    results = await asyncio.gather(*(explainer.explain(i % 3, features, float(i % 3)) for i in range(6)))
+
+    assert results[0] is results[3]
+    stats = explainer.stats()
+    assert stats['batch_batches'] == 1
+    assert stats['batch_items'] == 3
+    # The LRU keeps only the two most recently computed explanations
+    assert stats['cached'] == 2
+
+    await explainer.explain(2, features, 2.0)
+    assert explainer.stats()['hits'] == 1
@@ -0,0 +1,49 @@
+# tests/test_feature_store.py
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from src.database.models import EntityFeature
+from src.services.feature_store import FeatureStore, InMemoryFeatureTier
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    EntityFeature.__table__.create(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+def _count_selects(db):
+    statements = []
+    event.listen(db.bind, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement)
+                 if statement.startswith("SELECT") else None)
+    return statements
+
+def test_get_many_reads_all_entities_in_one_query(db):
+    store = FeatureStore(InMemoryFeatureTier())
+    store.materialize(db, 'card', 'card_type', {'card-1': 'credit'})
+    store.materialize(db, 'merchant', 'merchant_risk_score', {'m-1': 0.7})
+    store.memory = InMemoryFeatureTier()
+
+    selects = _count_selects(db)
+    features = store.get_many(db, [('card', 'card-1'), ('merchant', 'm-1'), ('ip', '10.0.0.1'), ('device', None)])
+
+    assert len(selects) == 1
+    assert features[('card', 'card-1')] == {'card_type': 'credit'}
+    assert features[('merchant', 'm-1')] == {'merchant_risk_score': 0.7}
+    assert features[('ip', '10.0.0.1')] == {}
+
+    # Hits and known-absent features are both served from memory
+    store.get_many(db, [('card', 'card-1'), ('ip', '10.0.0.1')])
+    assert len(selects) == 1
+
+def test_materialize_upserts_and_refreshes_memory(db):
+    store = FeatureStore(InMemoryFeatureTier())
+    store.get_many(db, [('location', 'loc-1')])
+    store.materialize(db, 'location', 'location_risk_score', {'loc-1': 0.2})
+    store.materialize(db, 'location', 'location_risk_score', {'loc-1': 0.9})
+
+    assert db.query(EntityFeature).count() == 1
+    assert store.get_many(db, [('location', 'loc-1')])[('location', 'loc-1')] == {'location_risk_score': 0.9}
@@ -0,0 +1,47 @@
+# tests/test_hashing.py
+
+import os
+import subprocess
+import sys
+import numpy as np
+from pathlib import Path
+from src.ml.preprocessing.hashing import hash_buckets, stable_hash, stable_hash_one
+
+ROOT = Path(__file__).resolve().parents[1]
+
+def _reference(value: str) -> int:
+    """Scalar FNV-1a 64 with the Murmur3 finalizer"""
+    mask = (1 << 64) - 1
+    h = 0xcbf29ce484222325
+    for byte in value.encode('utf-8'):
+        h = ((h ^ byte) * 0x100000001b3) & mask
+    for shift, multiplier in ((33, 0xff51afd7ed558ccd), (33, 0xc4ceb9fe1a85ec53)):
+        h ^= h >> shift
+        h = (h * multiplier) & mask
+    return h ^ (h >> 33)
+
+def test_matches_scalar_reference():
+    values = ['', 'card_123', '10.0.0.1', 'ümlaut', 'x' * 64, 'nul\x00inside', None, 42]
+    expected = [_reference('' if value is None else str(value)) for value in values]
+
+    assert stable_hash(values).tolist() == expected
+    assert [stable_hash_one(value) for value in values] == expected
+
+def test_buckets_are_in_range_and_balanced():
+    buckets = hash_buckets([f"card_{i}" for i in range(100000)], 100)
+
+    assert buckets.min() >= 0 and buckets.max() < 100
+    counts = np.bincount(buckets, minlength=100)
+    assert counts.min() > 850 and counts.max() < 1150
+
+def test_same_buckets_in_processes_with_different_hash_seeds():
+    script = "from src.ml.preprocessing.hashing import hash_buckets; print(hash_buckets(['card_1', 'merch_9'], 100).tolist())"
+    outputs = {
+        subprocess.run(
+            [sys.executable, '-c', script], cwd=ROOT, capture_output=True, text=True, check=True,
+            env={**os.environ, 'PYTHONHASHSEED': seed}
+        ).stdout
+        for seed in ('1', '2')
+    }
+
+    assert len(outputs) == 1
@@ -0,0 +1,46 @@
+# tests/test_health.py
+
+import time
+from sqlalchemy import create_engine
+from src.services.health import HealthChecker, database_check
+
+def test_readiness_is_cached_between_runs():
+    calls = []
+    checker = HealthChecker()
+    checker.register('model', lambda: calls.append(1) or {'model_file': 'fraud_model_x.json'})
+
+    assert checker.readiness()[0] is False
+    checker.run_checks()
+    for _ in range(100):
+        ready, result = checker.readiness()
+
+    assert ready and len(calls) == 1
+    assert result['checks']['model']['model_file'] == 'fraud_model_x.json'
+
+def test_failing_check_marks_not_ready():
+    def broken():
+        raise ConnectionError("database unreachable")
+
+    checker = HealthChecker()
+    checker.register('model', lambda: {})
+    checker.register('database', broken)
+    checker.run_checks()
+
+    ready, result = checker.readiness()
+    assert not ready
+    assert result['checks']['model']['ok'] and not result['checks']['database']['ok']
+    assert 'unreachable' in result['checks']['database']['error']
+
+def test_stale_result_is_not_ready():
+    checker = HealthChecker(max_age_seconds=0.01)
+    checker.register('model', lambda: {})
+    checker.run_checks()
+    time.sleep(0.02)
+
+    assert checker.readiness()[0] is False
+
+def test_database_check_reports_pool_stats(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'health.db'}")
+    details = database_check(engine)()
+
+    assert details['pool']['checked_out'] == 0
@@ -0,0 +1,127 @@
+# tests/test_idempotency.py
+
+import asyncio
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from src.database.models import Base, FraudCase, Location, OutboxEvent, Transaction
+from src.schemas.transaction import TransactionCreate
+from src.services.idempotency import IdempotencyCache, IdempotencyKeyReused
+from src.services.transaction_service import TransactionService, request_fingerprint
+
+@pytest.mark.asyncio
+async def test_inflight_duplicates_share_one_computation():
+    cache = IdempotencyCache()
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"transaction_id": calls}
+
+    results = await asyncio.gather(*(cache.run("key-1", compute) for _ in range(5)))
+
+    assert calls == 1
+    assert all(result == {"transaction_id": 1} for result in results)
+
+    # Later retries are answered from the cache
+    assert await cache.run("key-1", compute) == {"transaction_id": 1}
+    assert calls == 1
+
+@pytest.mark.asyncio
+async def test_failed_computation_is_not_cached():
+    cache = IdempotencyCache()
+
+    async def fail():
+        raise RuntimeError("model unavailable")
+
+    async def succeed():
+        return {"transaction_id": 7}
+
+    with pytest.raises(RuntimeError):
+        await cache.run("key-2", fail)
+    assert await cache.run("key-2", succeed) == {"transaction_id": 7}
+
+def test_cache_is_bounded_and_expires(monkeypatch):
+    cache = IdempotencyCache(max_entries=2, ttl_seconds=10)
+    now = [1000.0]
+    monkeypatch.setattr("src.services.idempotency.time.monotonic", lambda: now[0])
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("c", 3)
+    assert cache.get("a") is None
+    assert cache.get("c") == 3
+
+    now[0] += 11
+    assert cache.get("c") is None
+
+@pytest.mark.asyncio
+async def test_key_reused_for_a_different_request_is_rejected():
+    cache = IdempotencyCache()
+
+    async def compute():
+        return {"transaction_id": 1}
+
+    assert await cache.run("key-3", compute, fingerprint="a") == {"transaction_id": 1}
+    assert await cache.run("key-3", compute, fingerprint="a") == {"transaction_id": 1}
+    with pytest.raises(IdempotencyKeyReused):
+        await cache.run("key-3", compute, fingerprint="b")
+
+def test_replay_of_a_stored_transaction_returns_the_original_response(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'replay.db'}")
+    tables = [model.__table__ for model in (Location, Transaction, FraudCase, OutboxEvent)]
+    Base.metadata.create_all(engine, tables=tables)
+    db = sessionmaker(bind=engine)()
+    service = TransactionService(db)
+    transaction = TransactionCreate(card_id="card_1", merchant_id="merch_1", amount=25.0, location_id=1)
+
+    # 0.7 is HIGH by the model's own threshold but MEDIUM as stored; the response reports what is stored
+    original = service.store_transaction(
+        transaction, fraud_probability=0.7, idempotency_key="key-4", degraded=['rule_only_score']
+    ).model_dump()
+    assert (original['risk_level'], original['degraded']) == ('MEDIUM', ['rule_only_score'])
+
+    existing = service.find_by_idempotency_key("key-4")
+    assert existing.request_fingerprint == request_fingerprint(transaction.model_copy(update={'idempotency_key': "x"}))
+    service.check_replay(existing, transaction)
+    assert service.build_response(existing).model_dump() == original
+
+    with pytest.raises(IdempotencyKeyReused):
+        service.check_replay(existing, transaction.model_copy(update={'amount': 26.0}))
+    with pytest.raises(IdempotencyKeyReused):
+        service.store_transaction(transaction.model_copy(update={'amount': 26.0}), fraud_probability=0.1,
+                                  idempotency_key="key-4")
+    db.close()
+
+@pytest.mark.asyncio
+async def test_run_many_computes_each_key_once_and_returns_failures_in_place():
+    cache = IdempotencyCache()
+    cache.set("cached", {"transaction_id": 1}, fingerprint="a")
+    cache.set("reused", {"transaction_id": 2}, fingerprint="a")
+    release = asyncio.Event()
+    computed = []
+
+    async def single():
+        await release.wait()
+        return {"transaction_id": 3}
+
+    async def compute(keys):
+        computed.append(keys)
+        release.set()
+        return {"new": {"transaction_id": 4}, "failing": RuntimeError("store failed")}
+
+    # A single request holding "inflight" is waited for, not computed again
+    inflight = asyncio.create_task(cache.run("inflight", single, fingerprint="b"))
+    await asyncio.sleep(0)
+    responses = await cache.run_many(
+        {"cached": "a", "reused": "z", "inflight": "b", "new": "c", "failing": "d"}, compute
+    )
+
+    assert computed == [["new", "failing"]]
+    assert responses["cached"] == {"transaction_id": 1}
+    assert isinstance(responses["reused"], IdempotencyKeyReused)
+    assert responses["inflight"] == await inflight == {"transaction_id": 3}
+    assert responses["new"] == cache.get("new") == {"transaction_id": 4}
+    assert isinstance(responses["failing"], RuntimeError) and cache.get("failing") is None
@@ -0,0 +1,56 @@
+# tests/test_ip_ranges.py
+
+import numpy as np
+import pandas as pd
+import pytest
+from src.services.ip_ranges import IpRangeTable, IpRiskLookup, build_table, publish_table
+
+@pytest.fixture
+def ranges_csv(tmp_path):
+    path = tmp_path / 'ranges.csv'
+    pd.DataFrame([
+        ('10.0.0.0', '10.0.0.255', 0.9, 0.1),
+        ('1.2.3.4', '1.2.3.4', 0.5, 0.5),
+        ('255.255.255.0', '255.255.255.255', 0.2, 1.0),
+        ('2001:db8::', '2001:db8::ffff', 0.8, 0.3),
+        ('2001:db8:0:1::', '2001:db8:0:1:ffff:ffff:ffff:ffff', 0.4, 0.0),
+    ], columns=['start_ip', 'end_ip', 'reputation_risk', 'geo_risk']).to_csv(path, index=False)
+    return str(path)
+
+def test_lookup_finds_the_containing_range(ranges_csv, tmp_path):
+    build_table(ranges_csv, str(tmp_path / 'table'))
+    table = IpRangeTable(str(tmp_path / 'table'))
+
+    assert table.lookup('10.0.0.17') == pytest.approx({'reputation_risk': 0.9, 'geo_risk': 0.1}, abs=1 / 255)
+    assert table.lookup('255.255.255.255')['geo_risk'] == 1.0
+    assert table.lookup('2001:db8::ff')['reputation_risk'] == pytest.approx(0.8, abs=1 / 255)
+    assert table.lookup('2001:db8:0:1:8000::1')['reputation_risk'] == pytest.approx(0.4, abs=1 / 255)
+    for miss in ('10.0.1.0', '1.2.3.3', '1.2.3.5', '0.0.0.0', '2001:db8::1:0', '2001:db8:0:2::', 'not-an-ip'):
+        assert table.lookup(miss) is None
+
+    ips = ['1.2.3.4', '9.9.9.9', None, '2001:db8::1', 'garbage', '10.0.0.0']
+    risks = table.lookup_many(ips)
+    assert risks.shape == (6, 2)
+    assert np.isnan(risks[[1, 2, 4], 0]).all()
+    np.testing.assert_allclose(risks[[0, 3, 5], 0], [0.5, 0.8, 0.9], atol=1 / 255)
+
+def test_overlapping_ranges_are_rejected(tmp_path):
+    path = tmp_path / 'overlap.csv'
+    pd.DataFrame({'start_ip': ['10.0.0.0', '10.0.0.128'], 'end_ip': ['10.0.0.200', '10.0.1.0'],
+                  'reputation_risk': [0.1, 0.2]}).to_csv(path, index=False)
+    with pytest.raises(ValueError, match="Overlapping IPv4"):
+        build_table(str(path), str(tmp_path / 'table'))
+
+def test_published_table_is_swapped_in(ranges_csv, tmp_path):
+    root = str(tmp_path / 'ip_ranges')
+    lookup = IpRiskLookup(f"{root}/current", reload_interval_seconds=0)
+    assert lookup.lookup('1.2.3.4') is None
+
+    publish_table(ranges_csv, root)
+    assert lookup.lookup('1.2.3.4')['reputation_risk'] == pytest.approx(0.5, abs=1 / 255)
+
+    pd.DataFrame({'start_ip': ['1.2.3.0'], 'end_ip': ['1.2.3.255'], 'reputation_risk': [1.0]}).to_csv(
+        tmp_path / 'next.csv', index=False)
+    publish_table(str(tmp_path / 'next.csv'), root, keep=1)
+    assert lookup.lookup('1.2.3.4') == {'reputation_risk': 1.0, 'geo_risk': 0.0}
+    assert lookup.lookup('10.0.0.1') is None
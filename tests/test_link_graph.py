@@ -0,0 +1,100 @@
+# tests/test_link_graph.py
+
+import time
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from src.database.models import Base, Card, EntityFeature, OutboxEvent, Transaction
+from src.schemas.transaction import TransactionCreate
+from src.services.feature_store import FeatureStore, InMemoryFeatureTier
+from src.services.link_graph import LinkGraph, PublishedLinkGraph, load_transactions, publish_graph
+from src.services.transaction_service import TransactionService
+
+NOW = 1_700_000_000
+
+def test_features_count_recent_distinct_neighbours_within_the_degree_bound():
+    graph = LinkGraph(max_degree=3, window_seconds=3600)
+    for i in range(5):
+        graph.add(f"card_{i}", "device_1", f"10.0.0.{i}", NOW - i * 60)
+    graph.add("card_0", "device_1", "10.0.0.0", NOW)
+    graph.add("card_9", "device_9", None, NOW - 7200)
+
+    features = graph.features("card_0", "device_1", "10.0.0.0", now=NOW)
+    # Only the 3 most recently seen cards are kept on the device
+    assert features['device_distinct_cards'] == 3
+    assert features['ip_distinct_cards'] == 1
+    assert features['card_distinct_devices'] == 1
+    # 5 cards, the device and 5 IPs
+    assert (features['link_component_size'], features['link_component_cards']) == (11, 5)
+
+    # Seen before the window: linked, but not counted
+    features = graph.features("card_9", "device_9", None, now=NOW)
+    assert features['device_distinct_cards'] == 0
+    assert features['link_component_size'] == 2
+    assert graph.features("card_new", None, None, now=NOW)['link_component_size'] == 1
+
+def test_compaction_expires_edges_and_workers_follow_published_snapshots(tmp_path):
+    graph = LinkGraph(max_degree=8, window_seconds=3600, retention_seconds=86400)
+    graph.add_many(["card_1", "card_2", "card_3"], ["device_1", "device_1", "device_2"],
+                   ["10.0.0.1", None, "10.0.0.1"], [NOW - 100000, NOW, NOW])
+    graph.add("card_4", "device_2", None, NOW)
+    graph.compact(now=NOW)
+
+    # card_1's edges are past retention, so it left the component
+    features = graph.features("card_3", "device_2", "10.0.0.1", now=NOW)
+    assert features['device_distinct_cards'] == 2
+    assert features['ip_distinct_cards'] == 1
+    assert (features['link_component_size'], features['link_component_cards']) == (4, 2)
+    assert graph.features("card_1", "device_1", None, now=NOW)['link_component_size'] == 1
+
+    publish_graph(graph, str(tmp_path), last_transaction_id=4, loaded_at=time.time(), now=NOW)
+    worker = PublishedLinkGraph(str(tmp_path / 'current'), replay_margin_seconds=0, max_local_edges=1,
+                                max_degree=8, window_seconds=3600, compact_every=1)
+    worker.reload()
+    assert worker.features("card_3", "device_2", "10.0.0.1", now=NOW) == features
+    # The worker's own transactions count on top of the mapped snapshot, up to the local cap...
+    worker.add("card_2", "device_2", None, NOW)
+    worker.add("card_5", "device_2", None, NOW)
+    assert worker.features("card_3", "device_2", None, now=NOW)['link_component_size'] == 6
+    assert (worker.stats()['local_edges'], worker.stats()['skipped_edges']) == (1, 1)
+    # ...without compacting away from the mapped arrays
+    assert worker.stats()['compactions'] == 0 and not worker.graph().neighbors.flags.writeable
+
+    # Local edges are replayed onto versions loaded before they were stored
+    publish_graph(graph, str(tmp_path), last_transaction_id=4, loaded_at=time.time() - 60, now=NOW)
+    worker.reload()
+    assert worker.features("card_3", "device_2", None, now=NOW)['link_component_size'] == 6
+    publish_graph(graph, str(tmp_path), last_transaction_id=4, loaded_at=time.time() + 60, now=NOW)
+    worker.reload()
+    assert worker.features("card_3", "device_2", None, now=NOW)['link_component_size'] == 4
+    assert worker.stats()['local_edges'] == 0
+
+def test_stored_transactions_feed_later_enrichment():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[Card.__table__, EntityFeature.__table__,
+                                             Transaction.__table__, OutboxEvent.__table__])
+    db = sessionmaker(bind=engine)()
+    graph = LinkGraph()
+    service = TransactionService(db, FeatureStore(InMemoryFeatureTier()), link_graph=graph)
+
+    for card_id in ("card_1", "card_2"):
+        transaction = TransactionCreate(card_id=card_id, merchant_id="merch_1", amount=50.0,
+                                        location_id=1, device_id="device_1", ip_address="10.0.0.1")
+        enriched = service.enrich_transaction(transaction)
+        service.store_transaction(transaction, 0.1, enriched_data=enriched)
+
+    # card_2 was scored before its own transaction was stored
+    assert enriched['device_distinct_cards'] == 1
+    enriched = service.enrich_transaction(transaction)
+    assert enriched['device_distinct_cards'] == 2
+    assert enriched['link_component_cards'] == 2
+    # 2 of the 5 cards that make a shared device fully risky
+    assert enriched['link_risk_score'] == 0.4
+    assert [row.link_risk_score for row in db.query(Transaction).order_by(Transaction.transaction_id)] == [0.02, 0.2]
+
+    # The builder reads the same edges back from the table
+    built = LinkGraph()
+    assert load_transactions(db, built, settle_seconds=0) == 2
+    assert built.features("card_2", "device_1", "10.0.0.1") == graph.features("card_2", "device_1", "10.0.0.1")
+    # Rows too recent to have settled are read again next time
+    assert load_transactions(db, LinkGraph(), settle_seconds=3600) == 0
+    db.close()
@@ -0,0 +1,66 @@
+# tests/test_outbox.py
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from src.database.models import Base, FraudCase, Location, OutboxEvent, Transaction
+from src.schemas.transaction import TransactionCreate
+from src.services.outbox_relay import OutboxRelay, outbox_backlog
+from src.services.transaction_service import TransactionService
+
+class ListSink:
+    def __init__(self):
+        self.events = []
+
+    def publish(self, events):
+        self.events.extend(events)
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'outbox.db'}")
+    tables = [model.__table__ for model in (Location, Transaction, FraudCase, OutboxEvent)]
+    Base.metadata.create_all(engine, tables=tables)
+    return sessionmaker(bind=engine)
+
+def _store(session_factory, card_id, fraud_probability):
+    db = session_factory()
+    try:
+        TransactionService(db).store_transaction(
+            TransactionCreate(card_id=card_id, merchant_id="merch_456", amount=50.0, location_id=1),
+            fraud_probability=fraud_probability
+        )
+    finally:
+        db.close()
+
+def test_decisions_are_relayed_and_high_risk_opens_a_case(session_factory):
+    _store(session_factory, "card_1", 0.95)
+    _store(session_factory, "card_2", 0.05)
+    assert outbox_backlog(session_factory)['pending'] == 2
+
+    sink = ListSink()
+    relay = OutboxRelay(session_factory, sink, batch_size=10)
+
+    assert relay.run_once() == 2
+    assert [event['risk_level'] for event in sink.events] == ['HIGH', 'LOW']
+    assert relay.run_once() == 0
+    assert outbox_backlog(session_factory)['pending'] == 0
+
+    db = session_factory()
+    cases = db.query(FraudCase).all()
+    assert len(cases) == 1 and cases[0].transaction_id == sink.events[0]['transaction_id']
+    db.close()
+
+def test_failed_publish_leaves_events_pending(session_factory):
+    _store(session_factory, "card_1", 0.95)
+
+    class BrokenSink:
+        def publish(self, events):
+            raise ConnectionError("broker unavailable")
+
+    with pytest.raises(ConnectionError):
+        OutboxRelay(session_factory, BrokenSink()).run_once()
+
+    db = session_factory()
+    assert db.query(FraudCase).count() == 0
+    db.close()
+    assert outbox_backlog(session_factory)['pending'] == 1
@@ -0,0 +1,47 @@
+# tests/test_prefork.py
+
+import os
+import shutil
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+import joblib
+import numpy as np
+from sklearn.preprocessing import RobustScaler, StandardScaler
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# scripts/serve.py's sequence: warm up in the parent, fork, predict in the worker
+FORK_AFTER_WARMUP = textwrap.dedent("""
+    import os
+    from src.ml.prediction.predictor import FraudPredictor
+
+    predictor = FraudPredictor(model_dir='models', cascade=False, shadow=False)
+    predictor.set_nthread(1)
+    predictor.warmup(2000)
+
+    pid = os.fork()
+    if pid == 0:
+        predictor.set_nthread(4)
+        result = predictor.predict({'card_id': 'c', 'merchant_id': 'm', 'amount': 10.0, 'location_id': 1})
+        os._exit(0 if 0 <= result['fraud_probability'] <= 1 else 1)
+    _, status = os.waitpid(pid, 0)
+    raise SystemExit(os.waitstatus_to_exitcode(status))
+""")
+
+def test_worker_forked_after_warmup_can_predict_with_several_threads(tmp_path):
+    model_dir = tmp_path / 'models'
+    model_dir.mkdir()
+    model_file = next((ROOT / 'models').glob('fraud_model_*.json'))
+    shutil.copy(model_file, model_dir / model_file.name)
+    rng = np.random.default_rng(0)
+    joblib.dump(RobustScaler().fit(rng.exponential(80.0, size=(1000, 1))), model_dir / 'amount_scaler.pkl')
+    joblib.dump(StandardScaler().fit(rng.normal(size=(1000, 28))), model_dir / 'feature_scaler.pkl')
+
+    # A fresh interpreter: this one may already hold an OpenMP pool from other tests.
+    # OMP_NUM_THREADS makes a single-core host start a pool as a multi-core one would.
+    env = {**os.environ, 'OMP_NUM_THREADS': '4', 'PYTHONPATH': str(ROOT)}
+    result = subprocess.run([sys.executable, '-c', FORK_AFTER_WARMUP], cwd=tmp_path, env=env,
+                            capture_output=True, timeout=120)
+    assert result.returncode == 0, result.stderr.decode()[-2000:]
@@ -0,0 +1,89 @@
+# tests/test_preprocessing.py
+
+import numpy as np
+import pandas as pd
+import pytest
+from src.ml.preprocessing.imbalance import resample
+from src.ml.preprocessing.preprocessor import FraudDataPreprocessor, V_COLUMNS
+
+@pytest.fixture
+def training_csv(tmp_path):
+    rng = np.random.default_rng(0)
+    n_rows = 2000
+    df = pd.DataFrame(rng.normal(size=(n_rows, 28)), columns=V_COLUMNS)
+    df['Time'] = np.arange(n_rows) * 37.0
+    df['Amount'] = rng.exponential(80.0, size=n_rows)
+    df['Class'] = (rng.random(n_rows) < 0.05).astype(int)
+    path = tmp_path / "creditcard.csv"
+    df.to_csv(path, index=False)
+    return path, df
+
+def test_chunked_features_match_in_memory(training_csv, tmp_path):
+    path, df = training_csv
+    preprocessor = FraudDataPreprocessor(
+        model_dir=str(tmp_path / "models"),
+        cache_dir=str(tmp_path / "cache"),
+        chunk_size=300
+    )
+
+    X, y = preprocessor._load_feature_cache(str(path))
+
+    assert X.dtype == np.float32
+    assert X.shape == (len(df), len(preprocessor.feature_names()))
+    np.testing.assert_array_equal(y, df['Class'].values)
+
+    # Streaming StandardScaler is exact; the reservoir covers every row here
+    expected = FraudDataPreprocessor(model_dir=str(tmp_path / "models"))._preprocess_features(df)
+    np.testing.assert_allclose(X, expected, rtol=1e-4, atol=1e-4)
+
+def test_feature_cache_is_reused(training_csv, tmp_path, monkeypatch):
+    path, _ = training_csv
+    preprocessor = FraudDataPreprocessor(
+        model_dir=str(tmp_path / "models"),
+        cache_dir=str(tmp_path / "cache")
+    )
+    X_first, _ = preprocessor._load_feature_cache(str(path))
+
+    # A second run must not parse the CSV again
+    monkeypatch.setattr(preprocessor, '_iter_training_chunks', None)
+    X_second, _ = preprocessor._load_feature_cache(str(path))
+
+    assert isinstance(X_second, np.memmap)
+    np.testing.assert_array_equal(X_first, X_second)
+
+def test_parquet_export_matches_csv(training_csv, tmp_path):
+    path, df = training_csv
+    export_dir = tmp_path / "export"
+    export_dir.mkdir()
+    df.iloc[:1200].to_parquet(export_dir / "part-00000.parquet", index=False)
+    df.iloc[1200:].to_parquet(export_dir / "part-00001.parquet", index=False)
+
+    from_csv = FraudDataPreprocessor(model_dir=str(tmp_path / "m1"), cache_dir=str(tmp_path / "c1"))
+    from_parquet = FraudDataPreprocessor(model_dir=str(tmp_path / "m2"), cache_dir=str(tmp_path / "c2"))
+    X_csv, y_csv = from_csv._load_feature_cache(str(path))
+    X_parquet, y_parquet = from_parquet._load_feature_cache(str(export_dir))
+
+    np.testing.assert_allclose(X_parquet, X_csv, rtol=1e-5, atol=1e-5)
+    np.testing.assert_array_equal(y_parquet, y_csv)
+
+@pytest.mark.parametrize("strategy", ["smote", "chunked_smote", "undersample"])
+def test_resampling_reaches_target_ratio(strategy):
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(5000, 31)).astype(np.float32)
+    y = (rng.random(5000) < 0.02).astype(np.int8)
+
+    X_res, y_res, scale_pos_weight = resample(X, y, strategy=strategy, sampling_strategy=0.1)
+
+    ratio = y_res.sum() / (len(y_res) - y_res.sum())
+    assert ratio == pytest.approx(0.1, rel=0.02)
+    assert X_res.shape == (len(y_res), 31)
+    assert scale_pos_weight is None
+
+def test_weight_strategy_keeps_rows():
+    y = np.array([0] * 90 + [1] * 10)
+    X = np.zeros((100, 31), dtype=np.float32)
+
+    X_res, y_res, scale_pos_weight = resample(X, y, strategy="weight")
+
+    assert len(y_res) == 100
+    assert scale_pos_weight == pytest.approx(9.0)
@@ -0,0 +1,92 @@
+# tests/test_profiling.py
+
+import asyncio
+import contextvars
+import threading
+import time
+import pytest
+from src.services.profiling import SamplingProfiler, collapsed_stacks, profile_stage, profiled_call, request_profile
+
+def score(n):
+    return sum(i * i for i in range(n))
+
+def busy_scoring_loop(stop):
+    while not stop.is_set():
+        score(1000)
+
+def test_stages_are_timed_only_inside_an_active_profile():
+    assert request_profile('verify', 'timing', header_enabled=False, sample_rate=0) is None
+    assert request_profile('verify', 'bogus', header_enabled=True, sample_rate=0) is None
+    assert request_profile('verify', None, header_enabled=False, sample_rate=1).sampled
+
+    profile = request_profile('verify', 'timing', header_enabled=True, sample_rate=0)
+    with profile.active():
+        with profile_stage('enrich'):
+            time.sleep(0.01)
+        for _ in range(2):
+            with profile_stage('predict'):
+                pass
+    assert set(profile.stages_ms) == {'enrich', 'predict'}
+    assert profile.stages_ms['enrich'] >= 10
+    assert profile.total_ms >= profile.stages_ms['enrich']
+    assert profile.server_timing().startswith('enrich;dur=')
+    assert profile.top_functions() == []
+
+    # Outside a profile the stages record nothing
+    recorded = dict(profile.stages_ms)
+    with profile_stage('enrich'):
+        time.sleep(0.01)
+    assert profile.stages_ms == recorded
+
+def test_cprofile_mode_reports_the_most_expensive_functions():
+    profile = request_profile('verify', 'CProfile', header_enabled=True, sample_rate=0)
+    with profile.active():
+        score(100000)
+
+    functions = [row['function'] for row in profile.top_functions(10)]
+    assert any(function.startswith('score (') for function in functions)
+
+    # Only one request at a time is cProfiled
+    first = request_profile('verify', 'cprofile', header_enabled=True, sample_rate=0)
+    second = request_profile('verify', 'cprofile', header_enabled=True, sample_rate=0)
+    with first.active(), second.active():
+        pass
+    assert (first.mode, second.mode) == ('cprofile', 'timing')
+
+def test_sampling_profiler_collapses_the_stacks_of_other_threads():
+    sampler = SamplingProfiler()
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_scoring_loop, args=(stop,), name='scorer')
+    worker.start()
+    try:
+        results = {}
+        runner = threading.Thread(target=lambda: results.update(stacks=sampler.run(0.3, 0.002)))
+        runner.start()
+        time.sleep(0.05)
+        assert sampler.running
+        with pytest.raises(RuntimeError):
+            sampler.run(0.1)
+        runner.join()
+    finally:
+        stop.set()
+        worker.join()
+
+    lines = collapsed_stacks(results['stacks']).splitlines()
+    scorer = [line for line in lines if line.startswith('scorer;')]
+    assert scorer and any('busy_scoring_loop' in line for line in scorer)
+    assert all(line.rsplit(' ', 1)[1].isdigit() for line in lines)
+    assert not sampler.running
+
+@pytest.mark.asyncio
+async def test_cprofile_mode_covers_work_run_on_the_threadpool():
+    profile = request_profile('verify', 'cprofile', header_enabled=True, sample_rate=0)
+    with profile.active():
+        # run_in_threadpool carries the request's context over to the worker thread
+        await asyncio.get_running_loop().run_in_executor(
+            None, contextvars.copy_context().run, profiled_call, score, 100000
+        )
+
+    functions = [row['function'] for row in profile.top_functions(10)]
+    assert any(function.startswith('score (') for function in functions)
+    # Outside a profile it is a plain call
+    assert profiled_call(score, 3) == 5
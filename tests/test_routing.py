@@ -0,0 +1,70 @@
+# tests/test_routing.py
+
+from datetime import datetime
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from src.database.models import Base, Card, Location, Transaction
+from src.database.routing import EngineRouter, RoutingSession
+from src.services.transaction_service import TransactionService
+
+TABLES = [Card.__table__, Location.__table__, Transaction.__table__]
+
+@pytest.fixture
+def engines(tmp_path):
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    for engine, card_type in ((primary, 'primary'), (replica, 'replica')):
+        Base.metadata.create_all(engine, tables=TABLES)
+        with engine.begin() as connection:
+            connection.execute(Card.__table__.insert(), {'card_id': 'card_1', 'card_type': card_type})
+    return primary, replica
+
+def session_for(router):
+    return sessionmaker(class_=RoutingSession, router=router, bind=router.primary)()
+
+def test_reads_use_a_fresh_replica_until_the_session_writes(engines):
+    primary, replica = engines
+    router = EngineRouter(primary, [replica], max_staleness_seconds=5)
+    router.check()
+    db = session_for(router)
+    service = TransactionService(db)
+
+    assert service.get_card_type('card_1') == 'replica'
+
+    db.add(Transaction(card_id='card_1', merchant_id='merch_1', amount=10, location_id=1,
+                       timestamp=datetime(2024, 1, 1), status='pending'))
+    db.flush()
+    db.expunge_all()
+    # Read-your-writes: everything after the flush stays on the primary
+    assert service.get_card_type('card_1') == 'primary'
+    assert len(service.get_transaction_history('card_1')) == 1
+    db.close()
+
+def test_lagging_or_failing_replicas_fall_back_to_the_primary(engines, tmp_path):
+    primary, replica = engines
+    lag = {'seconds': 30.0}
+    router = EngineRouter(primary, [replica], max_staleness_seconds=5, lag_probe=lambda connection: lag['seconds'])
+    router.check()
+
+    db = session_for(router)
+    assert TransactionService(db).get_card_type('card_1') == 'primary'
+    db.close()
+
+    lag['seconds'] = 0.0
+    router.check()
+    db = session_for(router)
+    assert TransactionService(db).get_card_type('card_1') == 'replica'
+    # A stricter budget than the time since the last probe rules the replica out
+    assert router.read_engine(max_staleness_seconds=0) is primary
+    db.close()
+
+    # A replica without the schema errors mid-read; the read is repeated on the primary
+    broken = create_engine(f"sqlite:///{tmp_path / 'empty.db'}")
+    router = EngineRouter(primary, [broken], max_staleness_seconds=5)
+    router.check()
+    db = session_for(router)
+    assert TransactionService(db).get_card_type('card_1') == 'primary'
+    assert router.status()['replicas'][0]['healthy'] is False
+    assert router.status()['replica_errors'] == 1
+    db.close()
@@ -0,0 +1,37 @@
+# tests/test_serialization.py
+
+import pytest
+from fastapi.exceptions import RequestValidationError
+from src.api.serialization import parse_body, request_body_schema
+from src.schemas.transaction import transaction_adapter, transaction_batch_adapter
+
+def test_parse_body_validates_json_bytes():
+    transaction = parse_body(
+        transaction_adapter,
+        b'{"card_id": " card_123 ", "merchant_id": "merch_456", "amount": 100.256, "location_id": 1}'
+    )
+
+    assert transaction.card_id == "card_123"
+    assert transaction.amount == 100.26
+
+    batch = parse_body(transaction_batch_adapter, b'[{"card_id": "c1", "merchant_id": "m1", "amount": 5}]')
+    assert [t.card_id for t in batch] == ["c1"]
+
+def test_parse_body_reports_errors_under_body():
+    with pytest.raises(RequestValidationError) as excinfo:
+        parse_body(transaction_adapter, b'{"card_id": "c1", "merchant_id": "m1", "amount": -100}')
+    assert excinfo.value.errors()[0]['loc'] == ('body', 'amount')
+
+    with pytest.raises(RequestValidationError) as excinfo:
+        parse_body(transaction_adapter, b'{not json')
+    assert excinfo.value.errors()[0]['type'] == 'json_invalid'
+
+    with pytest.raises(RequestValidationError):
+        parse_body(transaction_batch_adapter, b'[]')
+
+def test_request_body_schema_inlines_models():
+    schema = request_body_schema(transaction_batch_adapter)['requestBody']['content']['application/json']['schema']
+
+    assert schema['type'] == 'array'
+    assert '$ref' not in str(schema)
+    assert 'card_id' in schema['items']['properties']
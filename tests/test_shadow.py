@@ -0,0 +1,103 @@
+# tests/test_shadow.py
+
+import json
+import shutil
+from pathlib import Path
+import joblib
+import numpy as np
+import xgboost as xgb
+from sklearn.preprocessing import RobustScaler, StandardScaler
+from src.ml.prediction import shadow
+from src.ml.prediction.predictor import FraudPredictor
+from src.ml.prediction.shadow import ShadowScorer
+
+ROOT = Path(__file__).resolve().parents[1]
+TRANSACTION = {'card_id': 'c', 'merchant_id': 'm', 'amount': 10.0, 'location_id': 1}
+
+class RecordingScorer:
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, features, champion_prob):
+        self.submitted.append(champion_prob)
+        return True
+
+def _booster(seed, n_features=4, inverted=False):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(200, n_features)).astype(np.float32)
+    y = ((X[:, 0] > 0) != inverted).astype(int)
+    return xgb.train({'objective': 'binary:logistic'}, xgb.DMatrix(X, label=y), num_boost_round=5)
+
+def test_challenger_stats_are_written_to_file(tmp_path):
+    champion = _booster(0)
+    stats_file = tmp_path / "shadow_stats.json"
+    scorer = ShadowScorer({'same': champion.copy(), 'other': _booster(1)}, str(stats_file), batch_size=16)
+
+    rows = np.random.default_rng(2).normal(size=(50, 4)).astype(np.float32)
+    served = champion.predict(xgb.DMatrix(rows)).astype(np.float64)
+    for row, prob in zip(rows, served):
+        assert scorer.submit(row[None, :], float(prob))
+
+    while scorer.stats()['queued']:
+        pass
+    # Restarted by the module's fork hook until stopped
+    assert scorer in shadow._scorers
+    scorer.stop()
+    assert scorer not in shadow._scorers
+
+    stats = json.loads(stats_file.read_text())
+    assert stats['submitted'] == 50 and stats['dropped'] == 0
+    assert stats['challengers']['same']['agreement_rate'] == 1.0
+    assert stats['challengers']['same']['max_abs_delta'] < 1e-6
+    assert sum(stats['challengers']['other']['abs_delta_histogram'].values()) == 50
+
+def test_submit_drops_when_queue_is_full(tmp_path):
+    scorer = ShadowScorer({'c': _booster(0)}, str(tmp_path / "stats.json"), workers=0, queue_size=2)
+    row = np.zeros((1, 4), dtype=np.float32)
+
+    accepted = [scorer.submit(row, 0.5) for _ in range(5)]
+
+    assert accepted == [True, True, False, False, False]
+    assert scorer.stats()['dropped'] == 3
+
+def test_disagreeing_challenger_has_low_agreement(tmp_path):
+    champion = _booster(0)
+    scorer = ShadowScorer({'inverted': _booster(0, inverted=True)}, str(tmp_path / "stats.json"), workers=0)
+
+    rows = np.random.default_rng(3).normal(size=(100, 4)).astype(np.float32)
+    served = champion.predict(xgb.DMatrix(rows)).astype(np.float64)
+    scorer._score([(row[None, :], float(prob)) for row, prob in zip(rows, served)])
+
+    stats = scorer.stats()['challengers']['inverted']
+    assert stats['scored'] == 100
+    assert stats['agreement_rate'] < 0.1
+    assert stats['mean_abs_delta'] > 0.5
+
+def test_predictor_submits_only_served_full_model_scores(tmp_path, monkeypatch):
+    model_dir = tmp_path / 'models'
+    model_dir.mkdir()
+    model_file = next((ROOT / 'models').glob('fraud_model_*.json'))
+    shutil.copy(model_file, model_dir / model_file.name)
+    rng = np.random.default_rng(0)
+    joblib.dump(RobustScaler().fit(rng.exponential(80.0, size=(1000, 1))), model_dir / 'amount_scaler.pkl')
+    joblib.dump(StandardScaler().fit(rng.normal(size=(1000, 28))), model_dir / 'feature_scaler.pkl')
+    # The preprocessor reads its scalers from ./models
+    monkeypatch.chdir(tmp_path)
+    predictor = FraudPredictor(model_dir='models', cascade=False, shadow=False)
+    predictor.shadow = recorder = RecordingScorer()
+
+    # Synthetic traffic is not compared
+    predictor.warmup(8)
+    assert predictor.health_check()
+    assert recorder.submitted == []
+
+    predictor.predict(TRANSACTION)
+    assert len(recorder.submitted) == 1
+
+    # Rows the cascade answers from the tree prefix have no full-model score to compare
+    predictor.cascade = {'prefix_trees': 1, 'lower_margin': np.inf, 'upper_margin': np.inf, 'rule_threshold': 2.0}
+    predictor.predict(TRANSACTION)
+    assert len(recorder.submitted) == 1
+    predictor.cascade = {**predictor.cascade, 'lower_margin': -np.inf}
+    predictor.predict(TRANSACTION)
+    assert recorder.submitted[1] == recorder.submitted[0]
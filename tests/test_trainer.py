@@ -0,0 +1,67 @@
+# tests/test_trainer.py
+
+import json
+import numpy as np
+import pytest
+import xgboost as xgb
+from src.ml.training.trainer import FraudModelTrainer
+
+STRUCTURE = ['Tree', 'Node', 'Feature', 'Split', 'Yes', 'No', 'Missing']
+
+def _data(seed, n_rows=2000):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, 5)).astype(np.float32)
+    y = (X[:, 0] - X[:, 2] + rng.normal(scale=0.5, size=n_rows) > 1.5).astype(int)
+    return X, y
+
+def _champion(model_dir, data_watermark):
+    """A 10-tree full-training champion, saved as _save_model would"""
+    params = {'max_depth': 3, 'eta': 0.3}
+    X, y = _data(0)
+    booster = xgb.train({**params, 'objective': 'binary:logistic'}, xgb.DMatrix(X, label=y), num_boost_round=10)
+    booster.save_model(str(model_dir / 'fraud_model_20240101_000000.json'))
+    metadata = {
+        'timestamp': '20240101_000000', 'parameters': params, 'best_score': 0.8,
+        'data_watermark': data_watermark,
+        'lineage': {'mode': 'full', 'generation': 0, 'root_model': None, 'parent_model': None}
+    }
+    with open(model_dir / 'model_metadata_20240101_000000.json', 'w') as f:
+        json.dump(metadata, f)
+    return booster
+
+def test_update_appends_up_to_the_tree_cap_and_records_lineage(tmp_path):
+    champion = _champion(tmp_path, data_watermark=1000.0)
+    trainer = FraudModelTrainer(model_dir=str(tmp_path), nthread=1)
+    X, y = _data(1, n_rows=500)
+
+    updated = trainer.update_model(X, y, max_new_trees=5, max_total_trees=12,
+                                   refresh_leaves=True, data_watermark=2000.0)
+
+    assert updated.num_boosted_rounds() == 12
+    # Refreshing re-fits leaf values but keeps every existing split
+    before, after = champion.trees_to_dataframe(), updated.trees_to_dataframe()
+    after = after[after['Tree'] < 10].reset_index(drop=True)
+    assert before[STRUCTURE].equals(after[STRUCTURE])
+    assert not np.allclose(before['Gain'], after['Gain'])
+
+    model_path, metadata = trainer.latest_model()
+    assert model_path.endswith('.json') and not model_path.endswith('20240101_000000.json')
+    assert metadata['data_watermark'] == 2000.0
+    assert metadata['lineage'] == {
+        'mode': 'incremental', 'generation': 1,
+        'root_model': 'fraud_model_20240101_000000.json', 'parent_model': 'fraud_model_20240101_000000.json',
+        'parent_data_watermark': 1000.0, 'training_rows': 500, 'positive_rows': int(y.sum()),
+        'trees_before': 10, 'trees_added': 2, 'leaves_refreshed': True
+    }
+
+def test_incremental_update_refuses_a_champion_without_a_watermark(tmp_path):
+    _champion(tmp_path, data_watermark=None)
+    trainer = FraudModelTrainer(model_dir=str(tmp_path), nthread=1)
+
+    # Training on the whole file again would re-learn the champion's own rows
+    with pytest.raises(ValueError, match="no data watermark"):
+        trainer.incremental_watermark()
+    assert trainer.incremental_watermark(since=500.0) == 500.0
+
+    _champion(tmp_path, data_watermark=1000.0)
+    assert trainer.incremental_watermark() == 1000.0
@@ -0,0 +1,54 @@
+# tests/test_training_data_exporter.py
+
+from datetime import datetime, timezone
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from src.database.models import Base, FraudCase, Location, Transaction
+from src.ml.preprocessing.preprocessor import FraudDataPreprocessor
+from src.services.training_data_exporter import TrainingDataExporter
+
+# (day of January 2024, case status, case resolution); None for no case
+TRANSACTIONS = [
+    (1, None, None),
+    (2, 'closed', 'confirmed_fraud'),
+    (3, 'closed', 'false_positive'),
+    (4, 'open', None),
+    (5, 'under_review', None),
+    (6, None, None),
+    (10, 'closed', 'confirmed_fraud'),
+]
+
+def test_export_labels_closed_cases_within_the_window(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'export.db'}")
+    Base.metadata.create_all(engine, tables=[Location.__table__, Transaction.__table__, FraudCase.__table__])
+    db = sessionmaker(bind=engine)()
+    for day, status, resolution in TRANSACTIONS:
+        transaction = Transaction(card_id=f"card_{day}", merchant_id="merch_1", amount=10 * day, location_id=1,
+                                  device_id="device_1", ip_address="10.0.0.1",
+                                  timestamp=datetime(2024, 1, day, 12, 0))
+        db.add(transaction)
+        db.flush()
+        if status is not None:
+            db.add(FraudCase(transaction_id=transaction.transaction_id, status=status, resolution=resolution))
+    db.commit()
+
+    preprocessor = FraudDataPreprocessor(model_dir=str(tmp_path / "models"), cache_dir=str(tmp_path / "cache"))
+    exporter = TrainingDataExporter(db, preprocessor=preprocessor, chunk_size=2)
+    paths = exporter.export(str(tmp_path / "export"), since=datetime(2024, 1, 2), until=datetime(2024, 1, 10))
+    db.close()
+
+    # Day 1 is before the window, day 10 at its exclusive end; open and under-review cases are unlabeled
+    assert len(paths) == 2
+    exported = pd.concat([pd.read_parquet(path) for path in paths], ignore_index=True)
+    assert exported['transaction_id'].tolist() == [2, 3, 6]
+    # Only closed cases not resolved as false positives are fraud
+    assert exported['Class'].tolist() == [1, 0, 0]
+    assert exported['Amount'].tolist() == [20.0, 30.0, 60.0]
+    event_times = [datetime(2024, 1, day, 12, 0, tzinfo=timezone.utc).timestamp() for day in (2, 3, 6)]
+    assert exported['Time'].tolist() == event_times
+
+    # Training on the export records its latest event time as the model's watermark
+    _, y = preprocessor._load_feature_cache(str(tmp_path / "export"))
+    assert y.tolist() == [1, 0, 0]
+    assert preprocessor.data_watermark == event_times[-1]